@@ -0,0 +1,402 @@
+# analysis.py — Analyse-Pipeline ohne Streamlit-Abhängigkeit
+# compute_analysis: ein Athlet (dict) • compute_analysis_batch: ganzer Kader (DataFrame/Spalten, vektorisiert)
+
+import numpy as np
+import pandas as pd
+
+from calculations.critical_power import calc_critical_power, calc_critical_power_batch, corrected_ftp
+from calculations.vo2max import calc_vo2max, calc_vo2max_batch
+from calculations.vlamax_exact import calc_vlamax_exact_with_ffm, predict_many as predict_vlamax_many
+from calculations.vlamax import calc_vlamax as calc_vlamax_classic
+from calculations.vlamax_coefficients import get_coefficients
+from calculations.fatmax import calc_fatmax
+from calculations.zones import calc_zone_table, calc_ga1_zone, calc_ga1_zone_batch
+from utils.athlete_type import determine_athlete_type
+from utils.numeric import round_half_even
+from utils.profiling import StageProfiler
+from utils.stage_graph import Stage, StageGraph
+
+
+HINT_12_BELOW = "12-min liegt deutlich **unter** der Modellkurve → vermutlich nicht maximal / pacing / Ermüdung."
+HINT_12_ABOVE = "12-min liegt deutlich **über** der Modellkurve → 3/5-min evtl. nicht maximal oder Messfehler."
+
+
+# -----------------------------
+# Einzelanalyse – Stufen
+# -----------------------------
+# Jede Stufe bekommt nur ihre eigenen Eingaben; ANALYSIS_GRAPH merkt sich Ergebnisse
+# je Stufe → ändert sich z. B. nur hfmax, rechnet allein "zones" neu.
+def _stage_ffm(weight, bodyfat):
+    # Körperzusammensetzung
+    return weight * (1 - bodyfat / 100.0)
+
+
+def _stage_vlamax(ffm, avg20, peak20, sprint_dur, gender):
+    # VLamax zuerst (wichtig, da FTP davon abhängt)
+    try:
+        return calc_vlamax_exact_with_ffm(ffm, avg20, peak20, sprint_dur, gender), "Exact-App"
+    except Exception:
+        return calc_vlamax_classic(ffm, avg20, peak20, sprint_dur, gender), "Classic-Fallback"
+
+
+def _stage_vo2max(p5min, weight, gender, p3min, p12min):
+    return calc_vo2max(
+        p5min if p5min > 0 else None,
+        weight,
+        gender,
+        method="MEAN",                 # Mittelwert A + B
+        p3min_w=p3min if p3min > 0 else None,
+        p12min_w=p12min if p12min > 0 else None,
+        blend_w5=0.7                   # 3min max 30%
+    )
+
+
+def _stage_cp_fit(p1min, p3min, p5min, p12min):
+    # CP/W′ NUR aus 1/3/5/12-min Tests (keine 20 s oder andere Sprints!)
+    return calc_critical_power(
+        p1min=p1min if p1min > 0 else None,
+        p3min=p3min if p3min > 0 else None,
+        p5min=p5min if p5min > 0 else None,
+        p12min=p12min if p12min > 0 else None,
+    )
+
+
+def _stage_consistency(cp, w_prime, p3min, p5min, p12min):
+    """CP Konsistenzindikator (nur bei 3 Punkten: 3/5/12)."""
+    fit_pts = []
+    if p3min > 0:  fit_pts.append((180.0, p3min, "3min"))
+    if p5min > 0:  fit_pts.append((300.0, p5min, "5min"))
+    if p12min > 0: fit_pts.append((720.0, p12min, "12min"))
+
+    # Nur auswerten, wenn ALLE drei Punkte vorhanden sind
+    if not (len(fit_pts) == 3 and cp > 0 and w_prime >= 0):
+        return None
+
+    errs_pct = []
+    residuals = {}
+    for t_sec, p_meas, label in fit_pts:
+        p_pred = cp + (w_prime / t_sec)
+        err_pct = abs(p_meas - p_pred) / max(1e-9, p_meas) * 100.0
+        errs_pct.append(err_pct)
+        residuals[label] = p_meas - p_pred
+
+    mape = float(np.mean(errs_pct))
+
+    # Ampel-Logik
+    grade, emoji = _consistency_grade(mape)
+
+    # Diagnose-Hinweis (typische Muster)
+    hint = ""
+    r12 = residuals.get("12min", 0.0)
+    if r12 < -0.05 * p12min:
+        hint = HINT_12_BELOW
+    elif r12 > 0.05 * p12min:
+        hint = HINT_12_ABOVE
+
+    return {
+        "mape": mape,
+        "grade": grade,
+        "emoji": emoji,
+        "hint": hint
+    }
+
+
+def _stage_ftp(cp, vlamax, weight):
+    # FTP stark VLamax-abhängig
+    ftp = corrected_ftp(cp, vlamax)
+    return ftp, ftp / weight if weight > 0 else 0.0
+
+
+def _vlamax_version():
+    from calculations.vlamax_exact import model_signature
+    return model_signature()  # neues Modell / neue Koeffizienten → nur "vlamax" wird ungültig
+
+
+ANALYSIS_STAGES = (
+    Stage("ffm", _stage_ffm, ("weight", "bodyfat"), ("ffm",)),
+    Stage("vlamax", _stage_vlamax, ("ffm", "avg20", "peak20", "sprint_dur", "gender"), ("vlamax", "model_used"),
+          version=_vlamax_version),
+    Stage("vo2max", _stage_vo2max, ("p5min", "weight", "gender", "p3min", "p12min"), ("vo2_abs", "vo2_rel")),
+    Stage("cp_fit", _stage_cp_fit, ("p1min", "p3min", "p5min", "p12min"), ("cp", "w_prime")),
+    Stage("consistency", _stage_consistency, ("cp", "w_prime", "p3min", "p5min", "p12min"), ("consistency",)),
+    Stage("ftp", _stage_ftp, ("cp", "vlamax", "weight"), ("ftp", "ftp_wkg")),
+    Stage("fatmax", calc_fatmax, ("vo2_rel", "vlamax", "cp"), ("fatmax_w", "fatmax_pct_ftp", "zone_label")),
+    Stage("zones", calc_zone_table, ("cp", "hfmax", "fatmax_w", "vlamax"), ("zones",)),
+    Stage("ga1", calc_ga1_zone, ("fatmax_w", "cp", "vlamax"), ("ga1_min", "ga1_max", "ga1_pct_min", "ga1_pct_max")),
+    Stage("athlete_type", determine_athlete_type, ("vo2_rel", "vlamax", "cp", "weight"), ("athlete_type",)),
+)
+
+# Prozessweites Memo für interaktive What-if-Läufe (App, Dienst, wiederholte Batch-Läufe).
+# ANALYSIS_GRAPH.stats() → Treffer/Fehlgriffe je Stufe.
+ANALYSIS_GRAPH = StageGraph(ANALYSIS_STAGES)
+
+_RESULT_KEYS = (
+    "gender", "weight", "bodyfat", "birth_date", "hfmax", "p1min", "p3min", "p5min", "p12min",
+    "vlamax", "model_used", "vo2_abs", "vo2_rel", "cp", "w_prime", "ftp", "ftp_wkg", "consistency",
+    "fatmax_w", "fatmax_pct_ftp", "ga1_min", "ga1_max", "ga1_pct_min", "ga1_pct_max", "zones", "athlete_type",
+)
+
+
+# -----------------------------
+# Einzelanalyse
+# -----------------------------
+def compute_analysis(inputs: dict, profile=None, graph=None) -> dict:
+    """
+    Analyse eines Athleten. profile: None → ANALYSIS_PROFILE (Umgebung), True/False
+    oder ein StageProfiler. Wenn aktiv, enthält das Ergebnis unter "profile"
+    die Laufzeit (und ggf. Allokationen) je Stufe.
+    graph: StageGraph (z. B. ANALYSIS_GRAPH) → Stufen mit unveränderten Eingaben kommen
+    aus dessen Memo; None → alles frisch rechnen.
+    """
+    if isinstance(profile, StageProfiler):
+        prof = profile
+    elif profile is None:
+        prof = StageProfiler.from_env()
+    else:
+        prof = StageProfiler(enabled=bool(profile), track_alloc=profile == "alloc")
+
+    with prof.stage("inputs"):
+        values = dict(
+            gender     = inputs["gender"],
+            weight     = float(inputs["weight"]),
+            bodyfat    = float(inputs["bodyfat"]),
+            birth_date = inputs["birth_date"],
+            hfmax      = inputs["hfmax"],
+
+            # Leistungsdaten
+            p1min  = float(inputs.get("p1min")  or 0.0),
+            p3min  = float(inputs.get("p3min")  or 0.0),
+            p5min  = float(inputs.get("p5min")  or 0.0),
+            p12min = float(inputs.get("p12min") or 0.0),
+
+            # Sprintdaten NUR für VLamax (nicht für CP!)
+            sprint_dur = float(inputs["sprint_dur"]),
+            avg20      = float(inputs["avg20"]),
+            peak20     = float(inputs["peak20"]),
+        )
+
+    if graph is None:
+        env = ANALYSIS_GRAPH.run(values, prof if prof.enabled else None, memo=False)
+    else:
+        env = graph.run(values, prof if prof.enabled else None)
+
+    # --- Punkte für CP-Modell-Plot
+    p1min, p3min, p5min, p12min = env["p1min"], env["p3min"], env["p5min"], env["p12min"]
+    pts = []
+    if p1min  > 0: pts.append((60,  p1min))
+    if p3min  > 0: pts.append((180, p3min))
+    if p5min  > 0: pts.append((300, p5min))
+    if p12min > 0: pts.append((720, p12min))
+
+    result = {k: env[k] for k in _RESULT_KEYS}
+    result["pts"] = pts
+    if prof.enabled:
+        result["profile"] = prof.report()
+    return result
+
+
+def _consistency_grade(mape):
+    if mape <= 3.0:
+        return "hoch", "🟢"
+    elif mape <= 6.0:
+        return "mittel", "🟡"
+    return "niedrig", "🔴"
+
+
+# -----------------------------
+# Batch-Analyse (vektorisiert)
+# -----------------------------
+BATCH_INPUT_DEFAULTS = {
+    "gender": "Mann",
+    "p1min": 0.0, "p3min": 0.0, "p5min": 0.0, "p12min": 0.0,
+}
+BATCH_REQUIRED = ("weight", "bodyfat", "sprint_dur", "avg20", "peak20")
+
+FTP_ANCHORS_V = np.array([0.30, 0.45, 0.60, 0.75, 0.90, 1.10])
+FTP_ANCHORS_F = np.array([0.99, 0.975, 0.95, 0.91, 0.885, 0.87])
+
+
+def _column(data, name, n):
+    if name in data:
+        col = data[name]
+        return col.to_numpy() if hasattr(col, "to_numpy") else np.asarray(col)
+    if name in BATCH_INPUT_DEFAULTS:
+        return np.full(n, BATCH_INPUT_DEFAULTS[name], dtype=object if name == "gender" else float)
+    raise KeyError(f"Spalte fehlt: {name}")
+
+
+def _as_power(col):
+    """Leistungswerte als float; fehlend/NaN/<=0 → 0.0 (wie `or 0.0` im Einzelpfad)."""
+    x = pd.to_numeric(pd.Series(col), errors="coerce").to_numpy(dtype=float)
+    return np.where(np.isfinite(x) & (x > 0), x, 0.0)
+
+
+def _vlamax_vec(ffm, avg20, peak20, sprint_dur, gender):
+    try:
+        return predict_vlamax_many(ffm, avg20, peak20, sprint_dur, gender), "Exact-App"
+    except Exception:
+        pass
+
+    c = get_coefficients("classic")
+    g = np.char.lower(np.char.strip(gender.astype(str)))
+    ffm_c = np.maximum(ffm, 1e-6)
+    vl = c["intercept"] + c["avg20_per_ffm"] * (avg20 / ffm_c) + c["sprint_dur_s"] * sprint_dur
+    vl = np.where(np.char.startswith(g, "f"), vl + c["female"], vl)
+    return np.maximum(0.20, np.minimum(0.90, round_half_even(vl, 3))), "Classic-Fallback"
+
+
+def _corrected_ftp_vec(cp, vlamax):
+    v = np.clip(vlamax, FTP_ANCHORS_V[0], FTP_ANCHORS_V[-1])
+    # erstes Segment mit v0 <= v <= v1 (wie die Schleife im Einzelpfad)
+    j = np.clip(np.searchsorted(FTP_ANCHORS_V, v, side="left") - 1, 0, len(FTP_ANCHORS_V) - 2)
+    v0, v1 = FTP_ANCHORS_V[j], FTP_ANCHORS_V[j + 1]
+    f0, f1 = FTP_ANCHORS_F[j], FTP_ANCHORS_F[j + 1]
+    t = (v - v0) / (v1 - v0)
+    factor = f0 + t * (f1 - f0)
+    return round_half_even(cp * factor, 1)
+
+
+def _consistency_vec(cp, wp, residuals, p3, p5, p12):
+    P = np.column_stack([p3, p5, p12])
+    ok = (P > 0).all(axis=1) & (cp > 0) & (wp >= 0)
+    err = np.abs(residuals) / np.maximum(1e-9, P) * 100.0
+    mape = (err[:, 0] + err[:, 1] + err[:, 2]) / 3.0
+    mape = np.where(ok, mape, np.nan)
+    r12 = residuals[:, 2]
+
+    grade = np.select([mape <= 3.0, mape <= 6.0, ok], ["hoch", "mittel", "niedrig"], default=None)
+    hint = np.select(
+        [ok & (r12 < -0.05 * p12), ok & (r12 > 0.05 * p12), ok],
+        [HINT_12_BELOW, HINT_12_ABOVE, ""],
+        default=None,
+    )
+    return mape, grade.astype(object), hint.astype(object)
+
+
+def compute_analysis_batch(data) -> pd.DataFrame:
+    """
+    Vektorisierte Variante von compute_analysis für viele Athleten/Tests.
+
+    data: DataFrame oder Mapping Spaltenname → Array mit den Eingabeschlüsseln
+    von compute_analysis (weight, bodyfat, sprint_dur, avg20, peak20; optional
+    gender, p1min/p3min/p5min/p12min). Liefert je Zeile dieselben Kennzahlen
+    wie der Einzelpfad (CP, W′, FTP, VO2max, VLamax, FatMax, GA1, MAPE, Typ),
+    dazu vo2_flags (Plausibilitäts-Bitmaske, Text via vo2max.decode_flags).
+
+    Zeilen, für die der Einzelpfad eine Exception wirft (kein 3/5-min-Wert,
+    Gewicht <= 0), liefern NaN statt die ganze Batch abzubrechen.
+    """
+    n = len(data[BATCH_REQUIRED[0]]) if BATCH_REQUIRED[0] in data else 0
+    index = data.index if isinstance(data, pd.DataFrame) else pd.RangeIndex(n)
+
+    weight     = np.asarray(_column(data, "weight", n), dtype=float)
+    bodyfat    = np.asarray(_column(data, "bodyfat", n), dtype=float)
+    sprint_dur = np.asarray(_column(data, "sprint_dur", n), dtype=float)
+    avg20      = np.asarray(_column(data, "avg20", n), dtype=float)
+    peak20     = np.asarray(_column(data, "peak20", n), dtype=float)
+    gender     = np.asarray(_column(data, "gender", n), dtype=object)
+
+    p1  = _as_power(_column(data, "p1min", n))
+    p3  = _as_power(_column(data, "p3min", n))
+    p5  = _as_power(_column(data, "p5min", n))
+    p12 = _as_power(_column(data, "p12min", n))
+
+    ffm = weight * (1 - bodyfat / 100.0)
+
+    vlamax, model_used = _vlamax_vec(ffm, avg20, peak20, sprint_dur, gender)
+    vo2 = calc_vo2max_batch(p5, weight, "MEAN", p3min_w=p3, p12min_w=p12, blend_w5=0.7)
+    vo2_abs, vo2_rel, vo2_flags = vo2.vo2_abs_l_min, vo2.vo2_rel_ml_kg_min, vo2.flags
+    cp, w_prime, residuals = calc_critical_power_batch(p1, p3, p5, p12)
+    mape, grade, hint = _consistency_vec(cp, w_prime, residuals, p3, p5, p12)
+
+    ftp = _corrected_ftp_vec(cp, vlamax)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ftp_wkg = np.where(weight > 0, ftp / weight, 0.0)
+
+    # FatMax (wie calc_fatmax, mit CP als Bezug)
+    fatmax_pct_ftp = np.maximum(55.0, np.minimum(85.0, 67.72 + (0.065 * vo2_rel) - (11.42 * vlamax)))
+    fatmax_w = cp * (fatmax_pct_ftp / 100)
+
+    ga1_min, ga1_max, ga1_pct_min, ga1_pct_max = calc_ga1_zone_batch(fatmax_w, cp, vlamax)
+    valid = ~np.isnan(vo2_rel)
+    ga1_min, ga1_max, ga1_pct_min, ga1_pct_max = (
+        np.where(valid, x, np.nan) for x in (ga1_min, ga1_max, ga1_pct_min, ga1_pct_max)
+    )
+
+    # Athletentyp (wie determine_athlete_type, mit CP als Bezug)
+    athlete_type = np.select(
+        [(vo2_rel > 70) & (vlamax < 0.4), vlamax > 0.7, cp / np.maximum(weight, 1e-9) > 5.0, valid],
+        ["Climber / Ausdauer-Athlet", "Sprinter / Explosivtyp", "Allrounder / XCO-Athlet", "Ausgeglichen"],
+        default=None,
+    ).astype(object)
+
+    return pd.DataFrame({
+        "weight": weight, "bodyfat": bodyfat,
+        "p1min": p1, "p3min": p3, "p5min": p5, "p12min": p12,
+        "vlamax": vlamax, "model_used": model_used,
+        "vo2_abs": vo2_abs, "vo2_rel": vo2_rel, "vo2_flags": vo2_flags,
+        "cp": cp, "w_prime": w_prime, "ftp": ftp, "ftp_wkg": ftp_wkg,
+        "consistency_mape": mape, "consistency_grade": grade, "consistency_hint": hint,
+        "fatmax_w": fatmax_w, "fatmax_pct_ftp": fatmax_pct_ftp,
+        "ga1_min": ga1_min, "ga1_max": ga1_max, "ga1_pct_min": ga1_pct_min, "ga1_pct_max": ga1_pct_max,
+        "athlete_type": athlete_type,
+    }, index=index)
+
+
+# -----------------------------
+# Unsicherheit (Monte Carlo)
+# -----------------------------
+# Relativer Messfehler (1σ) je Eingabe; Powermeter typ. ±2 %, Waage ±0,5 %,
+# Körperfett (Caliper/BIA) ±10 % vom Wert. Sprintdauer ist exakt (ganze Sekunden).
+MEASUREMENT_ERROR = {
+    "p1min": 0.02, "p3min": 0.02, "p5min": 0.02, "p12min": 0.02,
+    "avg20": 0.02, "peak20": 0.02,
+    "weight": 0.005, "bodyfat": 0.10, "sprint_dur": 0.0,
+}
+UNCERTAINTY_DRAWS = 10_000
+UNCERTAINTY_KEYS = ("cp", "w_prime", "ftp", "vlamax")
+
+
+def compute_uncertainty(inputs: dict, n_draws: int = UNCERTAINTY_DRAWS, errors: dict = None,
+                        level: float = 0.95, seed=0) -> dict:
+    """
+    Konfidenzbänder für CP, W′, FTP und VLamax: jede Eingabe wird n_draws-mal mit
+    ihrem relativen Messfehler (normalverteilt, errors überschreibt MEASUREMENT_ERROR)
+    gestört und vektorisiert durch dieselben Formeln wie compute_analysis_batch
+    gerechnet. Fehlende Tests (0) bleiben fehlend.
+
+    Rückgabe: {"cp": {"lo", "median", "hi", "sd"}, "w_prime": …, "ftp": …, "vlamax": …,
+    "n_draws", "level"}.
+    """
+    errors = {**MEASUREMENT_ERROR, **(errors or {})}
+    rng = np.random.default_rng(seed)
+
+    def draw(key, default=0.0):
+        v = float(inputs.get(key) or default)
+        sd = float(errors.get(key) or 0.0)
+        if v <= 0 or sd <= 0:
+            return np.full(n_draws, v)
+        return v * (1.0 + sd * rng.standard_normal(n_draws))
+
+    weight, bodyfat = draw("weight"), draw("bodyfat")
+    sprint_dur, avg20, peak20 = draw("sprint_dur"), draw("avg20"), draw("peak20")
+    p1, p3, p5, p12 = (draw(k) for k in ("p1min", "p3min", "p5min", "p12min"))
+    gender = np.array([inputs.get("gender") or BATCH_INPUT_DEFAULTS["gender"]], dtype=object)
+
+    ffm = weight * (1 - bodyfat / 100.0)
+    vlamax, _ = _vlamax_vec(ffm, avg20, peak20, sprint_dur, gender)
+    vlamax = np.broadcast_to(vlamax, (n_draws,))
+    cp, w_prime, _ = calc_critical_power_batch(p1, p3, p5, p12)
+    ftp = _corrected_ftp_vec(cp, vlamax)
+
+    tail = (1.0 - level) / 2.0 * 100.0
+    samples = np.vstack([cp, w_prime, ftp, vlamax])
+    lo, med, hi = np.percentile(samples, [tail, 50.0, 100.0 - tail], axis=1)
+    sd = samples.std(axis=1)
+    out = {
+        key: {"lo": float(lo[i]), "median": float(med[i]), "hi": float(hi[i]), "sd": float(sd[i])}
+        for i, key in enumerate(UNCERTAINTY_KEYS)
+    }
+    out["n_draws"] = int(n_draws)
+    out["level"] = float(level)
+    return out
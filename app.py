@@ -1,12 +1,12 @@
 # app.py — 360 Coaching Lab • Performance Analyzer (v1.9.9 clean)
 # CP nur aus 1/3/5/12 min • FTP stark VLamax-abhängig • Zonen/Grafiken/PDF
 
-import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
+import importlib
+import os
 from datetime import date
-from tabulate import tabulate
+
+import numpy as np
+import streamlit as st
 
 # -----------------------------
 # Page / Session
@@ -20,166 +20,193 @@ if "results" not in st.session_state:
 # -----------------------------
 # Imports (robust)
 # -----------------------------
+# Beim Start nur leichte Module (numpy/sqlite). pandas, matplotlib, tabulate
+# und reportlab kommen erst mit der ersten Analyse bzw. dem ersten Export.
 try:
-    from calculations.critical_power import calc_critical_power, corrected_ftp
-except Exception:
-    st.error("❌ Importfehler: calculations/critical_power.py nicht gefunden/fehlerhaft.")
-    st.stop()
-
-try:
-    from calculations.vo2max import calc_vo2max
-    from calculations.vlamax_exact import calc_vlamax_exact_with_ffm
-    from calculations.vlamax import calc_vlamax as calc_vlamax_classic
-    from calculations.fatmax import calc_fatmax
-    from calculations.zones import calc_zones, calc_ga1_zone
-    from utils.athlete_type import determine_athlete_type
-    from pdf_export import create_analysis_pdf_bytes
+    from utils.power_profile import analysis_inputs_from_ride
+    from utils.results_db import save_result
+    from calculations.vlamax_exact import model_signature
+    from utils.profiling import PROFILE_DUMP_ENV, dump_profile, profile_mode
 except Exception as e:
     st.error(f"❌ Importfehler in Kalkulations-Modulen: {e}")
     st.stop()
 
-# -----------------------------
-# Compute
-# -----------------------------
-def compute_analysis(inputs: dict) -> dict:
-    gender     = inputs["gender"]
-    weight     = float(inputs["weight"])
-    bodyfat    = float(inputs["bodyfat"])
-    birth_date = inputs["birth_date"]
-    hfmax      = inputs["hfmax"]
-
-    # Leistungsdaten
-    p1min  = float(inputs.get("p1min")  or 0.0)
-    p3min  = float(inputs.get("p3min")  or 0.0)
-    p5min  = float(inputs.get("p5min")  or 0.0)
-    p12min = float(inputs.get("p12min") or 0.0)
-
-    # Sprintdaten NUR für VLamax (nicht für CP!)
-    sprint_dur = float(inputs["sprint_dur"])
-    avg20      = float(inputs["avg20"])
-    peak20     = float(inputs["peak20"])
 
-    # Körperzusammensetzung
-    ffm = weight * (1 - bodyfat / 100.0)
-
-    # --- VLamax zuerst (wichtig, da FTP davon abhängt)
+def _lazy(module, name=None):
+    """Schweres Modul (bzw. Attribut daraus) erst bei Bedarf laden; Importfehler wie oben anzeigen."""
     try:
-        vlamax = calc_vlamax_exact_with_ffm(ffm, avg20, peak20, sprint_dur, gender)
-        model_used = "Exact-App"
-    except Exception:
-        vlamax = calc_vlamax_classic(ffm, avg20, peak20, sprint_dur, gender)
-        model_used = "Classic-Fallback"
-
-    # --- VO2max (Formel B: 7 + 10.8 * (P5/kg))
-    #vo2_abs, vo2_rel = calc_vo2max(p5min, weight, gender, method="B")
-
-    # --- VO2max ---
-    vo2_abs, vo2_rel = calc_vo2max(
-        p5min if p5min > 0 else None,
-        weight,
-        gender,
-        method="MEAN",                 # Mittelwert A + B
-        p3min_w=p3min if p3min > 0 else None,
-        p12min_w=p12min if p12min > 0 else None,
-        blend_w5=0.7                   # 3min max 30%
-)
+        mod = importlib.import_module(module)
+        return mod if name is None else getattr(mod, name)
+    except Exception as e:
+        st.error(f"❌ Importfehler in Kalkulations-Modulen: {e}")
+        st.stop()
 
+# -----------------------------
+# Cache (sessionübergreifend, begrenzt)
+# -----------------------------
+# Schlüssel = normalisierte Eingaben; gleiche Eingaben mehrerer Coaches oder
+# Reruns (Tab-Wechsel, Widgets) rechnen/zeichnen nicht erneut.
+CACHE_MAX_ENTRIES = 256
+FIG_DPI = 200  # wie st.pyplot
 
 
+def _norm(v, nd=2):
+    return round(float(v or 0.0), nd)
 
 
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_analysis(gender, weight, bodyfat, birth_date, hfmax, p1min, p3min, p5min, p12min,
+                    sprint_dur, avg20, peak20, model_key=None):
+    # model_key: Signatur des VLamax-Modells → neues Modell = neuer Eintrag
+    # ANALYSIS_GRAPH: bei einem Cache-Fehlgriff rechnen nur Stufen mit geänderten Eingaben neu
+    compute_analysis = _lazy("analysis", "compute_analysis")
+    return compute_analysis(dict(
+        gender=gender, weight=weight, bodyfat=bodyfat, birth_date=birth_date, hfmax=hfmax,
+        p1min=p1min, p3min=p3min, p5min=p5min, p12min=p12min,
+        sprint_dur=sprint_dur, avg20=avg20, peak20=peak20,
+    ), profile=False, graph=_lazy("analysis", "ANALYSIS_GRAPH"))  # Profil nie cachen (wäre bei Treffern veraltet)
 
 
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_uncertainty(inputs_items, power_err_pct, model_key=None):
+    # Monte-Carlo-Bänder (10 000 Ziehungen, fester Seed → stabile Anzeige)
+    compute_uncertainty = _lazy("analysis", "compute_uncertainty")
+    err = power_err_pct / 100.0
+    return compute_uncertainty(dict(inputs_items), errors={
+        k: err for k in ("p1min", "p3min", "p5min", "p12min", "avg20", "peak20")
+    })
 
-    # --- CP/W′ NUR aus 1/3/5/12-min Tests
-    # (keine 20 s oder andere Sprints!)
-    cp, w_prime = calc_critical_power(
-        p1min=p1min if p1min > 0 else None,
-        p3min=p3min if p3min > 0 else None,
-        p5min=p5min if p5min > 0 else None,
-        p12min=p12min if p12min > 0 else None,
-    )
 
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_power_models(fit_pts, criterion):
+    fit_power_models = _lazy("calculations.power_models", "fit_power_models")
+    return fit_power_models(fit_pts, criterion)
 
 
-    # --- CP Konsistenzindikator (nur bei 3 Punkten: 3/5/12) ---
-    fit_pts = []
-    if p3min > 0:  fit_pts.append((180.0, p3min, "3min"))
-    if p5min > 0:  fit_pts.append((300.0, p5min, "5min"))
-    if p12min > 0: fit_pts.append((720.0, p12min, "12min"))
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_wbal(data, name, cp, w_prime, method):
+    # data: Bytes der Ride-Datei (Hash = Cache-Schlüssel); Verlauf auf 5-s-Minima verdichtet
+    wbal_from_ride = _lazy("utils.wbal", "wbal_from_ride")
+    res = wbal_from_ride(data, cp, w_prime, method, name=name)
+    t_s, wbal = _lazy("utils.wbal", "downsample_min")(res["t_s"], res["wbal"])
+    res["t_s"], res["wbal"] = tuple(t_s.tolist()), tuple(wbal.tolist())
+    return res
 
-    consistency = None
 
-    # Nur auswerten, wenn ALLE drei Punkte vorhanden sind
-    if len(fit_pts) == 3 and cp > 0 and w_prime >= 0:
-        errs_pct = []
-        residuals = {}
+def _pyplot():
+    return _lazy("matplotlib.pyplot")
 
-        for t_sec, p_meas, label in fit_pts:
-            p_pred = cp + (w_prime / t_sec)
-            err_pct = abs(p_meas - p_pred) / max(1e-9, p_meas) * 100.0
-            errs_pct.append(err_pct)
-            residuals[label] = p_meas - p_pred
 
-        mape = float(np.mean(errs_pct))
+def _fig_png(fig):
+    import io
+    plt = _pyplot()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=FIG_DPI, bbox_inches="tight")
+    plt.close(fig)
+    return buf.getvalue()
 
-        # Ampel-Logik
-        if mape <= 3.0:
-            grade, emoji = "hoch", "🟢"
-        elif mape <= 6.0:
-            grade, emoji = "mittel", "🟡"
-        else:
-            grade, emoji = "niedrig", "🔴"
 
-        # Diagnose-Hinweis (typische Muster)
-        hint = ""
-        r12 = residuals.get("12min", 0.0)
-        if r12 < -0.05 * p12min:
-            hint = "12-min liegt deutlich **unter** der Modellkurve → vermutlich nicht maximal / pacing / Ermüdung."
-        elif r12 > 0.05 * p12min:
-            hint = "12-min liegt deutlich **über** der Modellkurve → 3/5-min evtl. nicht maximal oder Messfehler."
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def vlamax_gauge_png(vlamax):
+    fig, ax = _pyplot().subplots(figsize=(4,2))
+    ax.barh([0], [vlamax], height=0.4)
+    ax.set_xlim(0,1)
+    ax.set_yticks([])
+    ax.set_xlabel("mmol/l/s")
+    ax.text(min(max(vlamax,0),1), 0, f"{vlamax:.2f}", va="center", ha="center")
+    return _fig_png(fig)
 
-        consistency = {
-            "mape": mape,
-            "grade": grade,
-            "emoji": emoji,
-            "hint": hint
-        }
 
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def vo2_gauge_png(vo2_rel):
+    fig, ax = _pyplot().subplots(figsize=(4, 2))
+    lo, hi = 45, 85
+    val = max(lo, min(hi, vo2_rel))
+    # farbige Bänder
+    for start, end, color in [(lo,55,"#b3d9ff"),(55,65,"#80ffaa"),(65,75,"#ffff80"),(75,85,"#ff9966")]:
+        ax.axvspan(start, end, color=color, alpha=0.6)
+    ax.barh([0], [val - lo], left=lo, height=0.35, color="#007a00")
+    ax.set_xlim(lo, hi); ax.set_yticks([]); ax.set_xlabel("ml/min/kg")
+    ax.text(val, 0, f"{vo2_rel:.1f}", va="center", ha="center", fontsize=10, fontweight="bold")
+    return _fig_png(fig)
 
 
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cp_curve_png(cp, w_prime, pts, power_model=None, sprint_pt=None):
+    # power_model: (Name, Parameter, Kriterium) des per AIC/BIC gewählten Modells
+    t_pts = np.array([t for t, _ in pts], dtype=float)
+    p_pts = np.array([p for _, p in pts], dtype=float)
 
+    fig, ax = _pyplot().subplots(figsize=(7, 4))
+    # Modell: P = CP + W′/t
+    t_curve = np.linspace(10, 1200, 300)
+    p_curve = cp + (w_prime / t_curve)
 
-    # --- FTP stark VLamax-abhängig
-    ftp = corrected_ftp(cp, vlamax)
-    ftp_wkg = ftp / weight if weight > 0 else 0.0
+    # Zonen in Farbe (horizontal – nach Leistung)
+    cpv = cp
+    for (low, high, color, label) in [
+        (0, 0.55*cpv, "#b3d9ff", "Z1"),
+        (0.55*cpv, 0.75*cpv, "#c2f0c2", "Z2"),
+        (0.75*cpv, 0.90*cpv, "#ffffb3", "Z3"),
+        (0.90*cpv, 1.05*cpv, "#ffd699", "Z4"),
+        (1.05*cpv, 1.25*cpv, "#ff9999", "Z5"),
+    ]:
+        ax.axhspan(low, high, color=color, alpha=0.3, label=label)
 
-    # --- FatMax & Zonen
-    fatmax_w, fatmax_pct_ftp, zone_label = calc_fatmax(vo2_rel, vlamax, cp)
-    zones_df = calc_zones(cp, hfmax, fatmax_w, vlamax)
-    ga1_min, ga1_max, ga1_pct_min, ga1_pct_max = calc_ga1_zone(fatmax_w, cp, vlamax)
+    ax.scatter(t_pts, p_pts, color="blue", label="Testdaten", zorder=4, s=40)
+    ax.plot(t_curve, p_curve, color="red", linewidth=2.2, label="CP-Modell", zorder=3)
+    if power_model:
+        power_models = _lazy("calculations.power_models")
+        name, params, criterion = power_model
+        ax.plot(t_curve, power_models.predict_power(name, params, t_curve), color="green", linestyle="--",
+                linewidth=1.8, label=f"{power_models.MODEL_LABELS[name]} ({criterion.upper()})", zorder=3)
+    if sprint_pt:
+        ax.scatter([sprint_pt[0]], [sprint_pt[1]], color="green", marker="^", label="Sprint (Ø)", zorder=4, s=40)
 
-    # --- Athletentyp
-    athlete_type = determine_athlete_type(vo2_rel, vlamax, cp, weight)
+    ax.axhline(cpv, color="gray", linestyle="--", linewidth=1)
+    ax.text(t_curve[-1], cpv + 5, f"CP = {cpv:.0f} W", va="bottom", ha="right", fontsize=9, color="gray")
 
-    # --- Punkte für CP-Modell-Plot
-    pts = []
-    if p1min  > 0: pts.append((60,  p1min))
-    if p3min  > 0: pts.append((180, p3min))
-    if p5min  > 0: pts.append((300, p5min))
-    if p12min > 0: pts.append((720, p12min))
+    # X-Achse logarithmisch, aber mit „normalen“ Ticks
+    ax.set_xscale("log")
+    ax.set_xlabel("Dauer (s)")
+    xticks = [60, 180, 300, 600, 720, 900, 1200]
+    ax.set_xticks(xticks)
+    ax.set_xticklabels([str(int(x)) for x in xticks])
+    ax.set_ylabel("Leistung (W)")
+    ax.set_title("Critical Power Modell (1/3/5/12)")
+    ax.grid(True, which="both", linestyle="--", linewidth=0.5, alpha=0.7)
 
-    return {
-        "gender": gender, "weight": weight, "bodyfat": bodyfat, "birth_date": birth_date,
-        "hfmax": hfmax, "p1min": p1min, "p3min": p3min, "p5min": p5min, "p12min": p12min,
-        "vlamax": vlamax, "model_used": model_used,
-        "vo2_abs": vo2_abs, "vo2_rel": vo2_rel,
-        "cp": cp, "w_prime": w_prime, "ftp": ftp, "ftp_wkg": ftp_wkg,
-        "consistency": consistency,
-        "fatmax_w": fatmax_w, "fatmax_pct_ftp": fatmax_pct_ftp,
-        "ga1_min": ga1_min, "ga1_max": ga1_max, "ga1_pct_min": ga1_pct_min, "ga1_pct_max": ga1_pct_max,
-        "zones_df": zones_df, "athlete_type": athlete_type, "pts": pts
-    }
+    # Legend dedup
+    handles, labels = ax.get_legend_handles_labels()
+    unique_labels = dict(zip(labels, handles))
+    ax.legend(unique_labels.values(), unique_labels.keys(), loc="upper right", fontsize=8)
+    return _fig_png(fig)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def wbal_png(t_s, wbal, w_prime, method):
+    fig, ax = _pyplot().subplots(figsize=(7, 3))
+    t_min = np.asarray(t_s) / 60.0
+    kj = np.asarray(wbal) / 1000.0
+    ax.fill_between(t_min, kj, 0, where=kj < 0, color="#ff9999", alpha=0.6, label="W′ überzogen")
+    ax.plot(t_min, kj, color="blue", linewidth=1.4, label=f"W′bal ({method})")
+    ax.axhline(w_prime / 1000.0, color="gray", linestyle="--", linewidth=1, label="W′")
+    ax.axhline(0, color="red", linewidth=0.8)
+    ax.set_xlabel("Zeit (min)")
+    ax.set_ylabel("W′bal (kJ)")
+    ax.set_title("W′-Balance (Skiba)")
+    ax.grid(True, linestyle="--", linewidth=0.5, alpha=0.7)
+    ax.legend(loc="lower right", fontsize=8)
+    return _fig_png(fig)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def summary_markdown(rows):
+    import pandas as pd
+    from tabulate import tabulate
+
+    df_sum = pd.DataFrame(list(rows), columns=["Parameter", "Wert"])
+    return tabulate(df_sum, headers='keys', tablefmt='github', showindex=False)
 
 # -----------------------------
 # Sidebar – Eingaben
@@ -194,22 +221,54 @@ hfmax    = st.sidebar.number_input("HFmax", 100, 220, 190)
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("Leistungstests (All-Out)")
+ride_file = st.sidebar.file_uploader(
+    "Ride-Datei (CSV/FIT, optional)", type=["csv", "fit"],
+    help="Bestwerte 20 s / 1 / 3 / 5 / 12 min werden direkt aus der Datei übernommen."
+)
+ride = {}
+if ride_file is not None:
+    try:
+        ride = analysis_inputs_from_ride(ride_file, name=ride_file.name)
+    except Exception as e:
+        st.sidebar.warning(f"Ride-Datei konnte nicht gelesen werden: {e}")
+
+def _prefill(key, default, lo, hi):
+    """Wert aus der Ride-Datei (auf den Eingabebereich begrenzt), sonst Default."""
+    v = ride.get(key)
+    if not v:
+        return default
+    v = max(lo, min(hi, float(v)))
+    return round(v, 1) if isinstance(default, float) else int(round(v))
+
 c1, c2 = st.sidebar.columns(2)
 with c1:
-    p1min  = st.number_input("1-min Power (W)",  0.0, 2000.0, 0.0, step=5.0)
-    p5min  = st.number_input("5-min Power (W)",  0.0, 2000.0, 0.0, step=5.0)
+    p1min  = st.number_input("1-min Power (W)",  0.0, 2000.0, _prefill("p1min", 0.0, 0.0, 2000.0), step=5.0)
+    p5min  = st.number_input("5-min Power (W)",  0.0, 2000.0, _prefill("p5min", 0.0, 0.0, 2000.0), step=5.0)
 with c2:
-    p3min  = st.number_input("3-min Power (W)",  0.0, 2000.0, 0.0, step=5.0)
-    p12min = st.number_input("12-min Power (W)", 0.0, 2000.0, 0.0, step=5.0)
+    p3min  = st.number_input("3-min Power (W)",  0.0, 2000.0, _prefill("p3min", 0.0, 0.0, 2000.0), step=5.0)
+    p12min = st.number_input("12-min Power (W)", 0.0, 2000.0, _prefill("p12min", 0.0, 0.0, 2000.0), step=5.0)
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("Sprintdaten für VLamax")
-sprint_dur = st.sidebar.number_input("Sprintdauer (s)", 10, 30, 20)
-avg20      = st.sidebar.number_input("20s Ø-Leistung (W)", 200, 2500, 650)
-peak20     = st.sidebar.number_input("20s Peak-Leistung (W)", 300, 3000, 900)
+sprint_dur = st.sidebar.number_input("Sprintdauer (s)", 10, 30, _prefill("sprint_dur", 20, 10, 30))
+avg20      = st.sidebar.number_input("20s Ø-Leistung (W)", 200, 2500, _prefill("avg20", 650, 200, 2500))
+peak20     = st.sidebar.number_input("20s Peak-Leistung (W)", 300, 3000, _prefill("peak20", 900, 300, 3000))
 
 st.sidebar.markdown("---")
-start = st.sidebar.button("Analyse starten 🚀", use_container_width=True)
+start = st.sidebar.button("Analyse starten 🚀", width="stretch")
+
+with st.sidebar.expander("📏 Messunsicherheit", expanded=False):
+    show_ci = st.checkbox("95 %-Intervalle anzeigen (Monte Carlo)", value=True)
+    power_err = st.number_input("Messfehler Leistung (± %, 1σ)", 0.0, 10.0, 2.0, step=0.5,
+                                help="Powermeter-Genauigkeit; gilt für 1/3/5/12-min und 20-s-Sprint.")
+
+with st.sidebar.expander("🛠️ Debug", expanded=False):
+    debug_profile = st.checkbox("Laufzeit je Stufe messen (ohne Cache)", value=bool(profile_mode()))
+    debug_alloc = st.checkbox("inkl. Allokationen (tracemalloc)", value=profile_mode() == "alloc",
+                              disabled=not debug_profile)
+    debug_dump = st.checkbox("cProfile/tracemalloc-Dump schreiben", value=bool(os.environ.get(PROFILE_DUMP_ENV)),
+                             disabled=not debug_profile)
+    debug_stages = st.checkbox("Stufen-Memo anzeigen (Treffer/Neuberechnungen)", value=False)
 
 # -----------------------------
 # Header
@@ -229,13 +288,35 @@ if start:
     else:
         inputs = dict(
             gender="Mann",  # optional: ggf. Auswahl nach oben verlegen
-            weight=weight, bodyfat=bodyfat, birth_date=birth_dt, hfmax=hfmax,
-            p1min=p1min, p3min=p3min, p5min=p5min, p12min=p12min,
-            sprint_dur=sprint_dur, avg20=avg20, peak20=peak20
+            weight=_norm(weight), bodyfat=_norm(bodyfat), birth_date=birth_dt, hfmax=int(hfmax),
+            p1min=_norm(p1min), p3min=_norm(p3min), p5min=_norm(p5min), p12min=_norm(p12min),
+            sprint_dur=_norm(sprint_dur), avg20=_norm(avg20), peak20=_norm(peak20),
         )
-        r = compute_analysis(inputs)
+        if debug_profile:
+            # Debug: direkt rechnen, damit die Stufenzeiten echt sind
+            compute_analysis = _lazy("analysis", "compute_analysis")
+            profile = "alloc" if debug_alloc else True
+            if debug_dump:
+                r, dump_paths = dump_profile(compute_analysis, inputs, profile=profile)
+                r["profile"]["dump"] = dump_paths
+            else:
+                r = compute_analysis(inputs, profile=profile)
+        else:
+            r = cached_analysis(**inputs, model_key=model_signature())
         r["athlete_name"] = athlete_name.strip()
+        # Sprint (Ø über die Sprintdauer) als kurzer Stützpunkt für die 3-Parameter-Modelle
+        r["sprint_pt"] = (float(inputs["sprint_dur"]), float(inputs["avg20"]))
+        if show_ci:
+            r["uncertainty"] = cached_uncertainty(
+                tuple((k, v) for k, v in inputs.items() if k != "birth_date"), _norm(power_err, 1),
+                model_key=model_signature(),
+            )
         st.session_state["results"] = r
+        if r["athlete_name"]:
+            try:
+                save_result(r, r["athlete_name"])
+            except Exception as e:
+                st.warning(f"Ergebnis konnte nicht gespeichert werden: {e}")
         st.success("Analyse abgeschlossen. Ergebnisse unten.")
 
 # -----------------------------
@@ -250,6 +331,12 @@ if st.session_state["results"] is None:
 # -----------------------------
 r = st.session_state["results"]
 consistency = r.get("consistency")
+ci = r.get("uncertainty")
+
+
+def _ci_caption(key, fmt, unit):
+    if ci:
+        st.caption(f"{ci['level']:.0%}-Intervall: {ci[key]['lo']:{fmt}}–{ci[key]['hi']:{fmt}} {unit}")
 
 st.subheader("⚙️ Leistungskennzahlen")
 m1, m2, m3 = st.columns(3)
@@ -262,12 +349,14 @@ with m1:
         f"{r['cp']:.0f} W",
         help="Aerobe Dauerleistungsgrenze (≈ MLSS)."
     )
+    _ci_caption("cp", ".0f", "W")
 
     st.metric(
         "W′",
         f"{r['w_prime']:.0f} J",
         help="Anaerober Energievorrat oberhalb CP."
     )
+    _ci_caption("w_prime", ".0f", "J")
 
     # --- CP-Konsistenzindikator (nur bei 3/5/12) ---
     if consistency:
@@ -287,23 +376,45 @@ with m1:
     #st.metric("W′", f"{r['w_prime']:.0f} J", help="Anaerober Energievorrat oberhalb CP.")
 with m2:
     st.metric("FTP (60-min)", f"{r['ftp']:.0f} W", help="Für TrainingPeaks als Schwelle eintragen.")
+    _ci_caption("ftp", ".0f", "W")
     st.metric("FTP (W/kg)", f"{r['ftp_wkg']:.2f}")
 with m3:
     st.metric(f"VLamax ({'Exact' if r['model_used']=='Exact-App' else 'Fallback'})", f"{r['vlamax']:.3f} mmol/l/s")
+    _ci_caption("vlamax", ".3f", "mmol/l/s")
     st.metric("Körperfett", f"{bodyfat:.1f} %")
 
+if r.get("profile"):
+    prof = r["profile"]
+    with st.expander(f"🛠️ Debug: Laufzeit je Stufe ({prof['total_ms']:.2f} ms gesamt)", expanded=True):
+        rows = [{
+            "Stufe": s["stage"],
+            "ms": round(s["ms"], 3),
+            "Anteil (%)": round(s["ms"] / max(prof["total_ms"], 1e-9) * 100, 1),
+            **({"Alloc (KiB)": round(s["alloc_kib"], 1), "Peak (KiB)": round(s["peak_kib"], 1)} if prof["alloc"] else {}),
+        } for s in prof["stages"]]
+        st.dataframe(rows, width="stretch", hide_index=True)
+        if prof.get("dump"):
+            st.caption(f"cProfile: `{prof['dump']['prof']}` • tracemalloc: `{prof['dump']['tracemalloc']}`")
+
+if debug_stages:
+    stage_stats = _lazy("analysis", "ANALYSIS_GRAPH").stats()
+    with st.expander("🛠️ Debug: Stufen-Memo (seit Prozessstart)", expanded=True):
+        st.dataframe([{
+            "Stufe": name, "Treffer": s["hits"], "Neu berechnet": s["misses"], "Einträge": s["entries"],
+        } for name, s in stage_stats.items()], width="stretch", hide_index=True)
+
 st.info(f"💡 **TrainingPeaks:** Trage **FTP = {r['ftp']:.0f} W** als Schwelle ein. (CP ist höher/ähnlich, aber FTP ist die 60-min-Praxisleistung.)")
 
 # -----------------------------
 # Ergebnistabelle (kompakt)
 # -----------------------------
-df_sum = pd.DataFrame({
-    "Parameter": [
+summary_rows = tuple(zip(
+    [
         "Datum","Athlet","Geburtsdatum","Gewicht","Körperfett",
         "CP","W′","FTP","FTP W/kg","VO₂max rel.","VO₂max abs.",
         "VLamax","FatMax (W)","FatMax (%CP)","Athletentyp"
     ],
-    "Wert": [
+    [
         date.today().isoformat(),
         r.get("athlete_name",""),
         str(r.get("birth_date","")),
@@ -320,15 +431,15 @@ df_sum = pd.DataFrame({
         f"{(r['fatmax_w']/r['cp']*100):.1f} %",
         r['athlete_type']
     ]
-})
-st.markdown(tabulate(df_sum, headers='keys', tablefmt='github', showindex=False))
+))
+st.markdown(summary_markdown(summary_rows))
 
 # -----------------------------
 # Trainingszonen (CP-basiert)
 # -----------------------------
 st.subheader("🏁 Trainingszonen (CP-basiert, VLamax/FatMax berücksichtigt)")
 try:
-    zones_df = r["zones_df"]
+    zones_df = r["zones"].to_frame()
     # zusätzlich Prozentspalten relativ zu CP
     z = zones_df.copy()
     if "von (W)" in z.columns and "bis (W)" in z.columns:
@@ -336,7 +447,7 @@ try:
         z["bis (%CP)"] = (z["bis (W)"] / r["cp"] * 100).round(1)
         cols = ["Zone","von (W)","bis (W)","von (%CP)","bis (%CP)","Beschreibung"]
         z = z[[c for c in cols if c in z.columns]]
-    st.dataframe(z, use_container_width=True)
+    st.dataframe(z, width="stretch")
 except Exception as e:
     st.warning(f"Zonen konnten nicht angezeigt werden: {e}")
 
@@ -495,26 +606,11 @@ st.subheader("🎯 Dashboard Visuals")
 c1, c2 = st.columns(2)
 with c1:
     st.markdown("**VLamax**")
-    fig, ax = plt.subplots(figsize=(4,2))
-    ax.barh([0], [r['vlamax']], height=0.4)
-    ax.set_xlim(0,1)
-    ax.set_yticks([])
-    ax.set_xlabel("mmol/l/s")
-    ax.text(min(max(r['vlamax'],0),1), 0, f"{r['vlamax']:.2f}", va="center", ha="center")
-    st.pyplot(fig)
+    st.image(vlamax_gauge_png(float(r['vlamax'])), width="stretch")
 
 with c2:
     st.markdown("**VO₂max (ml/min/kg)**")
-    fig, ax = plt.subplots(figsize=(4, 2))
-    lo, hi = 45, 85
-    val = max(lo, min(hi, r['vo2_rel']))
-    # farbige Bänder
-    for start, end, color in [(lo,55,"#b3d9ff"),(55,65,"#80ffaa"),(65,75,"#ffff80"),(75,85,"#ff9966")]:
-        ax.axvspan(start, end, color=color, alpha=0.6)
-    ax.barh([0], [val - lo], left=lo, height=0.35, color="#007a00")
-    ax.set_xlim(lo, hi); ax.set_yticks([]); ax.set_xlabel("ml/min/kg")
-    ax.text(val, 0, f"{r['vo2_rel']:.1f}", va="center", ha="center", fontsize=10, fontweight="bold")
-    st.pyplot(fig)
+    st.image(vo2_gauge_png(float(r['vo2_rel'])), width="stretch")
 
 
 # -----------------------------
@@ -522,50 +618,55 @@ with c2:
 # -----------------------------
 st.subheader("📈 Critical Power Kurve")
 pts = r["pts"]
+sprint_pt = tuple(r["sprint_pt"]) if r.get("sprint_pt") else None
+criterion = st.radio("Leistungsmodell wählen nach", ["AIC", "BIC"], horizontal=True,
+                     help="Vergleich 2-Parameter, 3-Parameter (Morton), exponentiell und Peronnet–Thibault "
+                          "über Testpunkte + Sprint; das Kriterium bestraft zusätzliche Parameter.")
+fit_pts = tuple(map(tuple, pts)) + ((sprint_pt,) if sprint_pt else ())
+models_fit = cached_power_models(fit_pts, criterion.lower()) if len(fit_pts) >= 2 else None
+power_model = None
+if models_fit and models_fit["best"]:
+    best = models_fit["best"]
+    power_model = (best, models_fit["models"][best]["params"], criterion.lower())
 if pts:
-    t_pts = np.array([t for t, _ in pts], dtype=float)
-    p_pts = np.array([p for _, p in pts], dtype=float)
-
-    fig, ax = plt.subplots(figsize=(7, 4))
-    # Modell: P = CP + W′/t
-    t_curve = np.linspace(10, 1200, 300)
-    p_curve = r["cp"] + (r["w_prime"] / t_curve)
-
-    # Zonen in Farbe (horizontal – nach Leistung)
-    cpv = r["cp"]
-    for (low, high, color, label) in [
-        (0, 0.55*cpv, "#b3d9ff", "Z1"),
-        (0.55*cpv, 0.75*cpv, "#c2f0c2", "Z2"),
-        (0.75*cpv, 0.90*cpv, "#ffffb3", "Z3"),
-        (0.90*cpv, 1.05*cpv, "#ffd699", "Z4"),
-        (1.05*cpv, 1.25*cpv, "#ff9999", "Z5"),
-    ]:
-        ax.axhspan(low, high, color=color, alpha=0.3, label=label)
-
-    ax.scatter(t_pts, p_pts, color="blue", label="Testdaten", zorder=4, s=40)
-    ax.plot(t_curve, p_curve, color="red", linewidth=2.2, label="CP-Modell", zorder=3)
-
-    ax.axhline(cpv, color="gray", linestyle="--", linewidth=1)
-    ax.text(t_curve[-1], cpv + 5, f"CP = {cpv:.0f} W", va="bottom", ha="right", fontsize=9, color="gray")
-
-    # X-Achse logarithmisch, aber mit „normalen“ Ticks
-    ax.set_xscale("log")
-    ax.set_xlabel("Dauer (s)")
-    xticks = [60, 180, 300, 600, 720, 900, 1200]
-    ax.set_xticks(xticks)
-    ax.set_xticklabels([str(int(x)) for x in xticks])
-    ax.set_ylabel("Leistung (W)")
-    ax.set_title("Critical Power Modell (1/3/5/12)")
-    ax.grid(True, which="both", linestyle="--", linewidth=0.5, alpha=0.7)
-
-    # Legend dedup
-    handles, labels = ax.get_legend_handles_labels()
-    unique_labels = dict(zip(labels, handles))
-    ax.legend(unique_labels.values(), unique_labels.keys(), loc="upper right", fontsize=8)
-
-    st.pyplot(fig)
+    st.image(cp_curve_png(float(r["cp"]), float(r["w_prime"]), tuple(map(tuple, pts)), power_model,
+                          sprint_pt if power_model else None), width="stretch")
 else:
     st.info("Zu wenige Testpunkte für die CP-Kurve.")
+if models_fit and models_fit["best"]:
+    st.caption(f"Bestes Modell ({criterion}): **{models_fit['label']}** aus {models_fit['n_points']} Punkten")
+    with st.expander("Modellvergleich"):
+        st.dataframe([{
+            "Modell": ("✅ " if name == models_fit["best"] else "") + m["label"],
+            "CP (W)": round(m["cp"], 1), "W′ (J)": round(m["w_prime"], 0),
+            "Pmax (W)": None if m["pmax"] != m["pmax"] else round(m["pmax"], 0),
+            "RMSE (W)": round(m["rmse"], 2), "AIC": round(m["aic"], 2), "BIC": round(m["bic"], 2),
+        } for name, m in models_fit["models"].items()], width="stretch", hide_index=True)
+
+# -----------------------------
+# W′-Balance (aus der Ride-Datei)
+# -----------------------------
+wbal_pdf = None
+if ride_file is not None and float(r["w_prime"]) > 0:
+    st.subheader("🔋 W′-Balance")
+    wbal_method = st.radio("Modell", ["differential", "integral"], horizontal=True,
+                           help="differential: Skiba 2015 (Erholung abhängig vom Abstand zu CP) • "
+                                "integral: Skiba 2012 (τ aus der Ø-Leistung unter CP der ganzen Fahrt)")
+    try:
+        wb = cached_wbal(ride_file.getvalue(), ride_file.name, float(r["cp"]), float(r["w_prime"]), wbal_method)
+    except Exception as e:
+        st.warning(f"W′-Balance konnte nicht berechnet werden: {e}")
+        wb = None
+    if wb and wb["wbal"]:
+        st.image(wbal_png(wb["t_s"], wb["wbal"], float(r["w_prime"]), wbal_method), width="stretch")
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Minimum W′bal", f"{wb['min_wbal_j']:.0f} J", f"{wb['min_wbal_pct']:.0f} % von W′",
+                  delta_color="off")
+        c2.metric("Zeitpunkt Minimum", f"{wb['t_min_s'] / 60:.1f} min")
+        c3.metric("W′ verbraucht (gesamt)", f"{wb['expended_j'] / 1000:.1f} kJ")
+        if wb["below_zero_s"] > 0:
+            st.caption(f"{wb['below_zero_s']:.0f} s unter 0 J – CP/W′ unterschätzen die Fahrt vermutlich.")
+        wbal_pdf = (wbal_method, wb["t_s"], wb["wbal"])
 
 # -----------------------------
 # Erklärungen (Markdown)
@@ -585,9 +686,11 @@ with st.expander("ℹ️ Ergebnisse & Trainingszonen – Erklärung"):
 st.subheader("📄 Export")
 if st.button("PDF exportieren"):
     try:
+        create_analysis_pdf_bytes = _lazy("pdf_export", "create_analysis_pdf_bytes")
         pdf_bytes = create_analysis_pdf_bytes(
             r.get("athlete_name",""), r['vo2_rel'], r['vlamax'], r['cp'], r['w_prime'], r['fatmax_w'],
-            (r['ga1_min'], r['ga1_max']), (r['ga1_max'], 0.90*r['cp']), pts=r['pts']
+            (r['ga1_min'], r['ga1_max']), (r['ga1_max'], 0.90*r['cp']), pts=r['pts'], power_model=power_model,
+            wbal=wbal_pdf
         )
         st.success("PDF erstellt.")
         st.download_button(
@@ -0,0 +1,259 @@
+# batch_analysis.py — Testtag-CSV ohne Streamlit auswerten (Chunks, Worker, Checkpoint)
+#
+#   python batch_analysis.py tests.csv --out ergebnisse.csv
+#   python batch_analysis.py tests.csv --out ergebnisse.parquet --workers 4 --pdf-dir reports/
+#   python batch_analysis.py tests.csv --out ergebnisse.csv --resume     # nach Abbruch fortsetzen
+#
+# Eingabe: eine Zeile pro Test, Spalten wie compute_analysis (weight, bodyfat, sprint_dur,
+# avg20, peak20, p1min…p12min, gender, name, datum) oder im CSV-Schema der App
+# ("Gewicht (kg)", "Körperfett (%)", "3-min (W)", "Sprintdauer (s)", …).
+# Ausgabe: CSV (angehängt je Chunk) oder Parquet (ein part-Datei je Chunk in einem Verzeichnis).
+# Speicher: höchstens 2 × workers Chunks gleichzeitig unterwegs.
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import deque
+
+import pandas as pd
+
+from analysis import BATCH_REQUIRED, compute_analysis_batch
+
+# CSV-Schema der App / vlamax_testdaten.csv → Eingabeschlüssel von compute_analysis
+INPUT_ALIASES = {
+    "Name": "name",
+    "Datum": "datum",
+    "Geschlecht": "gender",
+    "Gewicht (kg)": "weight",
+    "Körperfett (%)": "bodyfat",
+    "1-min (W)": "p1min",
+    "3-min (W)": "p3min",
+    "5-min (W)": "p5min",
+    "12-min (W)": "p12min",
+    "Sprintdauer (s)": "sprint_dur",
+    "Watt Durchschnitt": "avg20",
+    "20s Ø-Leistung (W)": "avg20",
+    "Watt Peak": "peak20",
+    "20s Peak-Leistung (W)": "peak20",
+}
+ID_COLUMNS = ("name", "datum")
+DEFAULT_CHUNKSIZE = 10_000
+CHECKPOINT_VERSION = 1
+
+
+def normalize_columns(df):
+    df = df.rename(columns={k: v for k, v in INPUT_ALIASES.items() if k in df.columns})
+    missing = [c for c in BATCH_REQUIRED if c not in df.columns]
+    if missing:
+        raise ValueError(f"Pflichtspalten fehlen: {missing}")
+    return df
+
+
+def _pdf_frame(df):
+    """Ergebnis-Chunk → Spalten wie results_db/CSV-Schema (für batch_pdf.jobs_from_results)."""
+    ok = df["cp"].notna().to_numpy()
+    df = df[ok]
+    return pd.DataFrame({
+        "Name": df["name"] if "name" in df else [f"Zeile {i}" for i in df.index],
+        "Datum": df["datum"] if "datum" in df else None,
+        "VO2max rel (ml/min/kg)": df["vo2_rel"],
+        "VLamax (mmol/l/s)": df["vlamax"],
+        "CP (W)": df["cp"],
+        "W′ (J)": df["w_prime"],
+        "FatMax (W)": df["fatmax_w"],
+        "1-min (W)": df["p1min"],
+        "3-min (W)": df["p3min"],
+        "5-min (W)": df["p5min"],
+        "12-min (W)": df["p12min"],
+    })
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+def analyse_chunk(chunk, pdf_dir=None):
+    """Ein Chunk (Rohspalten) → (Ergebnis-DataFrame, Anzahl PDFs)."""
+    chunk = normalize_columns(chunk)
+    res = compute_analysis_batch(chunk)
+    ids = [c for c in ID_COLUMNS if c in chunk.columns]
+    out = pd.concat([chunk[ids], res], axis=1) if ids else res
+
+    n_pdfs = 0
+    if pdf_dir:
+        from batch_pdf import export_pdfs, jobs_from_results
+
+        n_pdfs = len(export_pdfs(jobs_from_results(_pdf_frame(out)), pdf_dir, workers=1))
+    return out, n_pdfs
+
+
+def _work(args):
+    index, chunk, pdf_dir = args
+    out, n_pdfs = analyse_chunk(chunk, pdf_dir)
+    return index, out, n_pdfs
+
+
+# -----------------------------
+# Ausgabe + Checkpoint
+# -----------------------------
+def _is_parquet(path):
+    return str(path).lower().endswith(".parquet")
+
+
+def _write_chunk(out_path, index, df, first):
+    if _is_parquet(out_path):
+        os.makedirs(out_path, exist_ok=True)
+        part = os.path.join(out_path, f"part-{index:06d}.parquet")
+        tmp = f"{part}.tmp"
+        try:
+            df.to_parquet(tmp, index=False)
+        except ImportError as e:
+            raise SystemExit(f"Parquet-Ausgabe benötigt pyarrow: {e}")
+        os.replace(tmp, part)
+    else:
+        with open(out_path, "a", encoding="utf-8", newline="") as f:
+            df.to_csv(f, index=False, header=first)
+
+
+def _input_signature(path):
+    st = os.stat(path)
+    return {"input": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _save_checkpoint(path, state):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)  # atomar: nie ein halber Checkpoint
+
+
+def _load_checkpoint(path, signature, chunksize, out_path):
+    """Fortsetzungspunkt (chunks, rows) – prüft, dass Eingabe/Chunkgröße gleich sind."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != CHECKPOINT_VERSION or state.get("signature") != signature \
+            or state.get("chunksize") != chunksize or state.get("out") != os.path.abspath(out_path):
+        raise SystemExit(f"Checkpoint {path} passt nicht zu Eingabe/Ausgabe/Chunkgröße – ohne --resume neu starten.")
+    if not _is_parquet(out_path) and os.path.exists(out_path):
+        # evtl. halb geschriebenen letzten Chunk abschneiden
+        with open(out_path, "r+b") as f:
+            f.truncate(state["out_bytes"])
+    return state
+
+
+# -----------------------------
+# Lauf
+# -----------------------------
+def run(input_csv, out_path, chunksize=DEFAULT_CHUNKSIZE, workers=None, checkpoint=None,
+        resume=False, pdf_dir=None, progress=None):
+    """
+    input_csv chunkweise analysieren und nach out_path schreiben (Reihenfolge bleibt erhalten).
+    Rückgabe: Zusammenfassung (dict) mit Zeilen, Chunks, Dauer, Durchsatz.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    checkpoint = checkpoint or f"{out_path}.checkpoint.json"
+    signature = _input_signature(input_csv)
+
+    state = _load_checkpoint(checkpoint, signature, chunksize, out_path) if resume else None
+    if state is None:
+        if _is_parquet(out_path) and os.path.isdir(out_path):
+            for e in os.scandir(out_path):
+                if e.name.startswith("part-") and e.name.endswith(".parquet"):
+                    os.remove(e.path)
+        elif os.path.exists(out_path):
+            os.remove(out_path)
+        state = {"version": CHECKPOINT_VERSION, "signature": signature, "chunksize": chunksize,
+                 "out": os.path.abspath(out_path), "chunks_done": 0, "rows_done": 0, "out_bytes": 0,
+                 "invalid_rows": 0, "pdfs": 0}
+    start_chunk, skipped = state["chunks_done"], state["rows_done"]
+
+    reader = pd.read_csv(input_csv, chunksize=chunksize,
+                         skiprows=range(1, skipped + 1) if skipped else None)
+    tasks = ((start_chunk + i, chunk, pdf_dir) for i, chunk in enumerate(reader))
+
+    t0 = time.perf_counter()
+    rows = 0
+    pool = mp.Pool(workers) if workers > 1 else None
+    pending = deque()
+
+    def _finish(index, out, n_pdfs):
+        nonlocal rows
+        _write_chunk(out_path, index, out, first=index == 0)
+        rows += len(out)
+        state["chunks_done"] = index + 1
+        state["rows_done"] += len(out)
+        state["invalid_rows"] += int(out["cp"].isna().sum())
+        state["pdfs"] += n_pdfs
+        state["out_bytes"] = 0 if _is_parquet(out_path) else os.path.getsize(out_path)
+        _save_checkpoint(checkpoint, state)
+        if progress:
+            progress(state["rows_done"], rows, time.perf_counter() - t0)
+
+    try:
+        if pool is None:
+            for task in tasks:
+                _finish(*_work(task))
+        else:
+            # höchstens 2 × workers Chunks unterwegs → Speicher begrenzt, Ausgabe in Reihenfolge
+            for task in tasks:
+                pending.append(pool.apply_async(_work, (task,)))
+                if len(pending) >= 2 * workers:
+                    _finish(*pending.popleft().get())
+            while pending:
+                _finish(*pending.popleft().get())
+    finally:
+        if pool is not None:
+            if pending:  # Abbruch: laufende Chunks verwerfen (Checkpoint steht auf dem letzten fertigen)
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+
+    dt = time.perf_counter() - t0
+    return {
+        "rows": rows,
+        "rows_total": state["rows_done"],
+        "resumed_from_row": skipped,
+        "chunks": state["chunks_done"] - start_chunk,
+        "invalid_rows": state["invalid_rows"],
+        "pdfs": state["pdfs"],
+        "seconds": dt,
+        "rows_per_s": rows / dt if dt > 0 else None,
+        "workers": workers,
+        "out": out_path,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Leistungstests aus einer CSV ohne UI auswerten.")
+    ap.add_argument("input", help="Eingabe-CSV (eine Zeile pro Test)")
+    ap.add_argument("--out", required=True, help="Ergebnis-CSV oder .parquet (Verzeichnis mit part-Dateien)")
+    ap.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Zeilen pro Chunk")
+    ap.add_argument("--workers", type=int, default=None, help="Prozesse (Default: CPU-Kerne)")
+    ap.add_argument("--checkpoint", help="Checkpoint-Datei (Default: <out>.checkpoint.json)")
+    ap.add_argument("--resume", action="store_true", help="ab letztem Checkpoint fortsetzen")
+    ap.add_argument("--pdf-dir", help="zusätzlich eine PDF pro gültigem Test in dieses Verzeichnis")
+    args = ap.parse_args(argv)
+
+    def progress(total, rows, dt):
+        print(f"\r{total:,} Zeilen ({rows / max(dt, 1e-9):,.0f}/s)", end="", file=sys.stderr, flush=True)
+
+    s = run(args.input, args.out, chunksize=args.chunksize, workers=args.workers, checkpoint=args.checkpoint,
+            resume=args.resume, pdf_dir=args.pdf_dir, progress=progress)
+    print(file=sys.stderr)
+    print(
+        f"{s['rows']:,} Zeilen in {s['chunks']} Chunks, {s['seconds']:.2f} s "
+        f"({(s['rows_per_s'] or 0):,.0f} Zeilen/s, {s['workers']} Worker)"
+        + (f", fortgesetzt ab Zeile {s['resumed_from_row']:,}" if s["resumed_from_row"] else "")
+        + f"\nungültig (kein CP): {s['invalid_rows']:,} • PDFs: {s['pdfs']:,} • Ausgabe: {s['out']}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+# batch_pdf.py — PDF-Berichte für einen ganzen Kader parallel erzeugen
+# Quelle: gespeicherte Ergebnisse (SQLite, letzter Test je Athlet) oder Ergebnis-CSV
+# Ziel: Verzeichnis (eine PDF pro Athlet) oder ZIP-Datei (gestreamt geschrieben)
+#
+#   python batch_pdf.py --out reports/            # alle Athleten aus data/athleten_daten.db
+#   python batch_pdf.py --out kader.zip --names "Anna" "Ben" --workers 8
+#   python batch_pdf.py --out reports/ --csv ergebnisse.csv
+
+import argparse
+import multiprocessing as mp
+import os
+import re
+import sys
+import time
+import zipfile
+from datetime import date
+
+from calculations.zones import calc_ga1_zone
+
+RESULT_COLUMNS = ["Name", "Datum", "VO2max rel (ml/min/kg)", "VLamax (mmol/l/s)", "CP (W)", "W′ (J)",
+                  "FatMax (W)", "1-min (W)", "3-min (W)", "5-min (W)", "12-min (W)"]
+PTS_COLUMNS = [(60, "1-min (W)"), (180, "3-min (W)"), (300, "5-min (W)"), (720, "12-min (W)")]
+
+
+def _num(v):
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return 0.0
+    return v if v == v else 0.0  # NaN → 0
+
+
+def _slug(name):
+    return re.sub(r"[^\w\-]+", "_", str(name).strip()) or "analyse"
+
+
+def jobs_from_results(df):
+    """Ergebnis-Zeilen (Spalten wie results_db/CSV-Schema) → Argumente für pdf_export._render_pdf_bytes."""
+    jobs = []
+    for row in df.to_dict("records"):
+        cp = _num(row.get("CP (W)"))
+        vlamax = _num(row.get("VLamax (mmol/l/s)"))
+        fatmax_w = _num(row.get("FatMax (W)"))
+        ga1_min, ga1_max, _, _ = calc_ga1_zone(fatmax_w, cp, vlamax)
+        pts = [(t, _num(row.get(col))) for t, col in PTS_COLUMNS if _num(row.get(col)) > 0]
+        datum = str(row.get("Datum") or date.today().isoformat())[:10]
+        jobs.append({
+            "filename": f"{_slug(row.get('Name'))}_{datum}.pdf",
+            "args": (
+                row.get("Name") or "", _num(row.get("VO2max rel (ml/min/kg)")), vlamax, cp,
+                _num(row.get("W′ (J)")), fatmax_w, (ga1_min, ga1_max), (ga1_max, 0.90 * cp),
+            ),
+            "pts": pts,
+        })
+    return jobs
+
+
+# -----------------------------
+# Worker (einmal pro Prozess initialisiert)
+# -----------------------------
+_worker = {}
+
+
+def _init_worker(out_dir=None):
+    # Import + Font-Metriken + ggf. matplotlib einmal pro Prozess, nicht pro PDF
+    import pdf_export
+    from reportlab.pdfbase import pdfmetrics
+
+    for font in ("Helvetica", "Helvetica-Bold"):
+        pdfmetrics.getFont(font)
+    if pdf_export._chart_backend() == "matplotlib":
+        pdf_export._pyplot()
+    # ohne PDF-Cache: jede PDF wird genau einmal gerendert, der Cache der App bleibt unberührt
+    _worker["render"] = pdf_export._render_pdf_bytes
+    _worker["out_dir"] = out_dir
+
+
+def _render_job(job):
+    pdf = _worker["render"](*job["args"], pts=job["pts"])
+    if _worker["out_dir"]:
+        path = os.path.join(_worker["out_dir"], job["filename"])
+        with open(path, "wb") as f:
+            f.write(pdf)
+        return job["filename"], len(pdf), None
+    return job["filename"], len(pdf), pdf
+
+
+def export_pdfs(jobs, out, workers=None, progress=None):
+    """
+    PDFs für alle Jobs erzeugen.
+
+    out: Verzeichnis oder Pfad auf .zip. Bei einem Verzeichnis schreiben die
+    Worker selbst; beim ZIP gehen die Bytes an den Hauptprozess, der sie in
+    Fertigstellungsreihenfolge anhängt (nichts wird gesammelt).
+    progress(done, total) wird nach jeder PDF aufgerufen.
+    Rückgabe: Liste der Dateinamen.
+    """
+    to_zip = str(out).lower().endswith(".zip")
+    out_dir = None if to_zip else str(out)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    total = len(jobs)
+    workers = max(1, min(workers or os.cpu_count() or 1, total or 1))
+    chunksize = max(1, total // (workers * 8))
+    names = []
+
+    zf = zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) if to_zip else None
+    try:
+        if workers == 1:
+            _init_worker(out_dir)
+            results = map(_render_job, jobs)
+            pool = None
+        else:
+            pool = mp.Pool(workers, initializer=_init_worker, initargs=(out_dir,))
+            results = pool.imap_unordered(_render_job, jobs, chunksize=chunksize)
+        try:
+            for done, (filename, _size, pdf) in enumerate(results, 1):
+                if zf is not None:
+                    zf.writestr(filename, pdf)
+                names.append(filename)
+                if progress:
+                    progress(done, total)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    finally:
+        if zf is not None:
+            zf.close()
+    return names
+
+
+def _load_results(args):
+    import pandas as pd
+
+    if args.csv:
+        df = pd.read_csv(args.csv)
+        if args.names:
+            df = df[df["Name"].isin(args.names)]
+        return df
+    from utils.results_db import DB_PATH, latest_per_athlete
+
+    return latest_per_athlete(RESULT_COLUMNS, names=args.names, path=args.db or DB_PATH)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="PDF-Berichte für mehrere Athleten parallel erzeugen.")
+    ap.add_argument("--out", required=True, help="Zielverzeichnis oder .zip-Datei")
+    ap.add_argument("--names", nargs="*", help="nur diese Athleten (Default: alle)")
+    ap.add_argument("--db", help="SQLite-Datei (Default: data/athleten_daten.db)")
+    ap.add_argument("--csv", help="stattdessen Ergebnis-CSV mit Spalten wie in der DB")
+    ap.add_argument("--workers", type=int, default=None, help="Prozesse (Default: CPU-Kerne)")
+    args = ap.parse_args(argv)
+
+    jobs = jobs_from_results(_load_results(args))
+    if not jobs:
+        print("Keine Ergebnisse gefunden.", file=sys.stderr)
+        return 1
+
+    t0 = time.perf_counter()
+
+    def progress(done, total):
+        print(f"\r{done}/{total} PDFs", end="", file=sys.stderr, flush=True)
+
+    names = export_pdfs(jobs, args.out, workers=args.workers, progress=progress)
+    dt = time.perf_counter() - t0
+    print(f"\n{len(names)} PDFs → {args.out} in {dt:.1f} s ({len(names) / max(dt, 1e-9):.1f}/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# benchmarks/cold_start.py — Kaltstart von app.py messen (jeweils frischer Python-Prozess)
+#
+#   python benchmarks/cold_start.py                 # 5 Läufe, Median
+#   python benchmarks/cold_start.py --budget 1.5    # Exit-Code 1, wenn langsamer oder schwere Module geladen
+#
+# Gemessen wird der erste Durchlauf von app.py bis zur Startseite (AppTest, ohne
+# Streamlit-Import selbst) und welche schweren Module dabei geladen wurden.
+# Vor der ersten Analyse sollen pandas/matplotlib/sklearn/joblib/reportlab/tabulate
+# nicht im Prozess sein.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "matplotlib", "sklearn", "joblib", "reportlab", "tabulate"]
+
+_PROBE_APP = r"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+t0 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+dt = time.perf_counter() - t0
+loaded = sorted({m.split(".")[0] for m in set(sys.modules) - before})
+print(json.dumps({"seconds": dt, "loaded": loaded, "errors": [str(e.value) for e in at.exception]}))
+"""
+
+_PROBE_VLAMAX = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from calculations.vlamax_exact import calc_vlamax_exact_with_ffm
+try:
+    calc_vlamax_exact_with_ffm(60.0, 700.0, 1000.0, 20.0, "Mann")
+    ok = True
+except RuntimeError:
+    ok = False
+dt = time.perf_counter() - t0
+print(json.dumps({"seconds": dt, "ok": ok, "loaded": sorted({m.split(".")[0] for m in sys.modules})}))
+"""
+
+
+def _run_probe(code, *args):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code, *args], capture_output=True, text=True, env=env, check=True)
+    wall = time.perf_counter() - t0
+    data = json.loads(out.stdout.strip().splitlines()[-1])
+    data["wall"] = wall
+    return data
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Kaltstart-Benchmark für app.py")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--budget", type=float, default=None, help="max. Median (s) für den ersten App-Durchlauf")
+    args = ap.parse_args(argv)
+
+    app_path = os.path.join(ROOT, "app.py")
+    app_runs = [_run_probe(_PROBE_APP, app_path) for _ in range(args.repeat)]
+    vl_runs = [_run_probe(_PROBE_VLAMAX) for _ in range(args.repeat)]
+
+    app_s = statistics.median(r["seconds"] for r in app_runs)
+    app_wall = statistics.median(r["wall"] for r in app_runs)
+    vl_s = statistics.median(r["seconds"] for r in vl_runs)
+    heavy_app = sorted(set(HEAVY_MODULES) & set(app_runs[0]["loaded"]))
+    heavy_vl = sorted(set(HEAVY_MODULES) & set(vl_runs[0]["loaded"]))
+
+    print(f"app.py erster Durchlauf:   {app_s:.3f} s (Prozess gesamt {app_wall:.3f} s, Median aus {args.repeat})")
+    print(f"  schwere Module geladen:  {', '.join(heavy_app) or '–'}")
+    if app_runs[0]["errors"]:
+        print(f"  Fehler: {app_runs[0]['errors']}")
+    status = "ok" if vl_runs[0]["ok"] else "kein Modell im Arbeitsverzeichnis"
+    print(f"VLamax erste Vorhersage:   {vl_s:.3f} s ({status})")
+    print(f"  schwere Module geladen:  {', '.join(heavy_vl) or '–'}")
+
+    failed = bool(heavy_app) or bool(app_runs[0]["errors"])
+    if args.budget is not None and app_s > args.budget:
+        print(f"Budget überschritten: {app_s:.3f} s > {args.budget:.3f} s")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
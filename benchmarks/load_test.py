@@ -0,0 +1,151 @@
+# benchmarks/load_test.py — Lasttest für service.py (p50/p99-Latenz, Requests/s je Concurrency)
+#
+#   python benchmarks/load_test.py --spawn --workers 4                 # Dienst selbst starten
+#   python benchmarks/load_test.py --url http://127.0.0.1:8765 --concurrency 1 8 32 128
+#   python benchmarks/load_test.py --spawn --path /pdf --duration 5 --json lt.json
+#
+# Jede virtuelle Verbindung hält eine keep-alive-Verbindung und schickt Requests
+# nacheinander; gemessen wird die Zeit von Senden bis vollständiger Antwort.
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ATHLETE = dict(
+    gender="Mann", weight=72.0, bodyfat=11.5, birth_date="1995-01-01", hfmax=190,
+    p1min=560.0, p3min=410.0, p5min=372.0, p12min=318.0,
+    sprint_dur=20.0, avg20=820.0, peak20=1180.0,
+)
+
+
+def _body(i, path, batch):
+    # Eingaben leicht variieren, damit kein Cache alles abfängt
+    a = dict(ATHLETE, weight=60.0 + i % 30, p12min=280.0 + i % 50, athlete_name=f"Athlet {i % 100}")
+    if batch > 1:
+        return json.dumps([dict(a, weight=60.0 + (i + k) % 30) for k in range(batch)]).encode()
+    return json.dumps(a).encode()
+
+
+async def _request(reader, writer, host, path, body):
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    length = next(int(l.split(":", 1)[1]) for l in lines[1:] if l.lower().startswith("content-length:"))
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, path, batch, deadline, lat, errors, counter):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            counter[0] += 1
+            body = _body(counter[0], path, batch)
+            t0 = time.perf_counter()
+            status = await _request(reader, writer, host, path, body)
+            lat.append(time.perf_counter() - t0)
+            if status != 200:
+                errors[0] += 1
+    finally:
+        writer.close()
+
+
+async def run_level(host, port, path, concurrency, duration, batch):
+    lat, errors, counter = [], [0], [0]
+    deadline = time.perf_counter() + duration
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, path, batch, deadline, lat, errors, counter)
+                           for _ in range(concurrency)))
+    dt = time.perf_counter() - t0
+    lat.sort()
+    q = statistics.quantiles(lat, n=100) if len(lat) >= 2 else lat * 99
+    return {
+        "path": path, "concurrency": concurrency, "batch": batch, "requests": len(lat), "errors": errors[0],
+        "seconds": dt, "rps": len(lat) / dt, "items_per_s": len(lat) * batch / dt,
+        "p50_ms": q[49] * 1000, "p99_ms": q[98] * 1000, "max_ms": lat[-1] * 1000 if lat else None,
+    }
+
+
+async def _wait_ready(host, port, timeout=60.0):
+    end = time.perf_counter() + timeout
+    while time.perf_counter() < end:
+        try:
+            _, w = await asyncio.open_connection(host, port)
+            w.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise SystemExit(f"Dienst auf {host}:{port} nicht erreichbar.")
+
+
+async def main_async(args):
+    u = urlparse(args.url)
+    host, port = u.hostname, u.port or 80
+    await _wait_ready(host, port)
+    # Aufwärmen
+    await run_level(host, port, args.path, 1, 0.5, args.batch)
+    rows = []
+    for c in args.concurrency:
+        r = await run_level(host, port, args.path, c, args.duration, args.batch)
+        rows.append(r)
+        print(f"{args.path:<10} c={c:<5} {r['rps']:>9,.0f} req/s  p50 {r['p50_ms']:8.2f} ms  "
+              f"p99 {r['p99_ms']:8.2f} ms  ({r['requests']:,} Requests, {r['errors']} Fehler)", file=sys.stderr)
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Lasttest für den Analyse-Dienst")
+    ap.add_argument("--url", default="http://127.0.0.1:8765")
+    ap.add_argument("--path", default="/analysis", choices=["/analysis", "/pdf"])
+    ap.add_argument("--concurrency", type=int, nargs="*", default=[1, 4, 16, 64])
+    ap.add_argument("--duration", type=float, default=3.0, help="Sekunden je Stufe")
+    ap.add_argument("--batch", type=int, default=1, help="Athleten pro Request (Client-Batch, nur /analysis)")
+    ap.add_argument("--spawn", action="store_true", help="service.py für die Dauer des Tests starten")
+    ap.add_argument("--workers", type=int, default=None, help="Worker für --spawn")
+    ap.add_argument("--json", help="Ergebnisse zusätzlich als JSON-Datei")
+    args = ap.parse_args(argv)
+
+    proc = None
+    if args.spawn:
+        u = urlparse(args.url)
+        cmd = [sys.executable, os.path.join(ROOT, "service.py"), "--host", u.hostname, "--port", str(u.port or 80)]
+        if args.workers:
+            cmd += ["--workers", str(args.workers)]
+        # eigene Prozessgruppe: notfalls samt Worker beenden
+        proc = subprocess.Popen(cmd, cwd=os.getcwd(), start_new_session=os.name == "posix")
+    try:
+        rows = asyncio.run(main_async(args))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                if os.name == "posix":
+                    os.killpg(proc.pid, signal.SIGKILL)
+                else:
+                    proc.kill()
+                proc.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "results": rows}, f, indent=2)
+    return 0 if all(r["errors"] == 0 for r in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
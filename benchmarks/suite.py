@@ -0,0 +1,332 @@
+# benchmarks/suite.py — Benchmarks für calculations/*, compute_analysis und PDF-Export
+#
+#   python benchmarks/suite.py --out bench_<commit>.json
+#   python benchmarks/suite.py --quick --max-n 100000
+#   python benchmarks/suite.py --out neu.json --compare alt.json --threshold 1.2
+#
+# Alle Eingaben sind synthetisch und fest (Seed), das VLamax-Exact-Modell kommt
+# aus einer festen Koeffizienten-Datei in einem temporären Arbeitsverzeichnis –
+# Ergebnisse verschiedener Commits sind damit direkt vergleichbar.
+# Ausgabe: JSON mit Metadaten (Commit, Versionen) und einer Zeile pro Messung.
+# Kaltstart der App misst benchmarks/cold_start.py separat (frische Prozesse).
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+
+SEED = 42
+SCHEMA_VERSION = 1
+
+# Feste Koeffizienten (FFM, Sprintdauer, Ø20s, Peak20s, Frau) für das Exact-Modell
+SYNTHETIC_VLAMAX_MODEL = {
+    "features": ["FFM", "Sprintdauer (s)", "Watt Durchschnitt", "Watt Peak", "Geschlecht_code"],
+    "coef": [-0.0061, 0.0112, 0.00071, 0.00012, -0.012],
+    "intercept": 0.21,
+}
+
+ATHLETE = dict(
+    gender="Mann", weight=72.0, bodyfat=11.5, birth_date="1995-01-01", hfmax=190,
+    p1min=560.0, p3min=410.0, p5min=372.0, p12min=318.0,
+    sprint_dur=20.0, avg20=820.0, peak20=1180.0,
+)
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000, 100_000, 1_000_000]
+
+
+def synthetic_athletes(n, seed=SEED):
+    """n plausible Athleten als Spalten-Dict (für compute_analysis_batch)."""
+    rng = np.random.default_rng(seed)
+    p12 = rng.uniform(200, 360, n)
+    return {
+        "gender": np.where(rng.random(n) < 0.3, "Frau", "Mann"),
+        "weight": rng.uniform(50, 95, n),
+        "bodyfat": rng.uniform(6, 25, n),
+        "sprint_dur": rng.integers(10, 31, n).astype(float),
+        "avg20": rng.uniform(500, 1200, n),
+        "peak20": rng.uniform(800, 1700, n),
+        "p1min": p12 * rng.uniform(1.6, 2.1, n),
+        "p3min": p12 * rng.uniform(1.2, 1.4, n),
+        "p5min": p12 * rng.uniform(1.1, 1.2, n),
+        "p12min": p12,
+    }
+
+
+# -----------------------------
+# Messung
+# -----------------------------
+def _measure(fn, repeat=5, min_time=0.2):
+    """Sekunden pro Aufruf: timeit-Autorange, dann `repeat` Wiederholungen (min/median)."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {"seconds_min": min(runs), "seconds_median": statistics.median(runs), "loops": number}
+
+
+def _record(results, group, name, stats, n=1, **extra):
+    row = {"group": group, "name": name, "n": n, **stats}
+    row["ops_per_s"] = n / stats["seconds_median"] if stats["seconds_median"] > 0 else None
+    row.update(extra)
+    results.append(row)
+    per = stats["seconds_median"] / n
+    print(f"  {group:<8} {name:<38} n={n:<8} {per * 1e6:>12.2f} µs/op  {row['ops_per_s']:>14,.0f} ops/s",
+          file=sys.stderr)
+    return row
+
+
+def bench_micro(results, repeat):
+    from calculations.critical_power import calc_critical_power, corrected_ftp
+    from calculations.vo2max import calc_vo2max_result
+    from calculations.vlamax import calc_vlamax
+    from calculations.vlamax_exact import calc_vlamax_exact_with_ffm
+    from calculations.vlamax_kona_calibrated import calc_vlamax_kona_calibrated
+    from calculations.zones import calc_zones, calc_zone_table, calc_ga1_zone
+
+    a = ATHLETE
+    ffm = a["weight"] * (1 - a["bodyfat"] / 100.0)
+    cp, wp = calc_critical_power(p1min=a["p1min"], p3min=a["p3min"], p5min=a["p5min"], p12min=a["p12min"])
+    vlamax = calc_vlamax(ffm, a["avg20"], a["peak20"], a["sprint_dur"], a["gender"])
+    fatmax_w = 0.62 * cp
+
+    cases = {
+        "calc_critical_power": lambda: calc_critical_power(
+            p1min=a["p1min"], p3min=a["p3min"], p5min=a["p5min"], p12min=a["p12min"]),
+        "calc_vo2max_result": lambda: calc_vo2max_result(
+            a["p5min"], a["weight"], a["gender"], p3min_w=a["p3min"], p12min_w=a["p12min"]),
+        "calc_vlamax[classic]": lambda: calc_vlamax(ffm, a["avg20"], a["peak20"], a["sprint_dur"], a["gender"]),
+        "calc_vlamax[exact]": lambda: calc_vlamax_exact_with_ffm(
+            ffm, a["avg20"], a["peak20"], a["sprint_dur"], a["gender"]),
+        "calc_vlamax[kona_calibrated]": lambda: calc_vlamax_kona_calibrated(
+            ffm, a["avg20"], a["peak20"], a["sprint_dur"], 62.0, a["p5min"], a["p12min"], a["gender"]),
+        "calc_zones": lambda: calc_zones(cp, a["hfmax"], fatmax_w, vlamax),
+        "calc_zone_table": lambda: calc_zone_table(cp, a["hfmax"], fatmax_w, vlamax),
+        "calc_ga1_zone": lambda: calc_ga1_zone(fatmax_w, cp, vlamax),
+        "corrected_ftp": lambda: corrected_ftp(cp, vlamax),
+    }
+    for name, fn in cases.items():
+        _record(results, "micro", name, _measure(fn, repeat))
+
+
+def bench_analysis(results, repeat):
+    from analysis import ANALYSIS_STAGES, UNCERTAINTY_DRAWS, compute_analysis, compute_uncertainty
+    from utils.stage_graph import StageGraph
+
+    _record(results, "e2e", "compute_analysis", _measure(lambda: compute_analysis(dict(ATHLETE)), repeat))
+
+    # Stufen-Memo: alle Stufen Treffer bzw. nur hfmax geändert (→ nur "zones" neu)
+    graph = StageGraph(ANALYSIS_STAGES)
+    compute_analysis(dict(ATHLETE), graph=graph)
+    _record(results, "e2e", "compute_analysis[memo_hit]",
+            _measure(lambda: compute_analysis(dict(ATHLETE), graph=graph), repeat))
+    hf = iter(range(10**9))
+    _record(results, "e2e", "compute_analysis[memo_hfmax]",
+            _measure(lambda: compute_analysis({**ATHLETE, "hfmax": 100 + next(hf)}, graph=graph), repeat))
+    _record(results, "e2e", "compute_uncertainty", _measure(lambda: compute_uncertainty(dict(ATHLETE)), repeat),
+            n=UNCERTAINTY_DRAWS)
+
+    # Pacing: 200 km in 10-m-Abschnitten, Tabelle je Setup vorab (wie auf der Seite gecacht)
+    from calculations.pacing import RiderSetup, build_speed_table, course_segments, demo_course, optimize_pacing
+
+    setup = RiderSetup(mass_kg=80.0)
+    table = build_speed_table(setup, 420.0)
+    length, grade = course_segments(*demo_course(200.0))
+    _record(results, "e2e", "optimize_pacing[200km]",
+            _measure(lambda: optimize_pacing(length, grade, 280.0, 18_000.0, setup, 240.0, 420.0, 0.0, table), repeat),
+            n=len(length))
+
+
+def bench_pdf(results, repeat, backends, n_reports=40):
+    import pdf_export
+
+    data = synthetic_athletes(n_reports, seed=SEED + 1)
+    jobs = []
+    for i in range(n_reports):
+        cp = float(data["p12min"][i]) * 0.95
+        jobs.append((
+            f"Athlet {i}", 55.0 + i % 20, 0.3 + (i % 10) * 0.05, cp, 18000.0 + 100 * i, 0.62 * cp,
+            (0.55 * cp, 0.72 * cp), (0.72 * cp, 0.9 * cp),
+            [(60, float(data["p1min"][i])), (180, float(data["p3min"][i])),
+             (300, float(data["p5min"][i])), (720, float(data["p12min"][i]))],
+        ))
+
+    saved = pdf_export.PDF_CHART_BACKEND
+    try:
+        for backend in backends:
+            pdf_export.PDF_CHART_BACKEND = backend
+            if pdf_export._chart_backend() != backend:
+                print(f"  pdf      Backend {backend} nicht verfügbar – übersprungen", file=sys.stderr)
+                continue
+            pdf_export.clear_pdf_cache()
+            pdf_export._render_pdf_bytes(*jobs[0])  # Fonts/Imports aufwärmen
+
+            runs, sizes = [], []
+            for _ in range(repeat):
+                pdf_export.clear_pdf_cache()  # ungecachte Diagramme messen
+                t0 = time.perf_counter()
+                sizes = [len(pdf_export._render_pdf_bytes(*job)) for job in jobs]
+                runs.append((time.perf_counter() - t0) / n_reports)
+            stats = {"seconds_min": min(runs), "seconds_median": statistics.median(runs), "loops": n_reports}
+            mean_bytes = sum(sizes) / len(sizes)
+            _record(results, "pdf", f"render[{backend}]", stats,
+                    bytes_per_pdf=mean_bytes, bytes_per_s=mean_bytes / stats["seconds_median"])
+
+            pdf_export.clear_pdf_cache()
+            pdf_export.create_analysis_pdf_bytes(*jobs[0][:-1], pts=jobs[0][-1])
+            hit = _measure(lambda: pdf_export.create_analysis_pdf_bytes(*jobs[0][:-1], pts=jobs[0][-1]), repeat)
+            _record(results, "pdf", f"cache_hit[{backend}]", hit)
+    finally:
+        pdf_export.PDF_CHART_BACKEND = saved
+        pdf_export.clear_pdf_cache()
+
+
+def bench_batch(results, max_n, quick):
+    from analysis import compute_analysis_batch
+    from calculations.power_models import fit_power_models_batch
+    from calculations.zones import calc_zones_batch
+    from utils.wbal import wbal_series
+
+    for n in (s for s in BATCH_SIZES if s <= max_n):
+        data = synthetic_athletes(n)
+        rep = 1 if n >= 100_000 or quick else 3
+        min_time = 0.05 if quick else 0.2
+        stats = _measure(lambda: compute_analysis_batch(data), repeat=rep, min_time=min_time)
+        _record(results, "batch", "compute_analysis_batch", stats, n=n)
+
+        cp = data["p12min"] * 0.95
+        stats = _measure(lambda: calc_zones_batch(cp, 0.62 * cp, data["avg20"] / 2000.0), repeat=rep, min_time=min_time)
+        _record(results, "batch", "calc_zones_batch", stats, n=n)
+
+        if n <= 100_000:  # LM-Iterationen: deutlich teurer pro Zeile als die geschlossenen Formeln
+            t = np.array([60.0, 180.0, 300.0, 720.0])
+            p = np.column_stack([data["p1min"], data["p3min"], data["p5min"], data["p12min"]])
+            stats = _measure(lambda: fit_power_models_batch(t, p), repeat=1 if n >= 10_000 else rep, min_time=min_time)
+            _record(results, "batch", "fit_power_models_batch", stats, n=n)
+
+        # W′bal: n = Samples eines Leistungs-Streams (1 Mio. ≈ 70 h bei 4 Hz)
+        power = np.clip(np.random.default_rng(0).normal(250.0, 120.0, n), 0.0, None)
+        for method in ("differential", "integral"):
+            stats = _measure(lambda: wbal_series(power, 270.0, 18_000.0, 4.0, method), repeat=rep, min_time=min_time)
+            _record(results, "batch", f"wbal_series[{method}]", stats, n=n)
+
+
+# -----------------------------
+# Metadaten / Vergleich
+# -----------------------------
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _metadata():
+    import importlib
+
+    versions = {}
+    for mod in ("numpy", "pandas", "reportlab", "matplotlib", "streamlit"):
+        try:
+            versions[mod] = importlib.import_module(mod).__version__
+        except Exception:
+            versions[mod] = None
+    return {
+        "schema": SCHEMA_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+        "seed": SEED,
+    }
+
+
+def _key(row):
+    return row["group"], row["name"], row["n"]
+
+
+def compare(new, old, threshold):
+    """Verhältnis neu/alt je Messung (Median pro Op); Liste der Verschlechterungen > threshold."""
+    old_rows = {_key(r): r for r in old["results"]}
+    regressions = []
+    print(f"\nVergleich mit {old['meta'].get('commit') or '?'} (Faktor neu/alt, >1 = langsamer):", file=sys.stderr)
+    for row in new["results"]:
+        prev = old_rows.get(_key(row))
+        if not prev:
+            continue
+        ratio = row["seconds_median"] / prev["seconds_median"]
+        flag = "  ← langsamer" if ratio > threshold else ""
+        print(f"  {row['group']:<8} {row['name']:<38} n={row['n']:<8} {ratio:6.2f}x{flag}", file=sys.stderr)
+        if ratio > threshold:
+            regressions.append({"group": row["group"], "name": row["name"], "n": row["n"], "ratio": ratio})
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark-Suite (JSON-Ausgabe, vergleichbar zwischen Commits)")
+    ap.add_argument("--out", help="JSON-Datei (Default: stdout)")
+    ap.add_argument("--compare", help="frühere JSON-Datei zum Vergleich")
+    ap.add_argument("--threshold", type=float, default=1.25, help="Faktor, ab dem --compare fehlschlägt")
+    ap.add_argument("--only", nargs="*", choices=["micro", "e2e", "pdf", "batch"], help="nur diese Gruppen")
+    ap.add_argument("--max-n", type=int, default=1_000_000, help="größte Batch-Größe")
+    ap.add_argument("--pdf-backends", nargs="*", default=["vector", "matplotlib"])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--quick", action="store_true", help="weniger Wiederholungen (Smoke-Test)")
+    args = ap.parse_args(argv)
+
+    groups = set(args.only or ["micro", "e2e", "pdf", "batch"])
+    repeat = 2 if args.quick else args.repeat
+    results = []
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        # Festes Exact-Modell + PDF-Disk-Cache im temporären Verzeichnis
+        with open(os.path.join(tmp, "vlamax_model.json"), "w", encoding="utf-8") as f:
+            json.dump(SYNTHETIC_VLAMAX_MODEL, f)
+        os.chdir(tmp)
+        try:
+            from calculations.vlamax_exact import clear_model_cache
+            clear_model_cache()
+            if "micro" in groups:
+                bench_micro(results, repeat)
+            if "e2e" in groups:
+                bench_analysis(results, repeat)
+            if "pdf" in groups:
+                bench_pdf(results, repeat, args.pdf_backends, n_reports=10 if args.quick else 40)
+            if "batch" in groups:
+                bench_batch(results, args.max_n, args.quick)
+        finally:
+            os.chdir(cwd)
+
+    report = {"meta": _metadata(), "results": results}
+    status = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        report["regressions"] = compare(report, old, args.threshold)
+        status = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 import numpy as np
 
+from utils.numeric import round_half_even
+
 def calc_critical_power(p1min=None, p3min=None, p5min=None, p12min=None):
     """
     Klassische CP/W′ Schätzung:
@@ -43,12 +45,18 @@ def calc_critical_power(p1min=None, p3min=None, p5min=None, p12min=None):
         return round(cp, 1), round(max(0.0, wp), 1)
 
     # --- Klassischer Fit: P = a*(1/t) + b ---
-    t = np.array([tt for tt, _ in pts], dtype=float)
-    P = np.array([pp for _, pp in pts], dtype=float)
-
-    inv_t = 1.0 / t
-    X = np.vstack([inv_t, np.ones_like(inv_t)]).T
-    a, b = np.linalg.lstsq(X, P, rcond=None)[0]
+    # Geschlossene Form der 2-Parameter-Regression (identisch zu lstsq, aber
+    # ohne SVD und mit derselben Rechenreihenfolge wie der Batch-Pfad)
+    inv_t = [1.0 / tt for tt, _ in pts]
+    P = [pp for _, pp in pts]
+    n = len(pts)
+
+    x_mean = sum(inv_t) / n
+    p_mean = sum(P) / n
+    dx = [x - x_mean for x in inv_t]
+    dp = [p - p_mean for p in P]
+    a = sum(u * v for u, v in zip(dx, dp)) / sum(u * u for u in dx)
+    b = p_mean - a * x_mean
 
     wp = max(0.0, float(a))
     cp = max(0.0, float(b))
@@ -62,6 +70,68 @@ def calc_critical_power(p1min=None, p3min=None, p5min=None, p12min=None):
     return round(cp, 1), round(wp, 1)
 
 
+CP_TEST_DURATIONS = np.array([180.0, 300.0, 720.0])  # 3/5/12 min
+
+
+def _as_test_array(x, n=None):
+    """None/NaN/<=0 → 0.0 (fehlender Test); maskierte Einträge ebenfalls 0.0."""
+    if x is None:
+        return np.zeros(n or 0)
+    if np.ma.isMaskedArray(x):
+        x = np.ma.filled(x.astype(float), 0.0)
+    x = np.asarray(x, dtype=float)
+    return np.where(np.isfinite(x) & (x > 0), x, 0.0)
+
+
+def calc_critical_power_batch(p1min=None, p3min=None, p5min=None, p12min=None):
+    """
+    Vektorisierte Variante von calc_critical_power für N Athleten/Tests.
+
+    Eingaben: Arrays gleicher Länge (fehlende Tests als 0, NaN oder maskiert).
+    Es gelten dieselben Regeln wie im Einzelpfad: geschlossene 2-Parameter-
+    Regression P = CP + W′/t über die vorhandenen 3/5/12-min-Punkte, Fallback
+    CP = 0.98 * P12 bei < 2 Punkten, 1min nur als W′-Anker (70/30-Blend).
+
+    Rückgabe: (cp, w_prime, residuals) — residuals hat Form (N, 3) für 3/5/12 min
+    (gemessen − Modell mit den gerundeten CP/W′, NaN wo kein Test vorliegt).
+    """
+    cols = [x for x in (p1min, p3min, p5min, p12min) if x is not None]
+    n = len(np.atleast_1d(cols[0])) if cols else 0
+    P1, P3, P5, P12 = (np.atleast_1d(_as_test_array(x, n)) for x in (p1min, p3min, p5min, p12min))
+
+    P = np.column_stack([P3, P5, P12])
+    m = P > 0
+    k = m.sum(axis=1)
+
+    # --- Klassischer Fit: P = a*(1/t) + b (Summen über maskierte Punkte) ---
+    x = np.where(m, 1.0 / CP_TEST_DURATIONS, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = x.sum(axis=1) / k
+        p_mean = P.sum(axis=1) / k
+        dx = np.where(m, x - x_mean[:, None], 0.0)
+        dp = np.where(m, P - p_mean[:, None], 0.0)
+        a = (dx * dp).sum(axis=1) / (dx * dx).sum(axis=1)
+    b = p_mean - a * x_mean
+
+    fit = k >= 2
+    wp = np.where(fit, np.maximum(0.0, a), 0.0)
+    cp = np.where(fit, np.maximum(0.0, b), np.maximum(0.0, 0.98 * P12))
+
+    # 1min nur als W′-Anker (ohne CP zu ändern); im Fallback ersetzt er W′
+    wp_1 = (P1 - cp) * 60.0
+    anchor = (P1 > 0) & (wp_1 > 0)
+    wp = np.where(anchor & fit, 0.7 * wp + 0.3 * wp_1, wp)
+    wp = np.where(anchor & ~fit, wp_1, wp)
+
+    # < 2 CP-Punkte und kein 12min → wirklich nicht genug Daten
+    none = ~fit & ~(P12 > 0)
+    cp = round_half_even(np.where(none, 0.0, cp), 1)
+    wp = round_half_even(np.where(none, 0.0, np.maximum(0.0, wp)), 1)
+
+    residuals = np.where(m, P - (cp[:, None] + (wp[:, None] / CP_TEST_DURATIONS)), np.nan)
+    return cp, wp, residuals
+
+
 def corrected_ftp(cp: float, vlamax: float = None) -> float:
     """
     FTP als praxisnahe 60-min-Leistung aus CP,
@@ -0,0 +1,351 @@
+# calculations/pacing.py
+# Pacing-Plan für eine Strecke (Steigungs-/Distanzprofil) aus CP und W′.
+#
+# Ziel: minimale Fahrzeit bei gleicher Arbeit (kJ) wie gleichmäßiges Fahren mit der
+# Ziel-Leistung, ohne dass W′bal (Skiba, Differentialform) unter die Reserve fällt.
+#
+#   Physik (stationär je Abschnitt):  η·P = v·(m·g·(sin θ + Crr·cos θ) + ½·ρ·CdA·(v + Wind)²)
+#   Lagrange-Kosten je Meter:         (1 + μ·P + λ·(P − CP)⁺) / v(P, θ)
+#
+# v(P, θ) kommt aus einer vorab berechneten Geschwindigkeits-Leistungs-Tabelle je
+# Fahrer/Rad-Setup (Steigung in 0,1-%-Schritten × Leistung in 2-W-Schritten). Die
+# optimale Leistung hängt dann nur von der Steigungsklasse ab: je (λ, μ) ein argmin
+# über die Tabelle (nur Klassen, die auf der Strecke vorkommen), μ per Bisektion auf
+# das Arbeitsbudget, λ per Bisektion auf W′bal ≥ Reserve. Nur die W′bal-Prüfung läuft
+# über alle Abschnitte (vektorisiert) — 200 km in 10-m-Abschnitten deutlich < 1 s.
+#
+# Ein λ für die ganze Strecke ist konservativ: Anstiege nach dem W′bal-Tiefpunkt
+# dürften etwas härter gefahren werden. Beschleunigungen sind nicht modelliert.
+from dataclasses import astuple, dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+from utils.wbal import wbal_segments
+
+G = 9.80665
+SEGMENT_M = 10.0
+GRADE_STEP = 0.001       # 0,1 %
+GRADE_LIMIT = 0.25       # Tabelle von −25 % bis +25 %
+POWER_STEP_W = 2.0
+MIN_SPEED_MS = 0.5       # Schieben/Stehen wird nicht modelliert
+_BISECT_ITER = 40
+
+
+@dataclass(frozen=True)
+class RiderSetup:
+    """Fahrer + Rad; mass_kg = Systemmasse (Fahrer, Rad, Ausrüstung)."""
+    mass_kg: float
+    cda_m2: float = 0.32
+    crr: float = 0.004
+    rho: float = 1.20
+    efficiency: float = 0.975
+    headwind_ms: float = 0.0
+    v_max_ms: float = 70.0 / 3.6   # Abfahrten: schneller wird gebremst
+
+
+# -----------------------------
+# Physik
+# -----------------------------
+def speed_from_power(power, grade, setup: RiderSetup) -> np.ndarray:
+    """
+    Stationäre Geschwindigkeit (m/s) für Leistung P und Steigung (Anteil, 0.05 = 5 %).
+    Löst η·P/v = m·g·(sin θ + Crr·cos θ) + ½ρCdA·(v + Wind)·|v + Wind| per Bisektion —
+    die rechte minus linke Seite steigt streng in v, daher genau eine Nullstelle.
+    """
+    p = np.asarray(power, dtype=float)
+    theta = np.arctan(np.asarray(grade, dtype=float))
+    a = setup.mass_kg * G * (np.sin(theta) + setup.crr * np.cos(theta))
+    k = 0.5 * setup.rho * setup.cda_m2
+    pe = setup.efficiency * np.maximum(p, 0.0)
+    a, pe = np.broadcast_arrays(a, pe)
+
+    lo = np.full(a.shape, 1e-3)
+    hi = np.full(a.shape, max(setup.v_max_ms, 1.0) * 2.0)
+    for _ in range(_BISECT_ITER):
+        v = 0.5 * (lo + hi)
+        air = v + setup.headwind_ms
+        h = a + k * air * np.abs(air) - pe / v
+        up = h > 0
+        hi = np.where(up, v, hi)
+        lo = np.where(up, lo, v)
+    return np.clip(0.5 * (lo + hi), MIN_SPEED_MS, setup.v_max_ms)
+
+
+def power_from_speed(speed, grade, setup: RiderSetup) -> np.ndarray:
+    """Benötigte Leistung (W) für Geschwindigkeit v; negativ = es müsste gebremst werden."""
+    v = np.asarray(speed, dtype=float)
+    theta = np.arctan(np.asarray(grade, dtype=float))
+    air = v + setup.headwind_ms
+    f = setup.mass_kg * G * (np.sin(theta) + setup.crr * np.cos(theta)) + 0.5 * setup.rho * setup.cda_m2 * air * np.abs(air)
+    return v * f / setup.efficiency
+
+
+@dataclass(frozen=True)
+class SpeedPowerTable:
+    """v(P, Steigung) auf festem Raster; einmal je Setup berechnen und wiederverwenden."""
+    setup: RiderSetup
+    grades: np.ndarray    # (n_g,)
+    powers: np.ndarray    # (n_p,)
+    speed: np.ndarray     # (n_g, n_p) m/s
+
+    def grade_index(self, grade) -> np.ndarray:
+        g = np.clip(np.asarray(grade, dtype=float), self.grades[0], self.grades[-1])
+        return np.rint((g - self.grades[0]) / GRADE_STEP).astype(int)
+
+    def power_index(self, power) -> np.ndarray:
+        p = np.clip(np.asarray(power, dtype=float), self.powers[0], self.powers[-1])
+        return np.rint((p - self.powers[0]) / POWER_STEP_W).astype(int)
+
+
+def build_speed_table(setup: RiderSetup, p_max: float, grade_limit: float = GRADE_LIMIT) -> SpeedPowerTable:
+    n_g = int(round(2 * grade_limit / GRADE_STEP)) + 1
+    grades = np.linspace(-grade_limit, grade_limit, n_g)
+    powers = np.arange(0.0, float(p_max) + POWER_STEP_W / 2, POWER_STEP_W)
+    speed = speed_from_power(powers[None, :], grades[:, None], setup)
+    return SpeedPowerTable(setup, grades, powers, speed)
+
+
+# -----------------------------
+# Strecke
+# -----------------------------
+_DIST_COLUMNS = ("distance_m", "distance", "dist", "distanz", "strecke", "distance_km", "km")
+_ELE_COLUMNS = ("elevation_m", "elevation", "altitude", "ele", "höhe", "hoehe", "hoehe_m", "höhe (m)")
+_GRADE_COLUMNS = ("grade", "grade_pct", "gradient", "slope", "steigung", "steigung (%)", "steigung_pct")
+
+
+def _column(columns, candidates):
+    lower = {str(c).strip().lower(): c for c in columns}
+    return next((lower[c] for c in candidates if c in lower), None)
+
+
+def read_course(source):
+    """
+    Streckenprofil aus CSV: Distanz (m, bei Spaltennamen mit "km" in km) und
+    Höhe (m) oder Steigung (%, bei |Werten| ≤ 1 als Anteil). Rückgabe (distance_m, elevation_m, grade).
+    """
+    import pandas as pd
+
+    df = pd.read_csv(source)
+    dcol = _column(df.columns, _DIST_COLUMNS)
+    ecol = _column(df.columns, _ELE_COLUMNS)
+    gcol = _column(df.columns, _GRADE_COLUMNS)
+    if dcol is None or (ecol is None and gcol is None):
+        raise ValueError("CSV braucht eine Distanz- und eine Höhen- oder Steigungsspalte "
+                         "(z. B. distance_km + elevation_m oder distance_m + grade).")
+    dist = pd.to_numeric(df[dcol], errors="coerce").to_numpy(dtype=float)
+    if "km" in str(dcol).lower():
+        dist = dist * 1000.0
+    ele = grade = None
+    if ecol is not None:
+        ele = pd.to_numeric(df[ecol], errors="coerce").to_numpy(dtype=float)
+    else:
+        grade = pd.to_numeric(df[gcol], errors="coerce").to_numpy(dtype=float)
+        if np.nanmax(np.abs(grade)) > 1.0:
+            grade = grade / 100.0
+    ok = np.isfinite(dist) & np.isfinite(ele if ele is not None else grade)
+    return dist[ok], (ele[ok] if ele is not None else None), (grade[ok] if grade is not None else None)
+
+
+def course_segments(distance_m, elevation_m=None, grade=None, segment_m: float = SEGMENT_M):
+    """
+    Profil auf gleich lange Abschnitte bringen → (Länge je Abschnitt, Steigung je Abschnitt).
+    Höhe wird an den Abschnittsgrenzen interpoliert; eine Steigung gilt bis zum nächsten Profilpunkt.
+    """
+    d = np.asarray(distance_m, dtype=float)
+    order = np.argsort(d, kind="stable")
+    d = d[order] - d[order][0]
+    total = float(d[-1]) if d.size else 0.0
+    if total <= 0:
+        raise ValueError("Strecke hat keine Länge.")
+    edges = np.append(np.arange(0.0, total, segment_m), total)
+    length = np.diff(edges)
+    if elevation_m is not None:
+        h = np.interp(edges, d, np.asarray(elevation_m, dtype=float)[order])
+        seg_grade = np.diff(h) / length
+    else:
+        g = np.asarray(grade, dtype=float)[order]
+        mid = 0.5 * (edges[:-1] + edges[1:])
+        seg_grade = g[np.clip(np.searchsorted(d, mid, side="right") - 1, 0, g.size - 1)]
+    keep = length > 1e-9
+    return length[keep], seg_grade[keep]
+
+
+def demo_course(length_km: float = 60.0, seed: int = 7):
+    """Welliges Beispielprofil mit einem längeren Anstieg (Distanz m, Höhe m)."""
+    rng = np.random.default_rng(seed)
+    d = np.arange(0.0, length_km * 1000.0 + 1.0, 100.0)
+    x = d / (length_km * 1000.0)
+    climb = 450.0 / (1.0 + np.exp(-(x - 0.55) * 40)) - 450.0 / (1.0 + np.exp(-(x - 0.72) * 30))
+    rolling = 25.0 * np.sin(d / 1800.0) + 12.0 * np.sin(d / 650.0 + 1.3)
+    noise = np.convolve(rng.normal(0.0, 1.0, d.size), np.ones(15) / 15, mode="same") * 8.0
+    return d, 200.0 + climb + rolling + noise
+
+
+# -----------------------------
+# Optimierung
+# -----------------------------
+@dataclass
+class PacingPlan:
+    distance_m: np.ndarray   # Ende jedes Abschnitts
+    length_m: np.ndarray
+    grade: np.ndarray
+    power: np.ndarray
+    speed: np.ndarray
+    time_s: np.ndarray
+    wbal: np.ndarray         # W′bal am Abschnittsende
+    cp: float
+    w_prime: float
+    target_w: float
+    even_time_s: float       # gleiche Arbeit, konstante Ziel-Leistung
+    lam: float
+    mu: float
+
+    @property
+    def total_time_s(self) -> float:
+        return float(self.time_s.sum())
+
+    @property
+    def work_kj(self) -> float:
+        return float(self.power @ self.time_s) / 1000.0
+
+    def summary(self) -> Dict[str, float]:
+        t = self.total_time_s
+        return {
+            "distance_km": float(self.distance_m[-1]) / 1000.0 if self.distance_m.size else 0.0,
+            "time_s": t,
+            "even_time_s": self.even_time_s,
+            "saved_s": self.even_time_s - t,
+            "avg_power_w": self.work_kj * 1000.0 / t if t > 0 else 0.0,
+            "max_power_w": float(self.power.max()) if self.power.size else 0.0,
+            "avg_speed_kmh": float(self.distance_m[-1]) / t * 3.6 if t > 0 else 0.0,
+            "work_kj": self.work_kj,
+            "min_wbal_j": float(self.wbal.min()) if self.wbal.size else self.w_prime,
+        }
+
+    def per_km(self, step_m: float = 1000.0):
+        """Plan je Kilometer (bzw. step_m): Steigung, Ø-Leistung, Zeit, W′bal am Ende."""
+        import pandas as pd
+
+        start = self.distance_m - self.length_m
+        bucket = (start // step_m).astype(int)
+        df = pd.DataFrame({
+            "bucket": bucket, "len": self.length_m, "rise": self.grade * self.length_m,
+            "work": self.power * self.time_s, "t": self.time_s, "wbal": self.wbal,
+        })
+        agg = df.groupby("bucket").agg(len=("len", "sum"), rise=("rise", "sum"), work=("work", "sum"),
+                                       t=("t", "sum"), wbal=("wbal", "last"))
+        return pd.DataFrame({
+            "km": (agg.index + 1) * step_m / 1000.0,
+            "Steigung (%)": (agg["rise"] / agg["len"] * 100).round(1),
+            "Leistung (W)": (agg["work"] / agg["t"]).round(0),
+            "Tempo (km/h)": (agg["len"] / agg["t"] * 3.6).round(1),
+            "Zeit (s)": agg["t"].round(0),
+            "W′bal (J)": agg["wbal"].round(0),
+        }).reset_index(drop=True)
+
+
+def _policy(tau, powers, cp, lam, mu):
+    """Beste Leistungsstufe je Steigungsklasse für (λ, μ); Gleichstand → niedrigste Leistung."""
+    price = 1.0 + mu * powers + lam * np.maximum(powers - cp, 0.0)
+    return np.argmin(tau * price, axis=1)
+
+
+def optimize_pacing(length_m, grade, cp: float, w_prime: float, setup: RiderSetup,
+                    target_w: Optional[float] = None, p_max: Optional[float] = None,
+                    reserve_j: float = 0.0, table: Optional[SpeedPowerTable] = None) -> PacingPlan:
+    """
+    Leistung je Abschnitt für minimale Zeit.
+
+    target_w: Ziel-Leistung für gleichmäßiges Fahren (Default und Obergrenze CP – darüber
+        wäre schon gleichmäßiges Fahren nicht haltbar); das Arbeitsbudget ist die Arbeit,
+        die gleichmäßiges Fahren mit target_w auf dieser Strecke kostet.
+    p_max: höchste erlaubte Leistung (Default 1,5 × CP; bestimmt auch die Tabelle).
+    reserve_j: W′bal darf nie unter diesen Wert fallen (sonst ValueError).
+    table: vorab berechnete SpeedPowerTable (muss bis p_max reichen).
+    """
+    if cp <= 0 or w_prime <= 0:
+        raise ValueError("CP und W′ müssen > 0 sein.")
+    length = np.asarray(length_m, dtype=float)
+    grade = np.asarray(grade, dtype=float)
+    target_w = float(cp if target_w is None else min(target_w, cp))
+    p_max = float(p_max or 1.5 * cp)
+    if table is None or table.powers[-1] + 1e-9 < p_max or table.setup != setup:
+        table = build_speed_table(setup, p_max)
+    n_p = int(table.power_index(p_max)) + 1
+    powers = table.powers[:n_p]
+
+    gi = table.grade_index(grade)
+    rows, inv = np.unique(gi, return_inverse=True)
+    meters = np.bincount(inv, weights=length)            # Meter je Steigungsklasse
+    tau = 1.0 / table.speed[rows, :n_p]                  # s/m
+    energy = powers * tau                                # J/m
+
+    # Arbeitsbudget = gleichmäßig mit target_w
+    pi_even = int(table.power_index(target_w))
+    even_t = length * tau[inv, pi_even]
+    budget = float(meters @ energy[:, pi_even])
+
+    def work(lam, mu):
+        k = _policy(tau, powers, cp, lam, mu)
+        return float(meters @ energy[np.arange(rows.size), k]), k
+
+    def solve_mu(lam):
+        w, k = work(lam, 0.0)
+        if w <= budget:
+            return 0.0, k
+        lo, hi = 0.0, 1e-3
+        while work(lam, hi)[0] > budget:
+            lo, hi = hi, hi * 4.0
+        for _ in range(_BISECT_ITER):
+            mid = 0.5 * (lo + hi)
+            if work(lam, mid)[0] > budget:
+                lo = mid
+            else:
+                hi = mid
+        return hi, work(lam, hi)[1]
+
+    def evaluate(k):
+        pw = powers[k][inv]
+        t = length * tau[inv, k[inv]]
+        return pw, t, wbal_segments(pw, t, cp, w_prime)
+
+    def feasible(lam):
+        mu, k = solve_mu(lam)
+        pw, t, wb = evaluate(k)
+        return wb.min() >= reserve_j, mu, (pw, t, wb)
+
+    lam = 0.0
+    ok, mu, res = feasible(lam)
+    if not ok:
+        lo, hi = 0.0, 1e-3
+        ok, mu, res = feasible(hi)
+        while not ok and hi < 1e6:
+            lo, hi = hi, hi * 4.0
+            ok, mu, res = feasible(hi)
+        if not ok:
+            raise ValueError(f"W′-Reserve von {reserve_j:.0f} J ist auf dieser Strecke nicht haltbar "
+                             f"(W′ = {w_prime:.0f} J) – Reserve oder Ziel-Leistung senken.")
+        for _ in range(_BISECT_ITER // 2 + 10):
+            if hi - lo <= 1e-4 * hi:
+                break
+            mid = 0.5 * (lo + hi)
+            ok_mid, mu_mid, res_mid = feasible(mid)
+            if ok_mid:
+                hi, mu, res = mid, mu_mid, res_mid
+            else:
+                lo = mid
+        lam = hi
+
+    pw, t, wb = res
+    return PacingPlan(
+        distance_m=np.cumsum(length), length_m=length, grade=grade, power=pw,
+        speed=np.divide(length, t, out=np.zeros_like(length), where=t > 0), time_s=t, wbal=wb,
+        cp=float(cp), w_prime=float(w_prime), target_w=target_w, even_time_s=float(even_t.sum()),
+        lam=lam, mu=mu,
+    )
+
+
+def setup_key(setup: RiderSetup):
+    """Hashbarer Schlüssel (z. B. für st.cache_data)."""
+    return astuple(setup)
@@ -0,0 +1,283 @@
+# calculations/power_models.py
+# Leistungs-Dauer-Modelle P(t) und Modellwahl per AIC/BIC.
+#
+#   cp2  2-Parameter, hyperbolisch      P = CP + W′/t                       (geschlossen)
+#   cp3  3-Parameter (Morton)           P = CP + W′/(t + W′/(Pmax − CP))
+#   exp  exponentiell                   P = CP + (Pmax − CP)·e^(−t/τ),  τ = W′/(Pmax − CP)
+#   pt   Peronnet–Thibault (≤ 30 min)   P = CP·(1 − e^(−t/τ₂)) + W′/t·(1 − e^(−t·Pmax/W′)),  τ₂ = 15 s
+#
+# Dritter Parameter d: cp3/exp d = Pmax − CP, pt d = Pmax selbst (P(t → 0) = Pmax).
+# Die 3-Parameter-Modelle werden für alle Athleten gleichzeitig mit Levenberg–Marquardt
+# gefittet: je Iteration ein gebatchtes 3×3-System (N, 3, 3) statt eines
+# scipy.optimize-Aufrufs pro Athlet. Optimiert wird in log(CP, W′, d) → alle Parameter bleiben positiv.
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+MODELS = ("cp2", "cp3", "exp", "pt")
+MODEL_LABELS = {
+    "cp2": "2-Parameter (hyperbolisch)",
+    "cp3": "3-Parameter (Morton)",
+    "exp": "Exponentiell",
+    "pt": "Peronnet–Thibault",
+}
+N_PARAMS = {"cp2": 2, "cp3": 3, "exp": 3, "pt": 3}
+CRITERIA = ("aic", "bic")
+PT_TAU2_S = 15.0  # Zeitkonstante der aeroben Kinetik (Peronnet & Thibault 1989)
+
+LM_MAX_ITER = 100
+LM_TOL = 1e-9
+_SSE_FLOOR = 1e-12
+
+
+# -----------------------------
+# Modellfunktionen: f(t, CP, W′, d) und Jacobi-Matrix nach (CP, W′, d)
+# -----------------------------
+def _morton(t, cp, wp, d, jac=True):
+    k = wp / d
+    tk = t + k
+    f = cp + wp / tk
+    if not jac:
+        return f, None
+    return f, np.stack([np.ones_like(tk), 1.0 / tk - k / tk**2, (k / tk) ** 2], axis=-1)
+
+
+def _exponential(t, cp, wp, d, jac=True):
+    e = np.exp(-t * d / wp)
+    f = cp + d * e
+    if not jac:
+        return f, None
+    return f, np.stack([np.ones_like(e), e * t * d**2 / wp**2, e * (1.0 - t * d / wp)], axis=-1)
+
+
+def _peronnet_thibault(t, cp, wp, d, jac=True):
+    # d = Pmax (nicht Pmax − CP wie bei cp3/exp)
+    e1 = np.exp(-t * d / wp)  # t / k1 mit k1 = W′/Pmax
+    e2 = np.exp(-t / PT_TAU2_S)
+    f = cp * (1.0 - e2) + wp / t * (1.0 - e1)
+    if not jac:
+        return f, None
+    return f, np.stack([1.0 - e2, (1.0 - e1) / t - e1 * d / wp, e1], axis=-1)
+
+
+_NONLINEAR = {"cp3": _morton, "exp": _exponential, "pt": _peronnet_thibault}
+
+
+def predict_power(model: str, params: Sequence[float], t) -> np.ndarray:
+    """Modellleistung (W) für Dauer(n) t in s; params wie in PowerModelBatchResult.params."""
+    t = np.asarray(t, dtype=float)
+    if model == "cp2":
+        cp, wp = params[:2]
+        return cp + wp / t
+    cp, wp, d = params
+    return _NONLINEAR[model](t, cp, wp, d, jac=False)[0]
+
+
+def _pmax(model, params):
+    # Grenzwert t → 0 (cp2: unbeschränkt)
+    if model == "cp2":
+        return np.full(params.shape[0], np.nan)
+    if model == "pt":
+        return params[:, 2].copy()
+    return params[:, 0] + params[:, 2]
+
+
+# -----------------------------
+# Fits
+# -----------------------------
+def _fit_cp2(t, p, m):
+    """Geschlossene 2-Parameter-Regression P = CP + W′·(1/t) über die maskierten Punkte."""
+    k = m.sum(axis=1)
+    x = np.where(m, 1.0 / t, 0.0)
+    pv = np.where(m, p, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = x.sum(axis=1) / k
+        p_mean = pv.sum(axis=1) / k
+        dx = np.where(m, x - x_mean[:, None], 0.0)
+        dp = np.where(m, pv - p_mean[:, None], 0.0)
+        a = (dx * dp).sum(axis=1) / (dx * dx).sum(axis=1)
+    b = p_mean - a * x_mean
+    return np.column_stack([b, a])
+
+
+def _initial_guess(t, p, m, cp2):
+    """Startwerte aus dem 2-Parameter-Fit, begrenzt auf physiologisch sinnvolle Bereiche."""
+    p_lo = np.where(m, p, np.inf).min(axis=1, initial=np.inf)
+    p_hi = np.where(m, p, -np.inf).max(axis=1, initial=-np.inf)
+    p_lo, p_hi = np.where(np.isfinite(p_lo), p_lo, 1.0), np.where(np.isfinite(p_hi), p_hi, 1.0)
+    cp = np.clip(np.nan_to_num(cp2[:, 0], nan=0.0), 0.5 * p_lo, 0.95 * p_lo)
+    wp = np.clip(np.nan_to_num(cp2[:, 1], nan=0.0), 2000.0, 80000.0)
+    d = np.maximum(1.3 * p_hi - cp, 50.0)
+    return np.log(np.column_stack([cp, wp, d]))
+
+
+def _solve3(A, g):
+    """Gebatchtes 3×3-System A·x = g (Cramer; schneller als np.linalg.solve für viele kleine Systeme)."""
+    a, b, c = A[:, 0, 0], A[:, 0, 1], A[:, 0, 2]
+    e, f, i = A[:, 1, 1], A[:, 1, 2], A[:, 2, 2]  # symmetrisch
+    c00 = e * i - f * f
+    c01 = c * f - b * i
+    c02 = b * f - c * e
+    c11 = a * i - c * c
+    c12 = b * c - a * f
+    c22 = a * e - b * b
+    det = a * c00 + b * c01 + c * c02
+    x0 = c00 * g[:, 0] + c01 * g[:, 1] + c02 * g[:, 2]
+    x1 = c01 * g[:, 0] + c11 * g[:, 1] + c12 * g[:, 2]
+    x2 = c02 * g[:, 0] + c12 * g[:, 1] + c22 * g[:, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.column_stack([x0, x1, x2]) / det[:, None]
+
+
+def _fit_lm(model, t, p, m, u0, max_iter=LM_MAX_ITER, tol=LM_TOL):
+    """
+    Gebatchtes Levenberg–Marquardt in u = log(CP, W′, d).
+    Jede Zeile hat ihr eigenes λ; gerechnet wird je Iteration nur über die
+    noch nicht konvergierten Zeilen.
+    """
+    fn = _NONLINEAR[model]
+
+    def evaluate(u, t, p, m):
+        q = np.exp(u)
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            f, J = fn(t, q[:, 0:1], q[:, 1:2], q[:, 2:3])
+            r = np.where(m, p - f, 0.0)
+            J = np.where(m[..., None], J * q[:, None, :], 0.0)  # Kettenregel d/du = q · d/dq
+        sse = (r * r).sum(axis=1)
+        bad = ~np.isfinite(sse) | ~np.isfinite(J).all(axis=(1, 2))
+        return r, J, np.where(bad, np.inf, sse)
+
+    u = u0.copy()
+    r, J, sse = evaluate(u, t, p, m)
+    lam = np.full(len(u), 1e-3)
+    idx = np.flatnonzero(np.isfinite(sse))
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        Jt = J[idx].transpose(0, 2, 1)
+        A = Jt @ J[idx]
+        g = (Jt @ r[idx][..., None])[..., 0]
+        A[:, [0, 1, 2], [0, 1, 2]] *= 1.0 + lam[idx, None]
+        A[:, [0, 1, 2], [0, 1, 2]] += 1e-12
+        delta = _solve3(A, g)
+        delta = np.where(np.isfinite(delta), np.clip(delta, -2.0, 2.0), 0.0)
+
+        u_new = u[idx] + delta
+        r_new, J_new, sse_new = evaluate(u_new, t[idx], p[idx], m[idx])
+        better = sse_new < sse[idx]
+        gain = np.where(better, sse[idx] - sse_new, 0.0)
+
+        acc = idx[better]
+        u[acc], r[acc], J[acc], sse[acc] = u_new[better], r_new[better], J_new[better], sse_new[better]
+        lam[idx] = np.clip(np.where(better, lam[idx] / 3.0, lam[idx] * 2.0), 1e-12, 1e12)
+
+        done = (better & (gain <= tol * np.maximum(sse[idx], _SSE_FLOOR))) \
+            | (lam[idx] >= 1e12) | (sse[idx] <= _SSE_FLOOR) | (np.abs(delta).max(axis=1) < 1e-10)
+        idx = idx[~done]
+    return np.exp(u), sse
+
+
+@dataclass
+class PowerModelBatchResult:
+    models: Tuple[str, ...]
+    params: Dict[str, np.ndarray]   # je Modell (N, 2|3): cp2 (CP, W′), cp3/exp (CP, W′, Pmax − CP), pt (CP, W′, Pmax)
+    sse: np.ndarray                 # (N, M) Residuenquadratsumme (W²)
+    aic: np.ndarray                 # (N, M), NaN wo n ≤ k
+    bic: np.ndarray                 # (N, M)
+    n_points: np.ndarray            # (N,)
+    best: np.ndarray                # (N,) Index in models, -1 = kein Modell möglich
+    criterion: str
+
+    def best_model(self, i) -> Optional[str]:
+        j = int(self.best[i])
+        return self.models[j] if j >= 0 else None
+
+    def cp(self) -> np.ndarray:
+        return np.column_stack([self.params[m][:, 0] for m in self.models])
+
+    def w_prime(self) -> np.ndarray:
+        return np.column_stack([self.params[m][:, 1] for m in self.models])
+
+    def pmax(self) -> np.ndarray:
+        return np.column_stack([_pmax(m, self.params[m]) for m in self.models])
+
+    def summary(self, i) -> dict:
+        """Ergebnis eines Athleten als dict (wie fit_power_models)."""
+        n = int(self.n_points[i])
+        out = {}
+        for j, name in enumerate(self.models):
+            prm = self.params[name][i]
+            out[name] = {
+                "label": MODEL_LABELS[name],
+                "params": tuple(float(x) for x in prm),
+                "cp": float(prm[0]), "w_prime": float(prm[1]),
+                "pmax": float(_pmax(name, self.params[name][i:i + 1])[0]),
+                "sse": float(self.sse[i, j]),
+                "rmse": float(np.sqrt(self.sse[i, j] / n)) if n else float("nan"),
+                "aic": float(self.aic[i, j]), "bic": float(self.bic[i, j]),
+            }
+        best = self.best_model(i)
+        return {"best": best, "label": MODEL_LABELS.get(best), "criterion": self.criterion,
+                "n_points": n, "models": out}
+
+
+def fit_power_models_batch(t, p, models: Sequence[str] = MODELS, criterion: str = "aic",
+                           max_iter: int = LM_MAX_ITER) -> PowerModelBatchResult:
+    """
+    Alle Modelle für N Athleten fitten und je Athlet per AIC/BIC wählen.
+
+    t: Dauern in s, Form (m,) (für alle gleich) oder (N, m); p: Leistungen (N, m),
+    fehlende Punkte als NaN oder <= 0. Ein Modell mit k Parametern braucht n > k Punkte.
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion muss eines von {CRITERIA} sein")
+    p = np.atleast_2d(np.asarray(p, dtype=float))
+    t = np.broadcast_to(np.asarray(t, dtype=float), p.shape)
+    m = np.isfinite(p) & (p > 0) & np.isfinite(t) & (t > 0)
+    p = np.where(m, p, 1.0)
+    t = np.where(m, t, 1.0)
+    n_pts = m.sum(axis=1)
+    N = p.shape[0]
+
+    cp2 = _fit_cp2(t, p, m)
+    u0 = _initial_guess(t, p, m, cp2) if any(x in _NONLINEAR for x in models) else None
+    params, sse = {}, np.full((N, len(models)), np.nan)
+    for j, name in enumerate(models):
+        if name == "cp2":
+            prm = cp2
+            res = np.where(m, p - (prm[:, 0:1] + prm[:, 1:2] / t), 0.0)
+            s = np.einsum("ij,ij->i", res, res)
+        else:
+            ok = n_pts >= N_PARAMS[name]
+            prm = np.full((N, 3), np.nan)
+            s = np.full(N, np.nan)
+            if ok.any():
+                prm[ok], s[ok] = _fit_lm(name, t[ok], p[ok], m[ok], u0[ok], max_iter=max_iter)
+        # Parameter ab n = k (exakter Fit), Informationskriterien erst ab n > k
+        eligible = n_pts >= N_PARAMS[name]
+        params[name] = np.where(eligible[:, None], prm, np.nan)
+        sse[:, j] = np.where(eligible & np.isfinite(s), s, np.nan)
+
+    k = np.array([N_PARAMS[x] for x in models], dtype=float)
+    n = n_pts[:, None].astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ll = n * np.log(np.maximum(sse, _SSE_FLOOR) / n)
+        aic = np.where(n > k, ll + 2.0 * k, np.nan)
+        bic = np.where(n > k, ll + k * np.log(n), np.nan)
+    score = aic if criterion == "aic" else bic
+    valid = np.isfinite(score)
+    best = np.where(valid.any(axis=1), np.argmin(np.where(valid, score, np.inf), axis=1), -1)
+    if "cp2" in models:
+        # genau 2 Punkte: nur der hyperbolische Fit ist bestimmt
+        j = models.index("cp2")
+        best = np.where((best < 0) & np.isfinite(sse[:, j]), j, best)
+    return PowerModelBatchResult(tuple(models), params, sse, aic, bic, n_pts, best, criterion)
+
+
+def fit_power_models(pts, criterion: str = "aic", models: Sequence[str] = MODELS) -> dict:
+    """Einzelathlet: pts = [(t_s, watt), ...] → summary-dict mit "best" und allen Modellen."""
+    pts = list(pts or [])
+    t = np.array([[float(tt) for tt, _ in pts]]) if pts else np.zeros((1, 0))
+    p = np.array([[float(pp) for _, pp in pts]]) if pts else np.zeros((1, 0))
+    return fit_power_models_batch(t, p, models, criterion).summary(0)
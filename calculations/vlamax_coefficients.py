@@ -0,0 +1,86 @@
+# calculations/vlamax_coefficients.py
+# Koeffizienten der Formel-Modelle (Classic, Kona) – aus der versionierten Datei
+# vlamax_coefficients.json (erzeugt von calibrate_vlamax.py), sonst die
+# ursprünglichen, fest eingetragenen Werte.
+import json
+import os
+import threading
+
+COEFFICIENTS_PATH = "vlamax_coefficients.json"
+COEFFICIENTS_FORMAT = 1
+
+# Reihenfolge = Spalten der Design-Matrix in calibrate_vlamax.py
+DEFAULT_COEFFICIENTS = {
+    # Classic v1.9.2: -0.33217 + 0.05238 * (Avg20/FFM) + 0.01295 * Sprintdauer, Frauen -0.01
+    "classic": {
+        "intercept": -0.33217177131625886,
+        "avg20_per_ffm": 0.05237854,
+        "sprint_dur_s": 0.01295129,
+        "female": -0.01,
+    },
+    "kona": {
+        "intercept": -0.394416084,
+        "avg20_per_ffm": 0.039491880,
+        "peak20_w": 0.000036755,
+        "sprint_dur_s": 0.008563458,
+        "vo2_term": -0.218798931,
+        "ratio_term": -0.100301249,
+        "female": -0.014584308,
+    },
+}
+
+_LOCK = threading.Lock()
+_CACHE = {"key": None, "data": None}
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+def coefficients_signature():
+    return _signature(COEFFICIENTS_PATH)
+
+
+def _load(path):
+    """Datei lesen und prüfen; fehlende/ungültige Modelle fallen einzeln auf die Defaults zurück."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("format") != COEFFICIENTS_FORMAT:
+        raise ValueError(f"{path}: unbekanntes Format {data.get('format')!r}")
+    models = {}
+    for name, default in DEFAULT_COEFFICIENTS.items():
+        coef = (data.get("models") or {}).get(name, {}).get("coef")
+        if isinstance(coef, dict) and set(coef) == set(default):
+            models[name] = {k: float(coef[k]) for k in default}
+        else:
+            models[name] = default
+    return {"version": data.get("version"), "models": models}
+
+
+def get_coefficients(name):
+    """Koeffizienten-dict für "classic"/"kona" (neu geladen nur, wenn sich die Datei ändert)."""
+    key = coefficients_signature()
+    if _CACHE["key"] != key:
+        with _LOCK:
+            if _CACHE["key"] != key:
+                data = None
+                if key is not None:
+                    try:
+                        data = _load(COEFFICIENTS_PATH)
+                    except (OSError, ValueError, TypeError, KeyError):
+                        data = None
+                _CACHE["data"] = data
+                _CACHE["key"] = key
+    data = _CACHE["data"]
+    return data["models"][name] if data else DEFAULT_COEFFICIENTS[name]
+
+
+def coefficients_version():
+    """Version der geladenen Datei oder None (Defaults)."""
+    get_coefficients("classic")
+    data = _CACHE["data"]
+    return data["version"] if data else None
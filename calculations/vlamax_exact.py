@@ -1,40 +1,218 @@
 
 # calculations/vlamax_exact.py
+# Vorhersage braucht nur numpy: das Modell liegt zusätzlich als kleine
+# Koeffizienten-Datei (JSON) vor. pandas/sklearn/joblib werden nur geladen,
+# wenn aus CSV neu trainiert oder eine neuere Joblib-Datei übernommen wird.
+import json
 import os
-import pandas as pd
+import threading
+import time
 import numpy as np
-from sklearn.linear_model import LinearRegression
-import joblib
+
+from calculations.vlamax_coefficients import coefficients_signature
+from utils.numeric import round_half_even
 
 CSV_PATH = "vlamax_testdaten.csv"
 MODEL_PATH = "vlamax_model.joblib"
+COEF_PATH = "vlamax_model.json"
+FEATURES = ["FFM", "Sprintdauer (s)", "Watt Durchschnitt", "Watt Peak", "Geschlecht_code"]
+TARGET = "VLamax INSCYD (mmol/l/s)"
+
+# Prozessweiter Modell-Cache: einmal laden, erneut nur wenn sich Joblib/CSV ändern
+_MODEL_LOCK = threading.Lock()
+_MODEL_CACHE = {"key": None, "model": None}
+# Dateisignaturen (os.stat) höchstens alle FILE_CHECK_INTERVAL_S neu lesen, nicht bei jeder Vorhersage;
+# install_model/clear_model_cache prüfen sofort
+FILE_CHECK_INTERVAL_S = 2.0
+_SIGNATURES = {"checked": (None, None)}   # (monotonic-Zeitpunkt, Signaturen)
+
+
+class LinearCoefficients:
+    """Lineares VLamax-Modell nur aus Koeffizienten (gleiche Attribute wie sklearn LinearRegression)."""
+
+    def __init__(self, coef, intercept):
+        self.coef_ = np.asarray(coef, dtype=float)
+        self.intercept_ = float(intercept)
+
+    def predict(self, X):
+        return np.asarray(X, dtype=float) @ self.coef_ + self.intercept_
+
+
+def export_coefficients(model, path=COEF_PATH):
+    """Koeffizienten eines linearen Modells atomar als JSON schreiben (Floats verlustfrei)."""
+    data = {
+        "features": FEATURES,
+        "coef": [float(c) for c in np.ravel(model.coef_)],
+        "intercept": float(model.intercept_),
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_coefficients(path=COEF_PATH):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("features", FEATURES) != FEATURES or len(data["coef"]) != len(FEATURES):
+        raise ValueError(f"{path}: Merkmale passen nicht zum Modell.")
+    return LinearCoefficients(data["coef"], data["intercept"])
+
+
+def _export_quietly(model):
+    try:
+        export_coefficients(model)
+    except Exception:
+        pass
+
+
+def training_frame(daten):
+    """Rohspalten wie vlamax_testdaten.csv → (X mit FEATURES, y) für das lineare Modell."""
+    daten = daten.copy()
+    daten["FFM"] = daten["Gewicht (kg)"] * (1 - daten["Körperfett (%)"] / 100.0)
+    daten["Geschlecht_code"] = daten["Geschlecht"].str.lower().map({"mann": 0, "frau": 1})
+    return daten[FEATURES], daten[TARGET]
+
 
 def _train_or_load_model():
-    if os.path.exists(MODEL_PATH):
+    coef_sig, model_sig = _file_signature(COEF_PATH), _file_signature(MODEL_PATH)
+    # Koeffizienten-Datei reicht, solange keine neuere Joblib-Datei daneben liegt
+    if coef_sig and (model_sig is None or coef_sig[1] >= model_sig[1]):
         try:
-            return joblib.load(MODEL_PATH)
+            return load_coefficients()
+        except Exception:
+            pass
+    if model_sig:
+        try:
+            import joblib
+            model = joblib.load(MODEL_PATH)
+            _export_quietly(model)
+            return model
         except Exception:
             pass
     if os.path.exists(CSV_PATH):
+        import pandas as pd
+        from sklearn.linear_model import LinearRegression
+        import joblib
+
         daten = pd.read_csv(CSV_PATH)
         if len(daten) >= 2:
-            daten["FFM"] = daten["Gewicht (kg)"] * (1 - daten["Körperfett (%)"] / 100.0)
-            daten["Geschlecht_code"] = daten["Geschlecht"].str.lower().map({"mann": 0, "frau": 1})
-            X = daten[["FFM", "Sprintdauer (s)", "Watt Durchschnitt", "Watt Peak", "Geschlecht_code"]]
-            y = daten["VLamax INSCYD (mmol/l/s)"]
+            X, y = training_frame(daten)
             model = LinearRegression().fit(X, y)
             try:
                 joblib.dump(model, MODEL_PATH)
             except Exception:
                 pass
+            _export_quietly(model)
             return model
     return None
 
-def calc_vlamax_exact_with_ffm(ffm_kg: float, avg20_w: float, peak20_w: float, sprint_s: float, gender: str) -> float:
-    model = _train_or_load_model()
+
+def _file_signature(path):
+    """(absoluter Pfad, mtime, Größe) oder None, falls die Datei fehlt."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+def _signatures(force=False):
+    at, sigs = _SIGNATURES["checked"]
+    now = time.monotonic()
+    if force or at is None or now - at >= FILE_CHECK_INTERVAL_S:
+        sigs = (_file_signature(COEF_PATH), _file_signature(MODEL_PATH), _file_signature(CSV_PATH),
+                coefficients_signature())
+        _SIGNATURES["checked"] = (now, sigs)
+    return sigs
+
+
+def _cache_key(force=False):
+    return _signatures(force)[:3]
+
+
+def model_signature():
+    """
+    Signatur der Modell-/Trainingsdateien – ändert sich, sobald neu trainiert/getauscht wird.
+    Änderungen durch andere Prozesse werden nach spätestens FILE_CHECK_INTERVAL_S sichtbar.
+    """
+    return _signatures()
+
+
+def get_model():
+    """
+    Liefert das VLamax-Modell aus dem Prozess-Cache (thread-safe).
+    Neu geladen/trainiert wird nur, wenn sich mtime/Größe von
+    vlamax_model.json, vlamax_model.joblib oder vlamax_testdaten.csv geändert haben
+    (geprüft höchstens alle FILE_CHECK_INTERVAL_S).
+    """
+    key = _cache_key()
+    if _MODEL_CACHE["key"] == key:
+        return _MODEL_CACHE["model"]
+
+    with _MODEL_LOCK:
+        key = _cache_key()
+        if _MODEL_CACHE["key"] != key:
+            model = _train_or_load_model()
+            # Training kann die Joblib-Datei gerade erst geschrieben haben
+            _MODEL_CACHE["model"] = model
+            _MODEL_CACHE["key"] = _cache_key(force=True)
+        return _MODEL_CACHE["model"]
+
+
+def install_model(model):
+    """
+    Modell sofort in den Prozess-Cache übernehmen (Hot-Swap nach Online-Training).
+    Andere Prozesse sehen den Wechsel über die geänderte Koeffizienten-Datei.
+    """
+    with _MODEL_LOCK:
+        _MODEL_CACHE["model"] = model
+        _MODEL_CACHE["key"] = _cache_key(force=True)
+
+
+def clear_model_cache():
+    with _MODEL_LOCK:
+        _MODEL_CACHE["key"] = None
+        _MODEL_CACHE["model"] = None
+        _SIGNATURES["checked"] = (None, None)
+
+
+def predict_many(ffm_kg, avg20_w, peak20_w, sprint_s, gender) -> np.ndarray:
+    """
+    Batch-Vorhersage: Arrays (oder Skalare) gleicher Länge → VLamax-Array (3 Nachkommastellen).
+    Kostet genau ein Matrix-Vektor-Produkt mit den Modellkoeffizienten.
+    """
+    model = get_model()
     if model is None:
         raise RuntimeError("Kein VLamax-Modell verfügbar (CSV/Joblib fehlt).")
-    gcode = 1 if str(gender).strip().lower() == "frau" else 0
-    row = np.array([[float(ffm_kg), float(sprint_s), float(avg20_w), float(peak20_w), gcode]], dtype=float)
-    pred = float(model.predict(row)[0])
-    return round(pred, 3)
+
+    g = np.char.lower(np.char.strip(np.atleast_1d(np.asarray(gender)).astype(str)))
+    gcode = (g == "frau").astype(float)
+    cols = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(ffm_kg, dtype=float)),
+        np.atleast_1d(np.asarray(sprint_s, dtype=float)),
+        np.atleast_1d(np.asarray(avg20_w, dtype=float)),
+        np.atleast_1d(np.asarray(peak20_w, dtype=float)),
+        gcode,
+    )
+    X = np.column_stack(cols)
+
+    coef = getattr(model, "coef_", None)
+    if coef is None:
+        pred = np.asarray(model.predict(X), dtype=float)
+    else:
+        pred = X @ np.asarray(coef, dtype=float) + float(model.intercept_)
+    return round_half_even(pred, 3)
+
+
+def calc_vlamax_exact_with_ffm(ffm_kg: float, avg20_w: float, peak20_w: float, sprint_s: float, gender: str) -> float:
+    return float(predict_many(ffm_kg, avg20_w, peak20_w, sprint_s, gender)[0])
+
+
+if __name__ == "__main__":
+    # Koeffizienten-Datei aus vorhandener Joblib/CSV erzeugen:  python -m calculations.vlamax_exact
+    model = get_model()
+    if model is None:
+        raise SystemExit("Kein VLamax-Modell verfügbar (CSV/Joblib fehlt).")
+    export_coefficients(model)
+    print(f"Koeffizienten nach {COEF_PATH} geschrieben.")
@@ -0,0 +1,203 @@
+# calculations/vlamax_online.py
+# Online-Training des linearen VLamax-Modells: statt bei jeder neuen Labor-Zeile
+# die komplette vlamax_testdaten.csv neu zu fitten, werden nur suffiziente
+# Statistiken gehalten (n, Mittelwerte, zentrierte XᵀX / Xᵀy). Eine neue Zeile
+# kostet O(Merkmale²), das Lösen ein 5×5-System.
+#
+#   python -m calculations.vlamax_online neue_tests.csv      # Zeilen einrechnen + Modell tauschen
+#   python -m calculations.vlamax_online --init              # Statistiken einmalig aus der CSV aufbauen
+#
+# Zentrierte Momente (Welford/Chan) statt roher XᵀX: Watt-Spalten liegen bei ~10³,
+# rohe Quadratsummen verlieren sonst Stellen. Ergebnis = LinearRegression auf allen Zeilen.
+import argparse
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from calculations.vlamax_exact import (
+    COEF_PATH,
+    CSV_PATH,
+    FEATURES,
+    LinearCoefficients,
+    export_coefficients,
+    install_model,
+    training_frame,
+)
+
+STATS_PATH = "vlamax_model_stats.json"
+STATS_VERSION = 1
+
+_STATS_LOCK = threading.Lock()
+
+
+class SufficientStats:
+    """n, Mittelwerte und zentrierte Kreuzprodukte – reicht für die OLS-Lösung mit Achsenabschnitt."""
+
+    __slots__ = ("n", "mean_x", "mean_y", "cxx", "cxy", "cyy")
+
+    def __init__(self, n_features=len(FEATURES)):
+        self.n = 0
+        self.mean_x = np.zeros(n_features)
+        self.mean_y = 0.0
+        self.cxx = np.zeros((n_features, n_features))
+        self.cxy = np.zeros(n_features)
+        self.cyy = 0.0
+
+    def update(self, X, y):
+        """Zeilen einrechnen (Chan-Merge: Block-Momente + Korrektur über die Mittelwert-Differenz)."""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        y = np.atleast_1d(np.asarray(y, dtype=float))
+        m = len(y)
+        if m == 0:
+            return self
+        mx, my = X.mean(axis=0), float(y.mean())
+        Xc, yc = X - mx, y - my
+
+        n = self.n + m
+        dx, dy = mx - self.mean_x, my - self.mean_y
+        w = self.n * m / n
+        self.cxx += Xc.T @ Xc + w * np.outer(dx, dx)
+        self.cxy += Xc.T @ yc + w * dx * dy
+        self.cyy += float(yc @ yc) + w * dy * dy
+        self.mean_x = self.mean_x + dx * (m / n)
+        self.mean_y += dy * (m / n)
+        self.n = n
+        return self
+
+    def solve(self):
+        """OLS-Koeffizienten; lstsq liefert bei singulärem XᵀX die Minimum-Norm-Lösung."""
+        if self.n < 2:
+            raise ValueError("Mindestens 2 Zeilen nötig.")
+        coef = np.linalg.lstsq(self.cxx, self.cxy, rcond=None)[0]
+        return LinearCoefficients(coef, self.mean_y - float(self.mean_x @ coef))
+
+    def r2(self, model=None):
+        model = model or self.solve()
+        if self.cyy <= 0:
+            return float("nan")
+        return 1.0 - (self.cyy - float(model.coef_ @ self.cxy)) / self.cyy
+
+    def to_dict(self):
+        return {
+            "version": STATS_VERSION,
+            "features": FEATURES,
+            "n": self.n,
+            "mean_x": self.mean_x.tolist(),
+            "mean_y": self.mean_y,
+            "cxx": self.cxx.tolist(),
+            "cxy": self.cxy.tolist(),
+            "cyy": self.cyy,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != STATS_VERSION or data.get("features") != FEATURES:
+            raise ValueError("Statistik-Datei passt nicht zu Version/Merkmalen des Modells.")
+        s = cls()
+        s.n = int(data["n"])
+        s.mean_x = np.asarray(data["mean_x"], dtype=float)
+        s.mean_y = float(data["mean_y"])
+        s.cxx = np.asarray(data["cxx"], dtype=float)
+        s.cxy = np.asarray(data["cxy"], dtype=float)
+        s.cyy = float(data["cyy"])
+        return s
+
+
+# -----------------------------
+# Persistenz
+# -----------------------------
+def load_stats(path=STATS_PATH):
+    """Gespeicherte Statistiken oder None, falls es noch keine gibt."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return SufficientStats.from_dict(json.load(f))
+
+
+def save_stats(stats, path=STATS_PATH):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(stats.to_dict(), f, indent=2)
+    os.replace(tmp, path)  # atomar: nie eine halbe Statistik
+
+
+def _rows(daten):
+    """Rohspalten → (X, y, verworfen); Zeilen mit fehlenden Werten/unbekanntem Geschlecht fallen raus."""
+    X, y = training_frame(daten)
+    X, y = X.to_numpy(dtype=float), y.to_numpy(dtype=float)
+    ok = np.isfinite(X).all(axis=1) & np.isfinite(y)
+    return X[ok], y[ok], int((~ok).sum())
+
+
+def stats_from_csv(path=CSV_PATH):
+    import pandas as pd
+
+    X, y, _ = _rows(pd.read_csv(path))
+    return SufficientStats().update(X, y)
+
+
+# -----------------------------
+# Training + Hot-Swap
+# -----------------------------
+def add_rows(daten, stats_path=STATS_PATH, coef_path=COEF_PATH, install=True):
+    """
+    Neue Kalibrier-Zeilen (DataFrame im Schema von vlamax_testdaten.csv) einrechnen,
+    Statistiken und Koeffizienten atomar schreiben und das Modell im Prozess tauschen.
+    Ohne Statistik-Datei wird einmalig aus vlamax_testdaten.csv aufgebaut –
+    die neuen Zeilen dürfen dort also noch nicht enthalten sein.
+    Rückgabe: {"model", "n", "added", "skipped", "r2"}.
+    """
+    X, y, skipped = _rows(daten)
+    with _STATS_LOCK:
+        stats = load_stats(stats_path)
+        if stats is None:
+            stats = stats_from_csv() if os.path.exists(CSV_PATH) else SufficientStats()
+        stats.update(X, y)
+        model = stats.solve()
+        save_stats(stats, stats_path)
+        export_coefficients(model, coef_path)
+        if install and coef_path == COEF_PATH:
+            install_model(model)
+    return {"model": model, "n": stats.n, "added": len(y), "skipped": skipped, "r2": stats.r2(model)}
+
+
+def rebuild(stats_path=STATS_PATH, coef_path=COEF_PATH, install=True):
+    """Statistiken einmalig aus vlamax_testdaten.csv aufbauen (ersetzt eine vorhandene Statistik-Datei)."""
+    with _STATS_LOCK:
+        stats = stats_from_csv()
+        model = stats.solve()
+        save_stats(stats, stats_path)
+        export_coefficients(model, coef_path)
+        if install and coef_path == COEF_PATH:
+            install_model(model)
+    return {"model": model, "n": stats.n, "added": stats.n, "skipped": 0, "r2": stats.r2(model)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="VLamax-Modell inkrementell um neue Kalibrier-Zeilen erweitern.")
+    ap.add_argument("csv", nargs="*", help="CSV(s) mit neuen Zeilen im Schema von vlamax_testdaten.csv")
+    ap.add_argument("--init", action="store_true", help=f"Statistiken neu aus {CSV_PATH} aufbauen")
+    ap.add_argument("--stats", default=STATS_PATH, help=f"Statistik-Datei (Default: {STATS_PATH})")
+    args = ap.parse_args(argv)
+    if not args.init and not args.csv:
+        ap.error("CSV angeben oder --init")
+
+    import pandas as pd
+
+    if args.init:
+        res = rebuild(args.stats)
+        print(f"Statistiken aus {CSV_PATH}: {res['n']} Zeilen", file=sys.stderr)
+    for path in args.csv:
+        res = add_rows(pd.read_csv(path), args.stats)
+        print(f"{path}: +{res['added']} Zeilen ({res['skipped']} verworfen) → n={res['n']}", file=sys.stderr)
+    coef = ", ".join(f"{f}={c:.6g}" for f, c in zip(FEATURES, res["model"].coef_))
+    print(f"Koeffizienten nach {COEF_PATH}: {coef}, Achsenabschnitt={res['model'].intercept_:.6g}, "
+          f"R²={res['r2']:.4f}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,7 @@ This module keeps that API **unchanged** while adding:
 - optional p3min_w for blending (default 70% P5 / 30% P3). Blend only if BOTH P5 and P3 > 0.
 - optional p12min_w for plausibility flags (NOT mixed into VO2max)
 - fallback: if P5 missing/<=0 but P3 exists -> compute from P3
+- calc_vo2max_batch: same rules over NumPy arrays, flags as int bitmask (decode_flags)
 
 Formulas (relative, ml/kg/min):
 - A: 16.6 + 8.87 * (W/kg)
@@ -21,6 +22,25 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
+# Plausibility flags (bitmask in calc_vo2max_batch, text in calc_vo2max_result)
+FLAG_P3_FALLBACK = 1 << 0
+FLAG_P3_BELOW_P5 = 1 << 1
+FLAG_P12_GE_P5 = 1 << 2
+FLAG_P12_NEAR_P5 = 1 << 3
+FLAG_P12_GE_P3 = 1 << 4
+FLAG_INVALID = 1 << 5  # batch only: row would raise ValueError in calc_vo2max_result (VO2 = NaN)
+
+FLAG_TEXTS: Dict[int, str] = {
+    FLAG_P3_FALLBACK: "Kein 5min-Wert: VO2max basiert nur auf 3min (Fallback, weniger robust)",
+    FLAG_P3_BELOW_P5: "P3 < P5: mögliches Daten-/Testproblem (3min war nicht maximal?)",
+    FLAG_P12_GE_P5: "P12 >= P5: sehr unwahrscheinlich (Datenfehler oder falsche Zuordnung)",
+    FLAG_P12_NEAR_P5: "P12 sehr nah an P5: 5min evtl. nicht maximal oder Pacing sehr konservativ",
+    FLAG_P12_GE_P3: "P12 >= P3: sehr unwahrscheinlich (Datenfehler oder falsche Zuordnung)",
+    FLAG_INVALID: "Ungültige Eingabe: Gewicht <= 0, kein 5min-/3min-Wert oder blend_w5 außerhalb 0–1",
+}
+
 
 def _rel_from_formula_a(power_w: float, kg: float) -> float:
     return 16.6 + 8.87 * (float(power_w) / float(kg))
@@ -97,7 +117,7 @@ def calc_vo2max_result(
         details["p3min_w"] = float(p3min_w)
         vo2_rel_final = vo2_rel_3_anchor
         method_used = f"P3_{m_label}_fallback(no_P5)"
-        flags.append("Kein 5min-Wert: VO2max basiert nur auf 3min (Fallback, weniger robust)")
+        flags.append(FLAG_TEXTS[FLAG_P3_FALLBACK])
 
     # Blend only if BOTH present
     if p5_ok and p3_ok:
@@ -114,7 +134,7 @@ def calc_vo2max_result(
         details["ratio_p3_p5"] = float(p3min_w) / float(p5min_w)
 
         if float(p3min_w) < float(p5min_w):
-            flags.append("P3 < P5: mögliches Daten-/Testproblem (3min war nicht maximal?)")
+            flags.append(FLAG_TEXTS[FLAG_P3_BELOW_P5])
 
         vo2_rel_final = w5 * vo2_rel_5 + w3 * vo2_rel_3
         method_used = f"blend(P5_{m_label}*{w5:.2f}+P3_{m_label}*{w3:.2f})"
@@ -127,12 +147,12 @@ def calc_vo2max_result(
             ratio = float(p12min_w) / float(p5min_w)
             details["ratio_p12_p5"] = ratio
             if float(p12min_w) >= float(p5min_w):
-                flags.append("P12 >= P5: sehr unwahrscheinlich (Datenfehler oder falsche Zuordnung)")
+                flags.append(FLAG_TEXTS[FLAG_P12_GE_P5])
             if ratio > 0.92:
-                flags.append("P12 sehr nah an P5: 5min evtl. nicht maximal oder Pacing sehr konservativ")
+                flags.append(FLAG_TEXTS[FLAG_P12_NEAR_P5])
 
         if p3_ok and float(p12min_w) >= float(p3min_w):
-            flags.append("P12 >= P3: sehr unwahrscheinlich (Datenfehler oder falsche Zuordnung)")
+            flags.append(FLAG_TEXTS[FLAG_P12_GE_P3])
 
     vo2_abs = _to_abs_l_min(vo2_rel_final, weight_kg)
 
@@ -166,3 +186,89 @@ def calc_vo2max(
         blend_w5=blend_w5,
     )
     return r.vo2_abs_l_min, r.vo2_rel_ml_kg_min
+
+
+# -----------------------------
+# Batch (NumPy arrays)
+# -----------------------------
+def decode_flags(mask: int) -> List[str]:
+    """Bitmask -> flag texts (same order as calc_vo2max_result)."""
+    mask = int(mask)
+    return [text for bit, text in FLAG_TEXTS.items() if mask & bit]
+
+
+@dataclass(frozen=True)
+class VO2MaxBatchResult:
+    vo2_abs_l_min: np.ndarray
+    vo2_rel_ml_kg_min: np.ndarray
+    flags: np.ndarray  # int bitmask per row (FLAG_*)
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def flag_texts(self, i: int) -> List[str]:
+        return decode_flags(self.flags[i])
+
+
+def _as_watts(x, n: int) -> np.ndarray:
+    """None/NaN/<=0 -> 0 (missing), broadcast to n rows."""
+    if x is None:
+        return np.zeros(n)
+    a = np.broadcast_to(np.asarray(x, dtype=float), (n,))
+    return np.where(a > 0, a, 0.0)
+
+
+def calc_vo2max_batch(
+    p5min_w,
+    weight_kg,
+    method="MEAN",
+    *,
+    p3min_w=None,
+    p12min_w=None,
+    blend_w5=0.7,
+) -> VO2MaxBatchResult:
+    """
+    calc_vo2max_result for N rows at once. All arguments may be scalars or arrays
+    (method: str or array of str, blend_w5: float or array). Results equal the
+    scalar path bit for bit; rows where the scalar path raises ValueError get
+    NaN and FLAG_INVALID instead.
+    """
+    lengths = [len(x) for x in (p5min_w, weight_kg, p3min_w, p12min_w, method, blend_w5)
+               if x is not None and np.ndim(x) > 0]
+    n = max(lengths) if lengths else 1
+    weight = np.broadcast_to(np.asarray(weight_kg, dtype=float), (n,))
+    p5 = _as_watts(p5min_w, n)
+    p3 = _as_watts(p3min_w, n)
+    p12 = _as_watts(p12min_w, n)
+    w5 = np.broadcast_to(np.asarray(blend_w5, dtype=float), (n,))
+    w3 = 1.0 - w5
+
+    m = np.char.upper(np.char.strip(np.broadcast_to(np.asarray(method, dtype=str), (n,))))
+    p5_ok, p3_ok, p12_ok = p5 > 0, p3 > 0, p12 > 0
+    both = p5_ok & p3_ok
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        def rel(p):
+            a = 16.6 + 8.87 * (p / weight)
+            b = 7.0 + 10.8 * (p / weight)
+            return np.select([m == "A", m == "B"], [a, b], (a + b) / 2.0)
+
+        rel5 = rel(p5)
+        rel3 = rel(p3)
+        ratio = p12 / p5
+        vo2_rel = np.where(p5_ok, rel5, rel3)
+        vo2_rel = np.where(both, w5 * rel5 + w3 * rel3, vo2_rel)
+
+    invalid = ~(weight > 0) | ~(p5_ok | p3_ok) | (both & ~((w5 >= 0.0) & (w5 <= 1.0)))
+    vo2_rel = np.where(invalid, np.nan, vo2_rel)
+    vo2_abs = (vo2_rel * weight) / 1000.0
+
+    flags = np.zeros(n, dtype=np.int64)
+    flags |= np.where(~p5_ok & p3_ok, FLAG_P3_FALLBACK, 0)
+    flags |= np.where(both & (p3 < p5), FLAG_P3_BELOW_P5, 0)
+    flags |= np.where(p12_ok & p5_ok & (p12 >= p5), FLAG_P12_GE_P5, 0)
+    flags |= np.where(p12_ok & p5_ok & (ratio > 0.92), FLAG_P12_NEAR_P5, 0)
+    flags |= np.where(p12_ok & p3_ok & (p12 >= p3), FLAG_P12_GE_P3, 0)
+    flags = np.where(invalid, FLAG_INVALID, flags)
+
+    return VO2MaxBatchResult(vo2_abs_l_min=vo2_abs, vo2_rel_ml_kg_min=vo2_rel, flags=flags)
@@ -1,14 +1,101 @@
-import pandas as pd
+# calculations/zones.py — CP-basierte Trainingszonen + GA1-Bereich
+# Rechnen in Tupeln/Arrays; ein DataFrame entsteht erst zur Anzeige (ZoneTable.to_frame).
+import numpy as np
+
+ZONE_NAMES = (
+    "Z1 - Regeneration",
+    "Z2 - Ausdauer (Fettstoffwechsel)",
+    "Z3 - Tempo",
+    "Z4 - Schwelle",
+    "Z5 - VO2max",
+)
+ZONE_DESCRIPTIONS = (
+    "Sehr locker, aktive Erholung",
+    "Fettoxidation dominant",
+    "Mischstoffwechsel",
+    "MLSS / CP",
+    "Intensive Reize",
+)
+ZONE_COLUMNS = ["Zone", "von [W]", "bis [W]", "% von CP", "Beschreibung"]
+N_ZONES = len(ZONE_NAMES)
+
+# Ergebnis von calc_zones_batch: eine Zeile pro Athlet
+ZONE_BATCH_DTYPE = np.dtype([
+    ("valid", bool),
+    ("cp", float),
+    ("lo_w", np.int64, (N_ZONES,)),
+    ("hi_w", np.int64, (N_ZONES,)),
+    ("ga1_min", float),
+    ("ga1_max", float),
+    ("ga1_pct_min", float),
+    ("ga1_pct_max", float),
+])
+
+
+class ZoneTable:
+    """Zonen eines Athleten: Wattgrenzen (int) je Zone, leer wenn CP <= 0."""
+
+    __slots__ = ("cp", "lo_w", "hi_w")
+
+    def __init__(self, cp, lo_w, hi_w):
+        self.cp = float(cp)
+        self.lo_w = tuple(int(x) for x in lo_w)
+        self.hi_w = tuple(int(x) for x in hi_w)
+
+    @classmethod
+    def from_batch(cls, zones, i):
+        """Zeile i aus calc_zones_batch als ZoneTable."""
+        row = zones[i]
+        if not row["valid"]:
+            return cls(row["cp"], (), ())
+        return cls(row["cp"], row["lo_w"], row["hi_w"])
+
+    def __len__(self):
+        return len(self.lo_w)
+
+    def __eq__(self, other):
+        return isinstance(other, ZoneTable) and (self.cp, self.lo_w, self.hi_w) == (other.cp, other.lo_w, other.hi_w)
+
+    def __repr__(self):
+        return f"ZoneTable(cp={self.cp:g}, lo_w={self.lo_w}, hi_w={self.hi_w})"
+
+    def pct_labels(self):
+        # Prozentbereich (zur Anzeige, nicht fix)
+        return [f"{round(lo / self.cp * 100):.0f}–{round(hi / self.cp * 100):.0f} %"
+                for lo, hi in zip(self.lo_w, self.hi_w)]
+
+    def rows(self):
+        return list(zip(ZONE_NAMES, self.lo_w, self.hi_w, self.pct_labels(), ZONE_DESCRIPTIONS))
+
+    def to_frame(self):
+        """Anzeige-Tabelle (Spalten wie bisher calc_zones)."""
+        import pandas as pd
+
+        if not self.lo_w:
+            return pd.DataFrame(columns=ZONE_COLUMNS)
+        df = pd.DataFrame(self.rows(), columns=ZONE_COLUMNS)
+        df["von [W]"] = df["von [W]"].astype(int)
+        df["bis [W]"] = df["bis [W]"].astype(int)
+        return df
+
 
 def calc_zones(cp, hfmax, fatmax_w, vlamax):
     """
     Berechnet Trainingszonen dynamisch auf Basis von CP, VLamax und FatMax.
     Gibt eine Pandas-Tabelle mit Zonen, Watt- und Prozentbereichen sowie Beschreibung zurück.
     """
+    return calc_zone_table(cp, hfmax, fatmax_w, vlamax).to_frame()
+
+
+def calc_zone_table(cp, hfmax, fatmax_w, vlamax):
+    """
+    Berechnet Trainingszonen dynamisch auf Basis von CP, VLamax und FatMax.
+    Gibt eine ZoneTable (Wattgrenzen als int) zurück; Tabelle für die Anzeige via .to_frame().
+    """
 
     cp = float(cp)
     if cp <= 0:
-        return pd.DataFrame(columns=["Zone", "von [W]", "bis [W]", "% von CP", "Beschreibung"])
+        return ZoneTable(cp, (), ())
 
     # --- Dynamische Anpassung durch VLamax (Shift ±5 %) ---
     v = max(0.2, min(float(vlamax), 1.0))
@@ -47,27 +134,10 @@ def calc_zones(cp, hfmax, fatmax_w, vlamax):
 
 
     # --- Wattbereiche (weiterhin dynamisch!) ---
-    zones = [
-        ("Z1 - Regeneration", 0, z1_upper * cp, "Sehr locker, aktive Erholung"),
-        ("Z2 - Ausdauer (Fettstoffwechsel)", z1_upper * cp, z2_upper * cp, "Fettoxidation dominant"),
-        ("Z3 - Tempo", z2_upper * cp, z3_upper * cp, "Mischstoffwechsel"),
-        ("Z4 - Schwelle", z3_upper * cp, z4_upper * cp, "MLSS / CP"),
-        ("Z5 - VO2max", z4_upper * cp, 1.30 * cp, "Intensive Reize"),
-    ]
-
-    df = pd.DataFrame(zones, columns=["Zone", "von [W]", "bis [W]", "Beschreibung"])
-    df["von [W]"] = df["von [W]"].round(0).astype(int)
-    df["bis [W]"] = df["bis [W]"].round(0).astype(int)
-
-    # --- Prozentbereich berechnen (zur Anzeige, nicht fix) ---
-    df["% von CP"] = df.apply(
-        lambda row: f"{round((row['von [W]'] / cp) * 100):.0f}–{round((row['bis [W]'] / cp) * 100):.0f} %",
-        axis=1,
-    )
-
-    # --- Reihenfolge für saubere Darstellung ---
-    df = df[["Zone", "von [W]", "bis [W]", "% von CP", "Beschreibung"]]
-    return df
+    uppers = (z1_upper * cp, z2_upper * cp, z3_upper * cp, z4_upper * cp, 1.30 * cp)
+    lo_w = tuple(int(round(x)) for x in (0,) + uppers[:-1])
+    hi_w = tuple(int(round(x)) for x in uppers)
+    return ZoneTable(cp, lo_w, hi_w)
 
 
 def calc_ga1_zone(fatmax_w, cp, vlamax):
@@ -91,3 +161,61 @@ def calc_ga1_zone(fatmax_w, cp, vlamax):
             hi_pct = min(0.85, fatmax_rel + 0.01)
 
     return lo_pct * cp, hi_pct * cp, lo_pct * 100, hi_pct * 100
+
+
+# -----------------------------
+# Batch (N Athleten, vektorisiert)
+# -----------------------------
+def calc_ga1_zone_batch(fatmax_w, cp, vlamax):
+    """calc_ga1_zone für Arrays; Zeilen mit CP <= 0 liefern 0."""
+    fatmax_w, cp, vlamax = (np.asarray(x, dtype=float) for x in (fatmax_w, cp, vlamax))
+    v = np.maximum(0.2, np.minimum(vlamax, 1.0))
+    s = ((0.6 - v) / 0.4) * 0.05
+    lo_pct = 0.55 * (1 + s)
+    hi_pct = 0.75 * (1 + s)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel = fatmax_w / cp
+    has = (cp > 0) & (rel != 0)
+    lo_pct = np.where(has & (rel < lo_pct), np.maximum(0.45, rel - 0.01), lo_pct)
+    hi_pct = np.where(has & (rel > hi_pct), np.minimum(0.85, rel + 0.01), hi_pct)
+
+    ok = cp > 0
+    return (
+        np.where(ok, lo_pct * cp, 0.0), np.where(ok, hi_pct * cp, 0.0),
+        np.where(ok, lo_pct * 100, 0.0), np.where(ok, hi_pct * 100, 0.0),
+    )
+
+
+def calc_zones_batch(cp, fatmax_w, vlamax):
+    """
+    Zonen + GA1-Bereich für N Athleten in einem Durchgang (gleiche Formeln wie
+    calc_zone_table/calc_ga1_zone). Rückgabe: Structured Array (ZONE_BATCH_DTYPE).
+    """
+    cp, fatmax_w, vlamax = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=float))
+                                                 for x in (cp, fatmax_w, vlamax)))
+    out = np.zeros(cp.shape[0], dtype=ZONE_BATCH_DTYPE)
+    valid = cp > 0
+    out["valid"] = valid
+    out["cp"] = cp
+
+    v = np.maximum(0.2, np.minimum(vlamax, 1.0))
+    s = ((0.6 - v) / 0.4) * 0.03
+
+    z1_upper = 0.55 * (1 + s)
+    z2_upper = (0.74 - 0.08 * (v - 0.3)) * (1 + s)
+    z2_upper = np.maximum(0.66, np.minimum(z2_upper, 0.74))
+    z3_upper = (0.94 + 0.05 * (0.5 - v)) * (1 + s)
+    z4_upper = (1.05 + 0.05 * (0.3 - v)) * (1 + s)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel = fatmax_w / cp
+    shift = valid & (rel != 0) & (rel < z1_upper)
+    z1_upper = np.where(shift, np.maximum(0.45, rel - 0.01), z1_upper)
+
+    uppers = np.column_stack([z1_upper * cp, z2_upper * cp, z3_upper * cp, z4_upper * cp, 1.30 * cp])
+    hi = np.where(valid[:, None], np.rint(uppers), 0.0)
+    out["hi_w"] = hi
+    out["lo_w"][:, 1:] = hi[:, :-1]
+
+    out["ga1_min"], out["ga1_max"], out["ga1_pct_min"], out["ga1_pct_max"] = calc_ga1_zone_batch(fatmax_w, cp, vlamax)
+    return out
@@ -0,0 +1,335 @@
+# calibrate_vlamax.py — Classic- und Kona-VLamax-Koeffizienten aus eigenen Labordaten neu bestimmen
+#
+#   python calibrate_vlamax.py labor.csv                       # → vlamax_coefficients.json (Version +1)
+#   python calibrate_vlamax.py labor.csv --folds 10 --bootstrap 500 --workers 4
+#   python calibrate_vlamax.py labor.csv --dry-run             # nur Kreuzvalidierung anzeigen
+#
+# Eingabe: Schema wie vlamax_testdaten.csv (Gewicht, Körperfett, Geschlecht, Sprintdauer,
+# Watt Durchschnitt, Watt Peak, VLamax INSCYD). Für Kona zusätzlich "5-min (W)", "12-min (W)"
+# und optional "VO2max rel (ml/min/kg)" (sonst VO2max wie in der App aus 5/3/12-min).
+#
+# Fit: lineare kleinste Quadrate über die Design-Matrix. k-Fold und Bootstrap laufen
+# über XᵀX je Fold/Replikat (ein p×p-System statt neuem Fit über alle Zeilen) und
+# werden auf einen Prozess-Pool verteilt. Metriken gelten für die Laufzeit-Vorhersage
+# (auf 3 Stellen gerundet, auf [0.20, 0.90] begrenzt).
+
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from calculations.vlamax_coefficients import COEFFICIENTS_FORMAT, COEFFICIENTS_PATH, DEFAULT_COEFFICIENTS
+from calculations.vlamax_exact import TARGET
+from utils.numeric import round_half_even
+
+VL_MIN, VL_MAX = 0.20, 0.90
+DEFAULT_FOLDS = 10
+DEFAULT_BOOTSTRAP = 200
+BOOT_REPS_PER_TASK = 25
+
+
+# -----------------------------
+# Design-Matrizen (Spalten = Reihenfolge in DEFAULT_COEFFICIENTS)
+# -----------------------------
+def _num(d, col):
+    return pd.to_numeric(d[col], errors="coerce").to_numpy(dtype=float)
+
+
+def _base(d):
+    ffm = np.maximum(_num(d, "Gewicht (kg)") * (1 - _num(d, "Körperfett (%)") / 100.0), 1e-6)
+    g = d["Geschlecht"].astype(str).str.strip().str.lower()
+    return ffm, g
+
+
+def design_classic(d):
+    ffm, g = _base(d)
+    female = g.str.startswith("f").to_numpy(dtype=float)
+    return np.column_stack([np.ones(len(d)), _num(d, "Watt Durchschnitt") / ffm, _num(d, "Sprintdauer (s)"), female])
+
+
+def _vo2_rel(d):
+    if "VO2max rel (ml/min/kg)" in d:
+        return _num(d, "VO2max rel (ml/min/kg)")
+    from calculations.vo2max import calc_vo2max_batch
+
+    def opt(col):
+        return _num(d, col) if col in d else None
+
+    return calc_vo2max_batch(opt("5-min (W)"), _num(d, "Gewicht (kg)"), "MEAN",
+                             p3min_w=opt("3-min (W)"), p12min_w=opt("12-min (W)"), blend_w5=0.7).vo2_rel_ml_kg_min
+
+
+def design_kona(d):
+    missing = [c for c in ("5-min (W)", "12-min (W)") if c not in d]
+    if missing:
+        raise ValueError(f"Kona braucht zusätzlich Spalten: {missing}")
+    ffm, g = _base(d)
+    ratio = _num(d, "12-min (W)") / np.maximum(1.0, _num(d, "5-min (W)")) - 0.85
+    return np.column_stack([
+        np.ones(len(d)), _num(d, "Watt Durchschnitt") / ffm, _num(d, "Watt Peak"), _num(d, "Sprintdauer (s)"),
+        _vo2_rel(d) / 70.0, ratio, (g == "frau").to_numpy(dtype=float),
+    ])
+
+
+DESIGNS = {"classic": design_classic, "kona": design_kona}
+
+
+# -----------------------------
+# Fit + Metriken
+# -----------------------------
+def predict(X, coef):
+    """Wie zur Laufzeit: gerundet auf 3 Stellen, begrenzt auf [0.20, 0.90]."""
+    return np.clip(round_half_even(X @ coef, 3), VL_MIN, VL_MAX)
+
+
+def metrics(pred, y):
+    err = pred - y
+    ss_tot = float(((y - y.mean()) ** 2).sum()) if len(y) else 0.0
+    return {
+        "n": int(len(y)),
+        "rmse": float(np.sqrt(np.mean(err ** 2))) if len(y) else float("nan"),
+        "mae": float(np.mean(np.abs(err))) if len(y) else float("nan"),
+        "r2": 1.0 - float(err @ err) / ss_tot if ss_tot > 0 else float("nan"),
+    }
+
+
+def _solve(G, b):
+    return np.linalg.lstsq(G, b, rcond=None)[0]
+
+
+def fit(X, y):
+    """Gesamt-Fit direkt über lstsq(X, y) (QR/SVD, ohne XᵀX-Konditionsverlust)."""
+    return np.linalg.lstsq(X, y, rcond=None)[0]
+
+
+# -----------------------------
+# Worker (einmal pro Prozess initialisiert)
+# -----------------------------
+_worker = {}
+
+
+def _init_worker(data):
+    # je Modell: skalierte Matrix, Ziel, Fold-Zuordnung, Gesamt-XᵀX/Xᵀy
+    _worker.clear()
+    for name, (X, y, folds) in data.items():
+        scale = np.maximum(np.abs(X).max(axis=0), 1e-12)  # Spalten auf ~1 → besser konditioniertes XᵀX
+        Xs = X / scale
+        _worker[name] = {"X": X, "Xs": Xs, "y": y, "folds": folds, "scale": scale,
+                         "G": Xs.T @ Xs, "b": Xs.T @ y}
+
+
+def _kfold_task(args):
+    name, fold_ids = args
+    w = _worker[name]
+    out = []
+    for k in fold_ids:
+        test = w["folds"] == k
+        Xt, yt = w["Xs"][test], w["y"][test]
+        coef = _solve(w["G"] - Xt.T @ Xt, w["b"] - Xt.T @ yt) / w["scale"]
+        out.append((name, "kfold", coef, metrics(predict(w["X"][test], coef), yt)))
+    return out
+
+
+def _boot_task(args):
+    name, seed, reps = args
+    w = _worker[name]
+    n = len(w["y"])
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(reps):
+        counts = np.bincount(rng.integers(0, n, n), minlength=n).astype(float)
+        Xw = w["Xs"] * counts[:, None]
+        coef = _solve(Xw.T @ w["Xs"], Xw.T @ w["y"]) / w["scale"]
+        oob = counts == 0
+        out.append((name, "bootstrap", coef, metrics(predict(w["X"][oob], coef), w["y"][oob])))
+    return out
+
+
+def _run(task):
+    kind = task[0]
+    return _kfold_task(task[1:]) if kind == "kfold" else _boot_task(task[1:])
+
+
+# -----------------------------
+# Kalibrierung
+# -----------------------------
+def prepare(daten, models=tuple(DESIGNS)):
+    """Rohdaten → {Modell: (X, y)} nur mit vollständigen Zeilen; nicht baubare Modelle → Grund."""
+    if TARGET not in daten:
+        raise ValueError(f"Zielspalte fehlt: {TARGET!r}")
+    y_all = _num(daten, TARGET)
+    data, skipped = {}, {}
+    for name in models:
+        try:
+            X = DESIGNS[name](daten)
+        except (KeyError, ValueError) as e:
+            skipped[name] = str(e)
+            continue
+        ok = np.isfinite(X).all(axis=1) & np.isfinite(y_all)
+        if ok.sum() <= X.shape[1]:
+            skipped[name] = f"zu wenige vollständige Zeilen ({int(ok.sum())})"
+            continue
+        data[name] = (X[ok], y_all[ok])
+    return data, skipped
+
+
+def _summary(rows):
+    keys = ("rmse", "mae", "r2")
+    vals = {k: np.array([m[k] for m in rows], dtype=float) for k in keys}
+    return {**{k: float(np.nanmean(v)) for k, v in vals.items()},
+            **{f"{k}_sd": float(np.nanstd(v)) for k, v in vals.items()}}
+
+
+def calibrate(daten, folds=DEFAULT_FOLDS, bootstrap=DEFAULT_BOOTSTRAP, workers=None, seed=0,
+              models=tuple(DESIGNS), progress=None):
+    """
+    Koeffizienten je Modell fitten und per k-Fold/Bootstrap validieren.
+    Rückgabe: {"models": {name: {"coef", "n", "in_sample", "baseline", "kfold", "bootstrap"}}, "skipped": {...}}.
+    """
+    data, skipped = prepare(daten, models)
+    rng = np.random.default_rng(seed)
+    pool_data, tasks = {}, []
+    for name, (X, y) in data.items():
+        k = max(2, min(folds, len(y))) if folds else 0
+        fold_of = rng.permutation(len(y)) % k if k else np.zeros(len(y), dtype=int)
+        pool_data[name] = (X, y, fold_of)
+        tasks += [("kfold", name, list(range(i, min(i + 2, k)))) for i in range(0, k, 2)]
+        tasks += [("boot", name, int(s), min(BOOT_REPS_PER_TASK, bootstrap - i))
+                  for i, s in zip(range(0, bootstrap, BOOT_REPS_PER_TASK),
+                                  rng.integers(0, 2**63, max(1, -(-bootstrap // BOOT_REPS_PER_TASK))))]
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks) or 1))
+    parts = {name: {"kfold": [], "bootstrap": []} for name in data}
+    if workers == 1:
+        _init_worker(pool_data)
+        results, pool = map(_run, tasks), None
+    else:
+        pool = mp.Pool(workers, initializer=_init_worker, initargs=(pool_data,))
+        results = pool.imap_unordered(_run, tasks)
+    try:
+        for done, chunk in enumerate(results, 1):
+            for name, kind, coef, m in chunk:
+                parts[name][kind].append((coef, m))
+            if progress:
+                progress(done, len(tasks))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    out = {}
+    for name, (X, y) in data.items():
+        names = list(DEFAULT_COEFFICIENTS[name])
+        coef = fit(X, y)
+        base = np.array([DEFAULT_COEFFICIENTS[name][c] for c in names])
+        res = {
+            "coef": dict(zip(names, map(float, coef))),
+            "n": int(len(y)),
+            "in_sample": metrics(predict(X, coef), y),
+            "baseline": metrics(predict(X, base), y),  # bisherige Koeffizienten auf denselben Daten
+        }
+        if parts[name]["kfold"]:
+            res["kfold"] = {"k": len(parts[name]["kfold"]), **_summary([m for _, m in parts[name]["kfold"]])}
+        if parts[name]["bootstrap"]:
+            boot = np.array([c for c, _ in parts[name]["bootstrap"]])
+            lo, hi = np.percentile(boot, [2.5, 97.5], axis=0)
+            res["bootstrap"] = {
+                "reps": len(boot),
+                "oob": _summary([m for _, m in parts[name]["bootstrap"]]),
+                "coef_sd": dict(zip(names, map(float, boot.std(axis=0, ddof=1) if len(boot) > 1 else [0.0] * len(names)))),
+                "coef_ci95": {c: [float(a), float(b)] for c, a, b in zip(names, lo, hi)},
+            }
+        out[name] = res
+    return {"models": out, "skipped": skipped}
+
+
+# -----------------------------
+# Versionierte Koeffizienten-Datei
+# -----------------------------
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_coefficients(result, source, path=COEFFICIENTS_PATH):
+    """Neue Version schreiben (atomar); nicht neu kalibrierte Modelle werden aus der alten Datei übernommen."""
+    prev = {}
+    if os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                prev = json.load(f)
+        except (OSError, ValueError):
+            prev = {}
+    models = {k: v for k, v in (prev.get("models") or {}).items() if k in DEFAULT_COEFFICIENTS}
+    models.update(result["models"])
+    data = {
+        "format": COEFFICIENTS_FORMAT,
+        "version": int(prev.get("version") or 0) + 1,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "source": source,
+        "models": models,
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+    return data["version"]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="VLamax-Formelkoeffizienten (Classic/Kona) aus Labordaten kalibrieren.")
+    ap.add_argument("csv", help="Labor-CSV (Schema wie vlamax_testdaten.csv)")
+    ap.add_argument("--models", nargs="*", choices=list(DESIGNS), default=list(DESIGNS))
+    ap.add_argument("--folds", type=int, default=DEFAULT_FOLDS, help="k für k-Fold (0 = aus)")
+    ap.add_argument("--bootstrap", type=int, default=DEFAULT_BOOTSTRAP, help="Bootstrap-Replikate (0 = aus)")
+    ap.add_argument("--workers", type=int, default=None, help="Prozesse (Default: CPU-Kerne)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=COEFFICIENTS_PATH, help=f"Koeffizienten-Datei (Default: {COEFFICIENTS_PATH})")
+    ap.add_argument("--dry-run", action="store_true", help="nichts schreiben")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    daten = pd.read_csv(args.csv)
+
+    def progress(done, total):
+        print(f"\r{done}/{total} CV-Aufträge", end="", file=sys.stderr, flush=True)
+
+    try:
+        res = calibrate(daten, args.folds, args.bootstrap, args.workers, args.seed, tuple(args.models), progress)
+    except ValueError as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+    dt = time.perf_counter() - t0
+    print(file=sys.stderr)
+    for name, why in res["skipped"].items():
+        print(f"{name}: übersprungen – {why}", file=sys.stderr)
+    for name, m in res["models"].items():
+        cv = m.get("kfold", {})
+        oob = m.get("bootstrap", {}).get("oob", {})
+        print(f"{name}: n={m['n']:,}  RMSE bisher {m['baseline']['rmse']:.4f} → neu {m['in_sample']['rmse']:.4f}"
+              + (f"  • {cv['k']}-Fold {cv['rmse']:.4f}±{cv['rmse_sd']:.4f}" if cv else "")
+              + (f"  • Bootstrap-OOB {oob['rmse']:.4f}" if oob else ""), file=sys.stderr)
+        print("   " + ", ".join(f"{k}={v:.6g}" for k, v in m["coef"].items()), file=sys.stderr)
+    if not res["models"]:
+        return 1
+    if not args.dry_run:
+        source = {"csv": os.path.abspath(args.csv), "sha256": _sha256(args.csv), "rows": int(len(daten)),
+                  "folds": args.folds, "bootstrap": args.bootstrap, "seed": args.seed}
+        version = write_coefficients(res, source, args.out)
+        print(f"Version {version} → {args.out}", file=sys.stderr)
+    print(f"{dt:.2f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,7 @@
 
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
-from pathlib import Path
+from utils.results_db import ensure_imported, count, latest_per_athlete
 
 st.set_page_config(page_title="📈 Analyse-Übersicht – 360 Coaching Lab", page_icon="📈", layout="wide")
 
@@ -11,26 +10,18 @@ st.sidebar.markdown("---")
 st.sidebar.page_link("app.py", label="🚴 Performance Analyzer")
 st.sidebar.page_link("pages/Dashboards.py", label="📊 Dashboards")
 st.sidebar.page_link("pages/Analyse_Overview.py", label="📈 Analyse-Übersicht")
+st.sidebar.page_link("pages/Pacing.py", label="🏁 Pacing")
 st.sidebar.markdown("---")
 st.sidebar.markdown("**Version:** 1.9.2**")
 
 st.title("📈 Analyse-Übersicht")
 st.markdown("Vergleiche die wichtigsten Leistungsparameter deiner Athleten (jeweils letzter Test).")
 
-csv_path = Path("data/athleten_daten.csv")
-if not csv_path.exists():
+ensure_imported()
+if count() == 0:
     st.info("Noch keine Daten vorhanden. Führe zuerst eine Analyse im Haupt-Tool aus.")
     st.stop()
 
-df = pd.read_csv(csv_path)
-if "Datum" in df.columns:
-    try:
-        df["Datum"] = pd.to_datetime(df["Datum"])
-    except Exception:
-        pass
-
-df_last = df.sort_values("Datum").groupby("Name").tail(1)
-
 metrics = [
     ("VO2max rel (ml/min/kg)", "VO₂max rel (ml/min/kg)"),
     ("VLamax (mmol/l/s)", "VLamax (mmol/l/s)"),
@@ -38,9 +29,9 @@ metrics = [
     ("FatMax (W)", "FatMax (W)"),
 ]
 
+df_last = latest_per_athlete(["Name"] + [col for col, _ in metrics])
+
 for col, label in metrics:
-    if col not in df_last.columns:
-        continue
     st.subheader(label)
     fig, ax = plt.subplots()
     ax.bar(df_last["Name"], df_last[col], color="#3CB371")
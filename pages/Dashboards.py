@@ -2,7 +2,7 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-from pathlib import Path
+from utils.results_db import ensure_imported, count, query, latest_per_athlete, athlete_names
 
 st.set_page_config(page_title="📊 Dashboards – 360 Coaching Lab", page_icon="📊", layout="wide")
 
@@ -11,22 +11,19 @@ st.sidebar.markdown("---")
 st.sidebar.page_link("app.py", label="🚴 Performance Analyzer")
 st.sidebar.page_link("pages/Dashboards.py", label="📊 Dashboards")
 st.sidebar.page_link("pages/Analyse_Overview.py", label="📈 Analyse-Übersicht")
+st.sidebar.page_link("pages/Pacing.py", label="🏁 Pacing")
 st.sidebar.markdown("---")
 st.sidebar.markdown("**Version:** 1.9.2**")
 
 st.title("📊 Dashboards")
 
-csv_path = Path("data/athleten_daten.csv")
-if not csv_path.exists():
+ensure_imported()
+if count() == 0:
     st.info("Noch keine Daten vorhanden. Führe zuerst eine Analyse im Haupt-Tool aus, damit Ergebnisse gespeichert werden.")
     st.stop()
 
-df = pd.read_csv(csv_path)
-if "Datum" in df.columns:
-    try:
-        df["Datum"] = pd.to_datetime(df["Datum"])
-    except Exception:
-        pass
+df = query(["Name","Datum","VO2max rel (ml/min/kg)","VLamax (mmol/l/s)","FTP (W)","FatMax (W)"])
+df["Datum"] = pd.to_datetime(df["Datum"])
 
 st.subheader("VO₂max vs. VLamax")
 left, right = st.columns([3,2])
@@ -38,16 +35,15 @@ with left:
     ax.grid(True, alpha=0.3)
     st.pyplot(fig)
 with right:
-    st.dataframe(df[["Name","Datum","VO2max rel (ml/min/kg)","VLamax (mmol/l/s)","FTP (W)","FatMax (W)"]].sort_values(by="Datum", ascending=False).reset_index(drop=True))
+    st.dataframe(df)
 
 st.subheader("Vergleich pro Athlet (Balken)")
-names = sorted(df["Name"].unique().tolist())
+names = athlete_names()
 sel = st.multiselect("Athleten auswählen", names, default=names[: min(5, len(names))])
-filt = df[df["Name"].isin(sel)]
-if len(filt) == 0:
+if len(sel) == 0:
     st.info("Bitte mindestens einen Athleten auswählen.")
 else:
-    last = filt.sort_values("Datum").groupby("Name").tail(1)
+    last = latest_per_athlete(["Name","VO2max rel (ml/min/kg)","VLamax (mmol/l/s)"], names=sel)
     fig2, ax2 = plt.subplots()
     ax2.bar(last["Name"], last["VO2max rel (ml/min/kg)"], color="#3CB371")
     ax2.set_ylabel("VO₂max rel (ml/min/kg)")
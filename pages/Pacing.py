@@ -0,0 +1,155 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from calculations.pacing import (
+    RiderSetup, build_speed_table, course_segments, demo_course, optimize_pacing, read_course, setup_key,
+)
+
+st.set_page_config(page_title="🏁 Pacing – 360 Coaching Lab", page_icon="🏁", layout="wide")
+
+st.sidebar.markdown("### 🧬 360 Coaching Lab")
+st.sidebar.markdown("---")
+st.sidebar.page_link("app.py", label="🚴 Performance Analyzer")
+st.sidebar.page_link("pages/Dashboards.py", label="📊 Dashboards")
+st.sidebar.page_link("pages/Analyse_Overview.py", label="📈 Analyse-Übersicht")
+st.sidebar.page_link("pages/Pacing.py", label="🏁 Pacing")
+st.sidebar.markdown("---")
+st.sidebar.markdown("**Version:** 1.9.2**")
+
+st.title("🏁 Pacing-Plan")
+st.markdown("Leistung je Streckenabschnitt für minimale Fahrzeit – gleiche Arbeit wie gleichmäßiges Fahren "
+            "mit der Ziel-Leistung, W′bal (Skiba) fällt nie unter die Reserve.")
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_table(key, p_max):
+    # Geschwindigkeits-Leistungs-Tabelle je Fahrer/Rad-Setup
+    return build_speed_table(RiderSetup(*key), p_max)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_plan(length, grade, cp, w_prime, key, target_w, p_max, reserve_j):
+    table = cached_table(key, p_max)
+    return optimize_pacing(length, grade, cp, w_prime, RiderSetup(*key), target_w, p_max, reserve_j, table)
+
+
+# -----------------------------
+# Athlet: CP/W′ aus der letzten Analyse (sonst manuell)
+# -----------------------------
+r = st.session_state.get("results")
+st.sidebar.header("Athlet")
+if r:
+    st.sidebar.caption(f"Werte aus der aktuellen Analyse{' – ' + r['athlete_name'] if r.get('athlete_name') else ''}.")
+
+
+def _prefill(key, default, lo, hi, ndigits=0):
+    """Wert aus der letzten Analyse (auf den Eingabebereich begrenzt), sonst Default."""
+    v = r.get(key) if r else None
+    if v is None or not np.isfinite(float(v)):
+        return default
+    return float(round(max(lo, min(hi, float(v))), ndigits))
+
+
+cp = st.sidebar.number_input("CP (W)", 100.0, 600.0, _prefill("cp", 280.0, 100.0, 600.0), step=1.0)
+w_prime = st.sidebar.number_input("W′ (J)", 2000.0, 60000.0, _prefill("w_prime", 18000.0, 2000.0, 60000.0, -1),
+                                  step=100.0)
+ftp = _prefill("ftp", 0.9 * cp, 50.0, cp)
+target_w = st.sidebar.number_input("Ziel-Leistung gleichmäßig (W)", 50.0, float(cp), float(round(min(ftp, cp))),
+                                   step=1.0, help="Arbeitsbudget = gleichmäßiges Fahren mit dieser Leistung. "
+                                                  "Für lange Rennen unter FTP wählen.")
+p_max = st.sidebar.number_input("Max. Leistung (W)", float(cp), 2000.0, float(round(1.5 * cp)), step=10.0)
+reserve_pct = st.sidebar.slider("W′-Reserve (%)", 0, 50, 10)
+
+st.sidebar.header("Fahrer & Rad")
+rider_kg = st.sidebar.number_input("Fahrergewicht (kg)", 40.0, 150.0, _prefill("weight", 70.0, 40.0, 150.0, 1), step=0.1)
+bike_kg = st.sidebar.number_input("Rad + Ausrüstung (kg)", 5.0, 30.0, 9.0, step=0.1)
+cda = st.sidebar.number_input("CdA (m²)", 0.15, 0.60, 0.32, step=0.01)
+crr = st.sidebar.number_input("Crr", 0.002, 0.015, 0.004, step=0.0005, format="%.4f")
+rho = st.sidebar.number_input("Luftdichte (kg/m³)", 0.90, 1.35, 1.20, step=0.01)
+wind = st.sidebar.number_input("Gegenwind (km/h, negativ = Rückenwind)", -40.0, 40.0, 0.0, step=1.0)
+v_max = st.sidebar.number_input("Max. Tempo bergab (km/h)", 30.0, 110.0, 70.0, step=1.0)
+
+# -----------------------------
+# Strecke
+# -----------------------------
+st.subheader("Strecke")
+c1, c2 = st.columns([3, 1])
+with c1:
+    course_file = st.file_uploader("Streckenprofil (CSV)", type=["csv"],
+                                   help="Spalten: Distanz (distance_m oder distance_km) und Höhe (elevation_m) "
+                                        "oder Steigung (grade, %).")
+with c2:
+    segment_m = st.number_input("Abschnittslänge (m)", 5.0, 500.0, 10.0, step=5.0)
+
+try:
+    if course_file is not None:
+        dist, ele, grade = read_course(course_file)
+    else:
+        demo_km = st.slider("Beispielstrecke (km)", 10, 200, 60, step=10)
+        dist, ele = demo_course(demo_km)
+        grade = None
+        st.caption("Keine Datei – welliges Beispielprofil mit einem längeren Anstieg.")
+    length, seg_grade = course_segments(dist, ele, grade, segment_m)
+except Exception as e:
+    st.error(f"Streckenprofil konnte nicht gelesen werden: {e}")
+    st.stop()
+
+setup = RiderSetup(mass_kg=rider_kg + bike_kg, cda_m2=cda, crr=crr, rho=rho, efficiency=0.975,
+                   headwind_ms=wind / 3.6, v_max_ms=v_max / 3.6)
+try:
+    plan = cached_plan(length, seg_grade, cp, w_prime, setup_key(setup), target_w, p_max,
+                       reserve_pct / 100.0 * w_prime)
+except Exception as e:
+    st.error(f"Pacing-Plan konnte nicht berechnet werden: {e}")
+    st.stop()
+
+# -----------------------------
+# Ergebnis
+# -----------------------------
+s = plan.summary()
+
+
+def _hms(sec):
+    sec = int(round(sec))
+    return f"{sec // 3600}:{sec // 60 % 60:02d}:{sec % 60:02d}"
+
+
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("Fahrzeit", _hms(s["time_s"]), f"−{_hms(s['saved_s'])} vs. gleichmäßig" if s["saved_s"] > 0 else None,
+          delta_color="inverse")
+m2.metric("Ø Leistung", f"{s['avg_power_w']:.0f} W", f"{s['work_kj']:.0f} kJ", delta_color="off")
+m3.metric("Ø Tempo", f"{s['avg_speed_kmh']:.1f} km/h", f"{s['distance_km']:.1f} km", delta_color="off")
+m4.metric("Min. W′bal", f"{s['min_wbal_j']:.0f} J", f"{s['min_wbal_j'] / w_prime * 100:.0f} % von W′", delta_color="off")
+
+km = plan.distance_m / 1000.0
+elev = np.concatenate([[0.0], np.cumsum(plan.grade * plan.length_m)])[1:]
+fig, (ax1, ax3) = plt.subplots(2, 1, figsize=(10, 6), sharex=True, gridspec_kw={"height_ratios": [3, 2]})
+ax1.fill_between(km, elev, elev.min(), color="#dddddd", label="Höhenprofil")
+ax1.set_ylabel("Höhe (relativ, m)")
+ax2 = ax1.twinx()
+ax2.plot(km, plan.power, color="#1f77b4", linewidth=1.0, label="Leistung")
+ax2.axhline(cp, color="gray", linestyle="--", linewidth=1)
+ax2.axhline(target_w, color="#ff7f0e", linestyle=":", linewidth=1)
+ax2.text(km[-1], cp, f"CP {cp:.0f} W", va="bottom", ha="right", fontsize=8, color="gray")
+ax2.set_ylabel("Leistung (W)")
+ax1.set_title("Leistungsplan")
+ax3.plot(km, plan.wbal / 1000.0, color="#2ca02c", linewidth=1.2)
+ax3.axhline(reserve_pct / 100.0 * w_prime / 1000.0, color="red", linestyle="--", linewidth=0.8)
+ax3.set_ylabel("W′bal (kJ)")
+ax3.set_xlabel("Distanz (km)")
+for ax in (ax1, ax3):
+    ax.grid(True, linestyle="--", linewidth=0.5, alpha=0.7)
+fig.tight_layout()
+st.pyplot(fig)
+
+with st.expander("Plan je Kilometer"):
+    st.dataframe(plan.per_km(), width="stretch", hide_index=True)
+
+seg = pd.DataFrame({
+    "distance_m": plan.distance_m.round(1), "grade_pct": (plan.grade * 100).round(2),
+    "power_w": plan.power.round(0), "speed_kmh": (plan.speed * 3.6).round(2),
+    "time_s": plan.time_s.round(2), "wbal_j": plan.wbal.round(0),
+})
+st.download_button("📥 Plan als CSV", data=seg.to_csv(index=False).encode("utf-8"),
+                   file_name="pacing_plan.csv", mime="text/csv")
@@ -5,28 +5,65 @@ from reportlab.lib.units import cm
 from reportlab.lib import colors
 from reportlab.lib.utils import ImageReader
 from io import BytesIO
+from collections import OrderedDict
+from datetime import date
+from functools import lru_cache
+import hashlib
+import os
+import threading
 
-import matplotlib
-matplotlib.use("Agg")  # headless backend for servers/Streamlit Cloud
-import matplotlib.pyplot as plt
+import numpy as np
+
+# Diagramm-Backend: "vector" (reportlab-Grafik, Standard) oder "matplotlib" (PNG, optional)
+PDF_CHART_BACKEND = os.environ.get("PDF_CHART_BACKEND", "vector")
+
+CHART_BLUE = colors.HexColor("#1f77b4")
+CHART_ORANGE = colors.HexColor("#ff7f0e")
+CHART_LIGHTBLUE = colors.HexColor("#9ecae1")
+CHART_GREEN = colors.HexColor("#2ca02c")
+
+_plt = None
+
+
+def _pyplot():
+    """matplotlib erst beim ersten PNG-Diagramm laden (headless Agg-Backend)."""
+    global _plt
+    if _plt is None:
+        import matplotlib
+        matplotlib.use("Agg")  # headless backend for servers/Streamlit Cloud
+        import matplotlib.pyplot as plt
+        _plt = plt
+    return _plt
+
+
+def _chart_backend():
+    if PDF_CHART_BACKEND == "matplotlib":
+        try:
+            _pyplot()
+            return "matplotlib"
+        except ImportError:
+            pass
+    return "vector"
 
 def _fig_to_png_bytes(fig):
     buf = BytesIO()
     fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
-    plt.close(fig)
+    _pyplot().close(fig)
     buf.seek(0)
     return buf.getvalue()
 
+@lru_cache(maxsize=256)
 def _plot_vlamax_gauge(vlamax):
-    fig, ax = plt.subplots(figsize=(4, 1.2))
+    fig, ax = _pyplot().subplots(figsize=(4, 1.2))
     ax.barh([0], [max(0, min(1, vlamax))], height=0.4)
     ax.set_xlim(0, 1); ax.set_yticks([]); ax.set_xlabel("VLamax (mmol/l/s)")
     ax.text(max(0, min(1, vlamax)), 0, f"{vlamax:.2f}", va="center", ha="center")
     fig.tight_layout()
     return _fig_to_png_bytes(fig)
 
+@lru_cache(maxsize=256)
 def _plot_vo2_gauge(vo2_rel, lo=40, hi=80):
-    fig, ax = plt.subplots(figsize=(4, 1.2))
+    fig, ax = _pyplot().subplots(figsize=(4, 1.2))
     val = max(lo, min(hi, vo2_rel))
     ax.barh([0], [val-lo], height=0.4)
     ax.set_xlim(0, hi-lo); ax.set_yticks([]); ax.set_xlabel(f"VO₂max (ml/min/kg) [{lo}–{hi}]")
@@ -34,10 +71,11 @@ def _plot_vo2_gauge(vo2_rel, lo=40, hi=80):
     fig.tight_layout()
     return _fig_to_png_bytes(fig)
 
+@lru_cache(maxsize=256)
 def _plot_fatmax_in_zones(fatmax_w, cp, ga1_range, ga2_range):
     ga1_lo, ga1_hi = ga1_range
     ga2_lo, ga2_hi = ga2_range
-    fig, ax = plt.subplots(figsize=(6, 1.2))
+    fig, ax = _pyplot().subplots(figsize=(6, 1.2))
     ax.hlines(0, ga1_lo, ga1_hi, linewidth=10)
     ax.hlines(0, ga2_lo, ga2_hi, linewidth=10)
     ax.plot([fatmax_w], [0], marker="o")
@@ -45,12 +83,23 @@ def _plot_fatmax_in_zones(fatmax_w, cp, ga1_range, ga2_range):
     fig.tight_layout()
     return _fig_to_png_bytes(fig)
 
-def _plot_cp_curve(cp, w_prime, pts):
-    import numpy as np
-    fig, ax = plt.subplots(figsize=(6, 3))
+def _model_curve(power_model, t_curve):
+    """(Name, Parameter, Kriterium) → (Kurve, Legendentext) des gewählten Leistungsmodells."""
+    from calculations.power_models import MODEL_LABELS, predict_power
+
+    name, params, _criterion = power_model
+    return predict_power(name, params, t_curve), MODEL_LABELS[name]
+
+
+@lru_cache(maxsize=256)
+def _plot_cp_curve(cp, w_prime, pts, power_model=None):
+    fig, ax = _pyplot().subplots(figsize=(6, 3))
     t_curve = np.linspace(15, 1200, 200)
     p_curve = cp + (w_prime / t_curve)
     ax.plot(t_curve, p_curve, label="CP-Modell")
+    if power_model:
+        m_curve, m_label = _model_curve(power_model, t_curve)
+        ax.plot(t_curve, m_curve, linestyle="--", color="#2ca02c", label=m_label)
     if pts:
         t_pts = [t for t,_ in pts]; p_pts = [p for _,p in pts]
         ax.scatter(t_pts, p_pts, label="Messpunkte")
@@ -60,7 +109,228 @@ def _plot_cp_curve(cp, w_prime, pts):
     fig.tight_layout()
     return _fig_to_png_bytes(fig)
 
-def _render_pdf(c, athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts):
+@lru_cache(maxsize=64)
+def _plot_wbal(w_prime, wbal):
+    method, t_s, values = wbal
+    fig, ax = _pyplot().subplots(figsize=(6, 3))
+    ax.plot(np.asarray(t_s) / 60.0, np.asarray(values) / 1000.0, color="#1f77b4", linewidth=1.2,
+            label=f"W′bal ({method})")
+    ax.axhline(0, color="#d62728", linewidth=0.8)
+    ax.axhline(w_prime / 1000.0, color="gray", linestyle="--", linewidth=0.8, label="W′")
+    ax.set_xlabel("Zeit (min)"); ax.set_ylabel("W′bal (kJ)")
+    ax.legend(loc="lower right", fontsize=7)
+    fig.tight_layout()
+    return _fig_to_png_bytes(fig)
+
+# -----------------------------
+# Vektor-Diagramme (reportlab-Primitive, kein Rastern)
+# -----------------------------
+def _fit_box(x, y, w, h, aspect):
+    """Wie drawImage(preserveAspectRatio=True): Box mit Seitenverhältnis w/h zentriert einpassen."""
+    if w / h > aspect:
+        w2, h2 = h * aspect, h
+    else:
+        w2, h2 = w, w / aspect
+    return x + (w - w2) / 2, y + (h - h2) / 2, w2, h2
+
+
+def _nice_ticks(lo, hi, n=5):
+    span = max(hi - lo, 1e-9)
+    raw = span / n
+    mag = 10 ** np.floor(np.log10(raw))
+    step = next(m * mag for m in (1, 2, 2.5, 5, 10) if m * mag >= raw)
+    start = np.ceil(lo / step) * step
+    return [float(v) for v in np.arange(start, hi + step * 1e-6, step)]
+
+
+def _x_axis(c, fx, fy, fw, to_x, ticks, label, fmt):
+    c.setStrokeColor(colors.black); c.setLineWidth(0.6)
+    c.line(fx, fy, fx + fw, fy)
+    c.setFont("Helvetica", 7); c.setFillColor(colors.black)
+    for v in ticks:
+        x = to_x(v)
+        c.line(x, fy, x, fy - 3)
+        c.drawCentredString(x, fy - 10, fmt(v))
+    c.setFont("Helvetica", 8)
+    c.drawCentredString(fx + fw / 2, fy - 21, label)
+
+
+def _draw_hbar_gauge(c, x, y, w, h, value, vmin, vmax, ticks, xlabel, text, fmt):
+    x, y, w, h = _fit_box(x, y, w, h, 4 / 1.2)
+    fx, fy, fw, fh = x + 6, y + 26, w - 12, h - 32
+    to_x = lambda v: fx + (v - vmin) / (vmax - vmin) * fw
+    c.saveState()
+    c.setStrokeColor(colors.black); c.setLineWidth(0.6)
+    c.rect(fx, fy, fw, fh, stroke=1, fill=0)
+    bh = 0.4 * fh
+    c.setFillColor(CHART_BLUE)
+    c.rect(fx, fy + (fh - bh) / 2, to_x(value) - fx, bh, stroke=0, fill=1)
+    c.setFillColor(colors.black); c.setFont("Helvetica", 8)
+    c.drawCentredString(to_x(value), fy + fh / 2 - 3, text)
+    _x_axis(c, fx, fy, fw, to_x, ticks, xlabel, fmt)
+    c.restoreState()
+
+
+def _draw_vlamax_gauge(c, x, y, w, h, vlamax):
+    v = max(0, min(1, vlamax))
+    _draw_hbar_gauge(c, x, y, w, h, v, 0.0, 1.0, [0, 0.2, 0.4, 0.6, 0.8, 1.0],
+                     "VLamax (mmol/l/s)", f"{vlamax:.2f}", lambda t: f"{t:.1f}")
+
+
+def _draw_vo2_gauge(c, x, y, w, h, vo2_rel, lo=40, hi=80):
+    val = max(lo, min(hi, vo2_rel))
+    _draw_hbar_gauge(c, x, y, w, h, val - lo, 0, hi - lo, _nice_ticks(0, hi - lo, 4),
+                     f"VO2max (ml/min/kg) [{lo}–{hi}]", f"{vo2_rel:.1f}", lambda t: f"{t:.0f}")
+
+
+def _draw_fatmax_in_zones(c, x, y, w, h, fatmax_w, cp, ga1_range, ga2_range):
+    x, y, w, h = _fit_box(x, y, w, h, 6 / 1.2)
+    fx, fy, fw, fh = x + 6, y + 26, w - 12, h - 32
+    vmax = max(cp * 1.1, 1.0)
+    to_x = lambda v: fx + max(0.0, min(v, vmax)) / vmax * fw
+    yc = fy + fh / 2
+    c.saveState()
+    c.setStrokeColor(colors.black); c.setLineWidth(0.6)
+    c.rect(fx, fy, fw, fh, stroke=1, fill=0)
+    c.setLineWidth(10)
+    for (lo, hi), col in ((ga1_range, CHART_LIGHTBLUE), (ga2_range, CHART_BLUE)):
+        c.setStrokeColor(col)
+        c.line(to_x(lo), yc, to_x(hi), yc)
+    c.setFillColor(CHART_ORANGE)
+    c.circle(to_x(fatmax_w), yc, 3.5, stroke=0, fill=1)
+    _x_axis(c, fx, fy, fw, to_x, _nice_ticks(0, vmax, 6), "Watt", lambda t: f"{t:.0f}")
+    c.restoreState()
+
+
+def _draw_cp_curve(c, x, y, w, h, cp, w_prime, pts, power_model=None):
+    x, y, w, h = _fit_box(x, y, w, h, 6 / 3)
+    fx, fy, fw, fh = x + 40, y + 28, w - 48, h - 36
+    t_curve = np.linspace(15, 1200, 200)
+    p_curve = cp + (w_prime / t_curve)
+    m_curve = m_label = None
+    if power_model:
+        m_curve, m_label = _model_curve(power_model, t_curve)
+    p_all = np.concatenate([p_curve, [p for _, p in pts]]) if pts else p_curve
+    if m_curve is not None:
+        p_all = np.concatenate([p_all, m_curve])
+    pad = max(1.0, 0.05 * (p_all.max() - p_all.min()))
+    pmin, pmax = p_all.min() - pad, p_all.max() + pad
+    lt0, lt1 = np.log10(15), np.log10(1200)
+    to_x = lambda t: fx + (np.log10(t) - lt0) / (lt1 - lt0) * fw
+    to_y = lambda p: fy + (p - pmin) / (pmax - pmin) * fh
+
+    c.saveState()
+    c.setStrokeColor(colors.black); c.setLineWidth(0.6)
+    c.rect(fx, fy, fw, fh, stroke=1, fill=0)
+    _x_axis(c, fx, fy, fw, to_x, [15, 30, 60, 120, 300, 600, 1200], "Dauer (s) (log)", lambda t: f"{t:.0f}")
+    c.setFont("Helvetica", 7)
+    for p in _nice_ticks(pmin, pmax, 5):
+        yy = to_y(p)
+        c.line(fx - 3, yy, fx, yy)
+        c.drawRightString(fx - 5, yy - 2.5, f"{p:.0f}")
+    c.setFont("Helvetica", 8)
+    c.saveState(); c.translate(x + 8, fy + fh / 2); c.rotate(90)
+    c.drawCentredString(0, 0, "Leistung (W)"); c.restoreState()
+
+    path = c.beginPath()
+    path.moveTo(to_x(t_curve[0]), to_y(p_curve[0]))
+    for t, p in zip(t_curve[1:], p_curve[1:]):
+        path.lineTo(to_x(t), to_y(p))
+    c.setStrokeColor(CHART_BLUE); c.setLineWidth(1.5)
+    c.drawPath(path, stroke=1, fill=0)
+    if m_curve is not None:
+        path = c.beginPath()
+        path.moveTo(to_x(t_curve[0]), to_y(m_curve[0]))
+        for t, p in zip(t_curve[1:], m_curve[1:]):
+            path.lineTo(to_x(t), to_y(p))
+        c.setStrokeColor(CHART_GREEN); c.setDash(4, 2)
+        c.drawPath(path, stroke=1, fill=0)
+        c.setDash()
+    c.setFillColor(CHART_ORANGE)
+    for t, p in pts:
+        c.circle(to_x(t), to_y(p), 3, stroke=0, fill=1)
+
+    # Legende
+    lx, ly = fx + fw - (110 if m_label else 80), fy + fh - 12
+    c.setStrokeColor(CHART_BLUE); c.line(lx, ly + 2.5, lx + 14, ly + 2.5)
+    c.setFillColor(colors.black); c.setFont("Helvetica", 7); c.drawString(lx + 18, ly, "CP-Modell")
+    if m_label:
+        ly -= 11
+        c.setStrokeColor(CHART_GREEN); c.setDash(4, 2); c.line(lx, ly + 2.5, lx + 14, ly + 2.5); c.setDash()
+        c.drawString(lx + 18, ly, m_label)
+    if pts:
+        c.setFillColor(CHART_ORANGE); c.circle(lx + 7, ly - 8.5, 2.5, stroke=0, fill=1)
+        c.setFillColor(colors.black); c.drawString(lx + 18, ly - 11, "Messpunkte")
+    c.restoreState()
+
+def _draw_wbal(c, x, y, w, h, w_prime, wbal):
+    method, t_s, values = wbal
+    x, y, w, h = _fit_box(x, y, w, h, 6 / 3)
+    fx, fy, fw, fh = x + 40, y + 28, w - 48, h - 36
+    t_min = np.asarray(t_s) / 60.0
+    kj = np.asarray(values) / 1000.0
+    tmax = max(float(t_min[-1]) if t_min.size else 1.0, 1e-6)
+    lo = min(0.0, float(kj.min()) if kj.size else 0.0)
+    hi = max(w_prime / 1000.0, float(kj.max()) if kj.size else 0.0)
+    pad = max(0.1, 0.05 * (hi - lo))
+    lo, hi = lo - pad, hi + pad
+    to_x = lambda t: fx + t / tmax * fw
+    to_y = lambda v: fy + (v - lo) / (hi - lo) * fh
+
+    c.saveState()
+    c.setStrokeColor(colors.black); c.setLineWidth(0.6)
+    c.rect(fx, fy, fw, fh, stroke=1, fill=0)
+    _x_axis(c, fx, fy, fw, to_x, _nice_ticks(0, tmax, 6), "Zeit (min)", lambda t: f"{t:.0f}")
+    c.setFont("Helvetica", 7)
+    for v in _nice_ticks(lo, hi, 5):
+        yy = to_y(v)
+        c.line(fx - 3, yy, fx, yy)
+        c.drawRightString(fx - 5, yy - 2.5, f"{v:g}")
+    c.setFont("Helvetica", 8)
+    c.saveState(); c.translate(x + 8, fy + fh / 2); c.rotate(90)
+    c.drawCentredString(0, 0, "W′bal (kJ)"); c.restoreState()
+
+    c.setStrokeColor(colors.grey); c.setDash(3, 2)
+    c.line(fx, to_y(w_prime / 1000.0), fx + fw, to_y(w_prime / 1000.0)); c.setDash()
+    c.setStrokeColor(colors.red); c.setLineWidth(0.6)
+    c.line(fx, to_y(0), fx + fw, to_y(0))
+    if kj.size:
+        path = c.beginPath()
+        path.moveTo(to_x(t_min[0]), to_y(kj[0]))
+        for t, v in zip(t_min[1:], kj[1:]):
+            path.lineTo(to_x(t), to_y(v))
+        c.setStrokeColor(CHART_BLUE); c.setLineWidth(1.0)
+        c.drawPath(path, stroke=1, fill=0)
+    c.setFillColor(colors.black); c.setFont("Helvetica", 7)
+    c.drawRightString(fx + fw - 4, fy + fh - 10, f"W′bal ({method})")
+    c.restoreState()
+
+
+def _render_wbal_page(c, w_prime, wbal):
+    """Seite 2: W′-Balance der hochgeladenen Fahrt."""
+    method, t_s, values = wbal
+    width, height = A4
+    margin = 2*cm
+    y = height - margin
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(margin, y, "W′-Balance (Skiba)")
+    y -= 0.7*cm
+    c.setFont("Helvetica", 10)
+    if values:
+        j = int(np.argmin(values))
+        c.drawString(margin, y, f"Minimum: {values[j]:.0f} J ({values[j] / w_prime * 100:.0f} % von W′) "
+                                f"nach {t_s[j] / 60:.0f} min • Methode: {method}")
+    y -= 0.8*cm
+    img_h = 8.0*cm; img_w = width - 2*margin
+    if _chart_backend() == "vector":
+        _draw_wbal(c, margin, y-img_h, img_w, img_h, w_prime, wbal)
+    else:
+        img = ImageReader(BytesIO(_plot_wbal(float(w_prime), wbal)))
+        c.drawImage(img, margin, y-img_h, width=img_w, height=img_h, preserveAspectRatio=True, mask='auto')
+
+
+def _render_pdf(c, athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts,
+                power_model=None, wbal=None):
     width, height = A4
     margin = 2*cm
     y = height - margin
@@ -74,7 +344,6 @@ def _render_pdf(c, athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_ran
     c.setFillColor(colors.black)
     y -= 1.2*cm
 
-    from datetime import date
     c.setFont("Helvetica-Bold", 12)
     c.drawString(margin, y, f"Athlet: {athlete_name or '-'}")
     c.drawRightString(width - margin, y, f"Datum: {date.today().isoformat()}")
@@ -87,6 +356,12 @@ def _render_pdf(c, athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_ran
         ("W′", f"{w_prime:.0f} J", "Anaerobe Kapazität oberhalb CP."),
         ("FatMax", f"{fatmax_w:.0f} W", "Leistung mit max. Fettstoffwechsel."),
     ]
+    if power_model:
+        from calculations.power_models import MODEL_LABELS
+
+        name, params, criterion = power_model
+        lines.append(("Leistungsmodell", MODEL_LABELS[name],
+                      f"Auswahl per {criterion.upper()} • CP {params[0]:.0f} W • W′ {params[1]:.0f} J"))
     c.setFont("Helvetica-Bold", 11); c.drawString(margin, y, "Kennzahlen – Überblick"); y -= 0.5*cm
     c.setFont("Helvetica", 10)
     for title, val, desc in lines:
@@ -97,38 +372,183 @@ def _render_pdf(c, athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_ran
     c.setStrokeColor(colors.lightgrey); c.line(margin, y, width-margin, y); c.setStrokeColor(colors.black)
     y -= 0.6*cm
 
-    # --- charts (in-memory images) ---
-    v_img = ImageReader(BytesIO(_plot_vlamax_gauge(vlamax)))
-    vo2_img = ImageReader(BytesIO(_plot_vo2_gauge(vo2_rel)))
-    fatmax_img = ImageReader(BytesIO(_plot_fatmax_in_zones(fatmax_w, cp, ga1_range, ga2_range)))
-    cpcurve_img = ImageReader(BytesIO(_plot_cp_curve(cp, w_prime, pts or [])))
-
     img_h = 3.5*cm; img_w = 8.0*cm
-    c.drawImage(v_img, margin, y-img_h, width=img_w, height=img_h, preserveAspectRatio=True, mask='auto')
-    c.drawImage(vo2_img, margin+img_w+0.6*cm, y-img_h, width=img_w, height=img_h, preserveAspectRatio=True, mask='auto')
-    y -= img_h + 0.8*cm
-
     img_h2 = 3.0*cm; img_w2 = width - 2*margin
-    c.drawImage(fatmax_img, margin, y-img_h2, width=img_w2, height=img_h2, preserveAspectRatio=True, mask='auto')
-    y -= img_h2 + 0.8*cm
-
     img_h3 = 6.0*cm; img_w3 = width - 2*margin
-    c.drawImage(cpcurve_img, margin, y-img_h3, width=img_w3, height=img_h3, preserveAspectRatio=True, mask='auto')
-    y -= img_h3 + 0.6*cm
+
+    if _chart_backend() == "vector":
+        # --- charts (vector, reportlab primitives) ---
+        _draw_vlamax_gauge(c, margin, y-img_h, img_w, img_h, vlamax)
+        _draw_vo2_gauge(c, margin+img_w+0.6*cm, y-img_h, img_w, img_h, vo2_rel)
+        y -= img_h + 0.8*cm
+        _draw_fatmax_in_zones(c, margin, y-img_h2, img_w2, img_h2, fatmax_w, cp, ga1_range, ga2_range)
+        y -= img_h2 + 0.8*cm
+        _draw_cp_curve(c, margin, y-img_h3, img_w3, img_h3, cp, w_prime, _pts_key(pts), power_model)
+        y -= img_h3 + 0.6*cm
+    else:
+        # --- charts (matplotlib fallback, in-memory images) ---
+        v_img = ImageReader(BytesIO(_plot_vlamax_gauge(vlamax)))
+        vo2_img = ImageReader(BytesIO(_plot_vo2_gauge(vo2_rel)))
+        fatmax_img = ImageReader(BytesIO(_plot_fatmax_in_zones(fatmax_w, cp, tuple(ga1_range), tuple(ga2_range))))
+        cpcurve_img = ImageReader(BytesIO(_plot_cp_curve(cp, w_prime, _pts_key(pts), power_model)))
+
+        c.drawImage(v_img, margin, y-img_h, width=img_w, height=img_h, preserveAspectRatio=True, mask='auto')
+        c.drawImage(vo2_img, margin+img_w+0.6*cm, y-img_h, width=img_w, height=img_h, preserveAspectRatio=True, mask='auto')
+        y -= img_h + 0.8*cm
+        c.drawImage(fatmax_img, margin, y-img_h2, width=img_w2, height=img_h2, preserveAspectRatio=True, mask='auto')
+        y -= img_h2 + 0.8*cm
+        c.drawImage(cpcurve_img, margin, y-img_h3, width=img_w3, height=img_h3, preserveAspectRatio=True, mask='auto')
+        y -= img_h3 + 0.6*cm
 
     c.setFillColor(colors.grey)
     c.setFont("Helvetica", 9)
     c.drawRightString(width - margin, 1.5*cm, "©")
+    if wbal:
+        c.showPage()
+        _render_wbal_page(c, w_prime, wbal)
+        c.setFillColor(colors.grey)
+        c.setFont("Helvetica", 9)
+        c.drawRightString(width - margin, 1.5*cm, "©")
     c.save()
 
-def create_analysis_pdf(output_path, athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts=None):
-    c = canvas.Canvas(str(output_path), pagesize=A4)
-    _render_pdf(c, athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts or [])
+# -----------------------------
+# Cache (Hash der Eingaben → fertige PDF-Bytes)
+# -----------------------------
+PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR", os.path.join(".cache", "pdf"))
+PDF_CACHE_MEM_ITEMS = 64
+PDF_CACHE_DISK_ITEMS = 512
+_PDF_CACHE_VERSION = "1"  # erhöhen, wenn sich das Layout ändert
+
+_pdf_mem = OrderedDict()
+_pdf_lock = threading.Lock()
+
+
+def _pts_key(pts):
+    return tuple((float(t), float(p)) for t, p in (pts or []))
+
+
+def _model_key(power_model):
+    """(Name, Parameter, Kriterium) hashbar machen; None bleibt None."""
+    if not power_model:
+        return None
+    name, params, criterion = power_model
+    return str(name), tuple(float(x) for x in params), str(criterion)
+
 
-def create_analysis_pdf_bytes(athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts=None):
+def _wbal_key(wbal):
+    """(Methode, Zeiten, W′bal-Werte) hashbar machen; None bleibt None."""
+    if not wbal:
+        return None
+    method, t_s, values = wbal
+    return str(method), tuple(float(t) for t in t_s), tuple(float(v) for v in values)
+
+
+def _pdf_cache_key(athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts,
+                   power_model=None, wbal=None):
+    # Datum gehört zum Inhalt (steht im PDF-Kopf)
+    parts = (
+        _PDF_CACHE_VERSION, _chart_backend(), date.today().isoformat(), str(athlete_name or ""),
+        float(vo2_rel), float(vlamax), float(cp), float(w_prime), float(fatmax_w),
+        tuple(map(float, ga1_range)), tuple(map(float, ga2_range)), _pts_key(pts),
+    )
+    if power_model:
+        parts += (_model_key(power_model),)
+    if wbal:
+        parts += (_wbal_key(wbal),)
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+def _disk_path(key):
+    return os.path.join(PDF_CACHE_DIR, f"{key}.pdf")
+
+
+def _cache_get(key):
+    with _pdf_lock:
+        pdf = _pdf_mem.get(key)
+        if pdf is not None:
+            _pdf_mem.move_to_end(key)
+            return pdf
+    try:
+        with open(_disk_path(key), "rb") as f:
+            pdf = f.read()
+    except OSError:
+        return None
+    _cache_put(key, pdf, disk=False)
+    return pdf
+
+
+def _cache_put(key, pdf, disk=True):
+    with _pdf_lock:
+        _pdf_mem[key] = pdf
+        _pdf_mem.move_to_end(key)
+        while len(_pdf_mem) > PDF_CACHE_MEM_ITEMS:
+            _pdf_mem.popitem(last=False)
+    if not disk:
+        return
+    try:
+        os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+        tmp = f"{_disk_path(key)}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(pdf)
+        os.replace(tmp, _disk_path(key))
+        _prune_disk()
+    except OSError:
+        pass  # Cache ist optional (z.B. schreibgeschütztes Dateisystem)
+
+
+def _prune_disk():
+    files = [e for e in os.scandir(PDF_CACHE_DIR) if e.name.endswith(".pdf")]
+    if len(files) <= PDF_CACHE_DISK_ITEMS:
+        return
+    files.sort(key=lambda e: e.stat().st_mtime)
+    for e in files[:len(files) - PDF_CACHE_DISK_ITEMS]:
+        try:
+            os.remove(e.path)
+        except OSError:
+            pass
+
+
+def clear_pdf_cache(disk=False):
+    with _pdf_lock:
+        _pdf_mem.clear()
+    for fn in (_plot_vlamax_gauge, _plot_vo2_gauge, _plot_fatmax_in_zones, _plot_cp_curve, _plot_wbal):
+        fn.cache_clear()
+    if disk and os.path.isdir(PDF_CACHE_DIR):
+        for e in os.scandir(PDF_CACHE_DIR):
+            if e.name.endswith(".pdf"):
+                os.remove(e.path)
+
+
+def _render_pdf_bytes(athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts,
+                      power_model=None, wbal=None):
     buf = BytesIO()
     c = canvas.Canvas(buf, pagesize=A4)
-    _render_pdf(c, athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts or [])
+    _render_pdf(c, athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts or [],
+                _model_key(power_model), _wbal_key(wbal))
     pdf = buf.getvalue()
     buf.close()
     return pdf
+
+
+def create_analysis_pdf(output_path, athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts=None,
+                        power_model=None, wbal=None):
+    pdf = create_analysis_pdf_bytes(athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts,
+                                    power_model, wbal)
+    with open(str(output_path), "wb") as f:
+        f.write(pdf)
+
+def create_analysis_pdf_bytes(athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts=None,
+                              power_model=None, wbal=None):
+    """
+    PDF als Bytes (gecacht). power_model: optional (Name, Parameter, Kriterium) aus
+    calculations.power_models – wird zusätzlich in die CP-Kurve gezeichnet.
+    wbal: optional (Methode, Zeiten s, W′bal J) aus utils.wbal.wbal_from_ride – Seite 2.
+    """
+    key = _pdf_cache_key(athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts, power_model,
+                         wbal)
+    pdf = _cache_get(key)
+    if pdf is None:
+        pdf = _render_pdf_bytes(athlete_name, vo2_rel, vlamax, cp, w_prime, fatmax_w, ga1_range, ga2_range, pts,
+                                power_model, wbal)
+        _cache_put(key, pdf)
+    return pdf
@@ -0,0 +1,321 @@
+# service.py — lokaler JSON-Dienst für compute_analysis und PDF-Export (ohne Streamlit)
+#
+#   python service.py --port 8765 --workers 4
+#
+#   GET  /health                    → {"status": "ok", ...}
+#   POST /analysis   {…Eingaben…}   → Ergebnis (JSON)
+#   POST /analysis   [{…}, {…}]     → Liste von Ergebnissen (ein Request, viele Athleten)
+#   POST /pdf        {…Eingaben…, "athlete_name": "Anna"}              → application/pdf
+#   POST /pdf        {"cp": …, "w_prime": …, "vo2_rel": …, …}            → application/pdf (Werte direkt)
+#                    optional "power_model": ["cp3", [CP, W′, d], "aic"] → Modellkurve im PDF
+#
+# Eingaben wie compute_analysis (weight, bodyfat, sprint_dur, avg20, peak20, p1min…p12min;
+# gender/birth_date/hfmax optional). asyncio-Frontend mit HTTP/1.1 keep-alive, Rechnen in
+# einem Prozess-Pool. Gleichzeitige Einzel-Requests werden kurz gesammelt (--batch-window-ms)
+# und als ein Pool-Auftrag gerechnet. Jeder Worker hält sein eigenes Stufen-Memo
+# (analysis.ANALYSIS_GRAPH) – wiederholte Athleten rechnen nur geänderte Stufen neu.
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+INPUT_DEFAULTS = {"gender": "Mann", "birth_date": None, "hfmax": None}
+PDF_FIELDS = ("vo2_rel", "vlamax", "cp", "w_prime", "fatmax_w")
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# -----------------------------
+# Worker (Prozess-Pool)
+# -----------------------------
+def _init_worker():
+    # schwere Imports einmal pro Prozess
+    import analysis  # noqa: F401
+    import pdf_export  # noqa: F401
+
+
+def _clean(v):
+    # NaN/inf sind kein gültiges JSON → null
+    if isinstance(v, float):
+        return v if math.isfinite(v) else None
+    if isinstance(v, dict):
+        return {k: _clean(x) for k, x in v.items()}
+    return v
+
+
+def _jsonable(r):
+    """compute_analysis-Ergebnis → JSON-taugliches dict (Zonen als Zeilen, Datum als ISO-String)."""
+    out = {k: _clean(v) for k, v in r.items() if k not in ("zones", "profile")}
+    if isinstance(out.get("birth_date"), date):
+        out["birth_date"] = out["birth_date"].isoformat()
+    out["pts"] = [list(p) for p in r["pts"]]
+    out["zones"] = [
+        {"zone": name, "von_w": lo, "bis_w": hi, "pct_cp": pct, "beschreibung": desc}
+        for name, lo, hi, pct, desc in r["zones"].rows()
+    ]
+    return out
+
+
+def analyse_many(items):
+    """Liste von Eingabe-dicts → Liste von {"ok": …} / {"error": …} (Fehler pro Eintrag)."""
+    from analysis import ANALYSIS_GRAPH, compute_analysis
+
+    results = []
+    for inputs in items:
+        try:
+            r = compute_analysis({**INPUT_DEFAULTS, **inputs}, profile=False, graph=ANALYSIS_GRAPH)
+            results.append({"ok": _jsonable(r)})
+        except KeyError as e:
+            results.append({"error": f"Feld fehlt: {e.args[0]}"})
+        except (TypeError, ValueError) as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def render_pdf(body):
+    from pdf_export import _render_pdf_bytes
+
+    if all(k in body for k in PDF_FIELDS):
+        r = body
+    else:
+        from analysis import ANALYSIS_GRAPH, compute_analysis
+
+        r = compute_analysis({**INPUT_DEFAULTS, **body}, profile=False, graph=ANALYSIS_GRAPH)
+    ga1 = tuple(body.get("ga1_range") or (r["ga1_min"], r["ga1_max"]))
+    ga2 = tuple(body.get("ga2_range") or (ga1[1], 0.90 * float(r["cp"])))
+    # ungecacht: Dienst-PDFs sollen weder Speicher noch .cache/pdf der App füllen
+    return _render_pdf_bytes(
+        body.get("athlete_name", ""), float(r["vo2_rel"]), float(r["vlamax"]), float(r["cp"]),
+        float(r["w_prime"]), float(r["fatmax_w"]), ga1, ga2, pts=body.get("pts", r.get("pts")),
+        power_model=body.get("power_model"),
+    )
+
+
+# -----------------------------
+# Micro-Batching
+# -----------------------------
+class AnalysisBatcher:
+    """Sammelt Einzelanfragen bis max_batch oder window_s und rechnet sie als einen Pool-Auftrag."""
+
+    def __init__(self, pool, window_s=0.002, max_batch=64):
+        self.pool = pool
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self._items = []
+        self._timer = None
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, inputs):
+        fut = asyncio.get_running_loop().create_future()
+        self._items.append((inputs, fut))
+        if len(self._items) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window_s, self._flush)
+        return await fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._items = self._items, []
+        if items:
+            asyncio.ensure_future(self._run(items))
+
+    async def _run(self, items):
+        self.batches += 1
+        self.items += len(items)
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.pool, analyse_many, [i for i, _ in items])
+        except Exception as e:  # Worker abgestürzt o.ä.
+            for _, fut in items:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), res in zip(items, results):
+            if not fut.done():
+                fut.set_result(res)
+
+
+# -----------------------------
+# HTTP (minimal, HTTP/1.1 keep-alive)
+# -----------------------------
+class AnalysisService:
+    def __init__(self, workers=None, window_ms=2.0, max_batch=64):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+        self.batcher = AnalysisBatcher(self.pool, window_ms / 1000.0, max_batch)
+        self.started = time.time()
+        self.requests = 0
+
+    async def handle(self, method, path, body):
+        if path == "/health":
+            return 200, "application/json", {
+                "status": "ok", "workers": self.workers, "requests": self.requests,
+                "batches": self.batcher.batches, "batched_items": self.batcher.items,
+                "uptime_s": round(time.time() - self.started, 1),
+            }
+        if path not in ("/analysis", "/pdf"):
+            raise HTTPError(404, f"Unbekannter Pfad: {path}")
+        if method != "POST":
+            raise HTTPError(405, "Nur POST erlaubt.")
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError as e:
+            raise HTTPError(400, f"Ungültiges JSON: {e}")
+
+        if path == "/pdf":
+            if not isinstance(payload, dict):
+                raise HTTPError(400, "Erwartet ein JSON-Objekt.")
+            loop = asyncio.get_running_loop()
+            try:
+                pdf = await loop.run_in_executor(self.pool, render_pdf, payload)
+            except (KeyError, TypeError, ValueError) as e:
+                raise HTTPError(400, f"PDF nicht möglich: {e!r}")
+            return 200, "application/pdf", pdf
+
+        if isinstance(payload, list):
+            # Client-Batch: ein Pool-Auftrag, Fehler pro Eintrag
+            if not all(isinstance(p, dict) for p in payload):
+                raise HTTPError(400, "Erwartet eine Liste von JSON-Objekten.")
+            # auf alle Worker verteilen, Reihenfolge bleibt erhalten
+            loop = asyncio.get_running_loop()
+            step = max(1, -(-len(payload) // self.workers))
+            parts = await asyncio.gather(*(loop.run_in_executor(self.pool, analyse_many, payload[i:i + step])
+                                           for i in range(0, len(payload), step)))
+            return 200, "application/json", [r.get("ok", r) for part in parts for r in part]
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Erwartet ein JSON-Objekt oder eine Liste davon.")
+        res = await self.batcher.submit(payload)
+        if "error" in res:
+            raise HTTPError(400, res["error"])
+        return 200, "application/json", res["ok"]
+
+    async def connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, "application/json", {"error": "Header zu groß"}, False)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, path, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, "application/json", {"error": "Ungültige Anfrage"}, False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                conn = headers.get("connection", "").lower()
+                keep_alive = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, "application/json", {"error": "Ungültige Content-Length"}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, "application/json", {"error": "Body zu groß"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                self.requests += 1
+                try:
+                    status, ctype, data = await self.handle(method, path.split("?", 1)[0], body)
+                except HTTPError as e:
+                    status, ctype, data = e.status, "application/json", {"error": str(e)}
+                except Exception as e:
+                    status, ctype, data = 500, "application/json", {"error": repr(e)}
+                await self._respond(writer, status, ctype, data, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, ctype, data, keep_alive):
+        payload = data if isinstance(data, (bytes, bytearray)) else \
+            json.dumps(data, ensure_ascii=False, allow_nan=False, default=float).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {ctype}{'; charset=utf-8' if ctype == 'application/json' else ''}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + payload
+        )
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8765, ready=None):
+        # Pool vorwärmen, damit der erste Request nicht die Imports bezahlt
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _init_worker) for _ in range(self.workers)))
+        server = await asyncio.start_server(self.connection, host, port, limit=64 * 1024)
+        # SIGTERM (z. B. load_test --spawn) beendet serve_forever regulär → close() räumt den Pool auf
+        forever = asyncio.ensure_future(server.serve_forever())
+        try:
+            loop.add_signal_handler(signal.SIGTERM, forever.cancel)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: nur Strg+C
+        if ready:
+            ready(server)
+        async with server:
+            try:
+                await forever
+            except asyncio.CancelledError:
+                if not forever.cancelled():
+                    raise
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Lokaler JSON-Dienst für Analyse und PDF-Export.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=None, help="Prozesse (Default: CPU-Kerne)")
+    ap.add_argument("--batch-window-ms", type=float, default=2.0, help="Sammelfenster für Einzel-Requests")
+    ap.add_argument("--max-batch", type=int, default=64)
+    args = ap.parse_args(argv)
+
+    svc = AnalysisService(args.workers, args.batch_window_ms, args.max_batch)
+
+    def ready(server):
+        addr = server.sockets[0].getsockname()
+        print(f"Analyse-Dienst auf http://{addr[0]}:{addr[1]} ({svc.workers} Worker)", file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(svc.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        svc.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+# Tests laufen gegen die Module im Projektverzeichnis (analysis.py, calculations/, utils/)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,94 @@
+# compute_analysis_batch (vektorisiert) gegen compute_analysis: gleiche Eingaben → gleiche Zahlen.
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import compute_analysis, compute_analysis_batch
+
+N = 300
+
+
+def _athletes(seed=0, n=N):
+    """Zufällige, aber plausible Athleten; ein Teil der Leistungswerte fehlt (0 bzw. NaN)."""
+    rng = np.random.default_rng(seed)
+    p3 = rng.uniform(280, 480, n)
+    p5 = p3 * rng.uniform(0.85, 1.02, n)
+    df = pd.DataFrame({
+        "gender": rng.choice(["Mann", "Frau"], n),
+        "weight": rng.uniform(48, 100, n).round(1),
+        "bodyfat": rng.uniform(5, 28, n).round(1),
+        "sprint_dur": rng.integers(10, 31, n).astype(float),
+        "avg20": rng.uniform(400, 1300, n).round(0),
+        "p1min": p3 * rng.uniform(1.2, 1.6, n),
+        "p3min": p3,
+        "p5min": p5,
+        "p12min": p5 * rng.uniform(0.80, 0.97, n),
+    })
+    df["peak20"] = (df["avg20"] * rng.uniform(1.05, 1.5, n)).round(0)
+    for col, share in (("p1min", 0.2), ("p3min", 0.15), ("p5min", 0.15), ("p12min", 0.2)):
+        df.loc[rng.random(n) < share, col] = 0.0
+    df.loc[rng.random(n) < 0.05, "p12min"] = np.nan
+    return df
+
+
+def _scalar(row):
+    inputs = {k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in row.items()}
+    inputs.update(birth_date="1990-01-01", hfmax=190)
+    try:
+        return compute_analysis(inputs, profile=False)
+    except ValueError:
+        return None  # Batch liefert hier NaN
+
+
+@pytest.fixture(scope="module")
+def athletes():
+    return _athletes()
+
+
+@pytest.fixture(scope="module")
+def batch(athletes):
+    return compute_analysis_batch(athletes)
+
+
+@pytest.fixture(scope="module")
+def scalar(athletes):
+    return [_scalar(row) for row in athletes.to_dict("records")]
+
+
+NUMERIC_KEYS = ("vlamax", "vo2_abs", "vo2_rel", "cp", "w_prime", "ftp", "ftp_wkg", "fatmax_w", "fatmax_pct_ftp",
+                "ga1_min", "ga1_max", "ga1_pct_min", "ga1_pct_max")
+# Zeilen, bei denen der Einzelpfad abbricht (kein 3/5-min-Wert): VO2max und alles davon Abhängige → NaN
+NAN_IF_INVALID = ("vo2_abs", "vo2_rel", "fatmax_w", "fatmax_pct_ftp", "ga1_min", "ga1_max", "ga1_pct_min", "ga1_pct_max")
+
+
+def test_analysis_batch_covers_valid_and_invalid_rows(scalar):
+    ok = sum(r is not None for r in scalar)
+    assert 0 < ok < len(scalar)
+
+
+@pytest.mark.parametrize("key", NUMERIC_KEYS)
+def test_analysis_batch_numeric(batch, scalar, key):
+    for i, r in enumerate(scalar):
+        got = batch[key].iloc[i]
+        if r is None:
+            if key in NAN_IF_INVALID:
+                assert np.isnan(got), (i, key, got)
+            continue
+        assert got == pytest.approx(float(r[key]), rel=1e-12, abs=1e-12), (i, key)
+
+
+def test_analysis_batch_labels(batch, scalar):
+    for i, r in enumerate(scalar):
+        if r is None:
+            continue
+        assert batch["model_used"].iloc[i] == r["model_used"]
+        assert batch["athlete_type"].iloc[i] == r["athlete_type"]
+        c = r["consistency"]
+        if c is None:
+            assert pd.isna(batch["consistency_grade"].iloc[i])
+            assert np.isnan(batch["consistency_mape"].iloc[i])
+        else:
+            assert batch["consistency_grade"].iloc[i] == c["grade"]
+            assert batch["consistency_hint"].iloc[i] == c["hint"]
+            assert batch["consistency_mape"].iloc[i] == pytest.approx(c["mape"], rel=1e-12)
+
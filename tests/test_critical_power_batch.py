@@ -0,0 +1,44 @@
+# calc_critical_power_batch gegen calc_critical_power: gleiche Eingaben → gleiche CP/W′.
+import numpy as np
+import pytest
+
+from calculations.critical_power import calc_critical_power, calc_critical_power_batch
+
+N = 500
+
+
+def _tests(seed=0, n=N):
+    """Zufällige 1/3/5/12-min-Werte; ein Teil fehlt (0 oder NaN)."""
+    rng = np.random.default_rng(seed)
+    p3 = rng.uniform(250, 500, n)
+    p = {
+        "p1min": p3 * rng.uniform(1.15, 1.7, n),
+        "p3min": p3,
+        "p5min": p3 * rng.uniform(0.85, 1.02, n),
+        "p12min": p3 * rng.uniform(0.7, 0.92, n),
+    }
+    for k, share in (("p1min", 0.3), ("p3min", 0.25), ("p5min", 0.25), ("p12min", 0.25)):
+        p[k][rng.random(n) < share] = 0.0
+    p["p12min"][rng.random(n) < 0.05] = np.nan
+    return p
+
+
+def test_cp_batch_matches_scalar():
+    p = _tests()
+    cp, w_prime, residuals = calc_critical_power_batch(**p)
+    assert cp.shape == w_prime.shape == (N,) and residuals.shape == (N, 3)
+    for i in range(N):
+        row = {k: (None if np.isnan(v[i]) else float(v[i])) for k, v in p.items()}
+        exp_cp, exp_wp = calc_critical_power(**row)
+        assert cp[i] == pytest.approx(exp_cp, rel=1e-12, abs=1e-12), (i, row)
+        assert w_prime[i] == pytest.approx(exp_wp, rel=1e-12, abs=1e-12), (i, row)
+
+
+def test_cp_batch_residuals():
+    p = _tests(seed=1)
+    cp, w_prime, residuals = calc_critical_power_batch(**p)
+    for j, (key, t) in enumerate((("p3min", 180.0), ("p5min", 300.0), ("p12min", 720.0))):
+        x = p[key]
+        has = np.isfinite(x) & (x > 0)
+        assert np.all(np.isnan(residuals[~has, j]))
+        np.testing.assert_allclose(residuals[has, j], x[has] - (cp[has] + w_prime[has] / t), rtol=0, atol=1e-9)
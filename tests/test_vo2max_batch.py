@@ -0,0 +1,37 @@
+# calc_vo2max_batch gegen calc_vo2max_result: gleiche Werte, gleiche Plausibilitäts-Flags.
+import numpy as np
+import pytest
+
+from calculations.vo2max import FLAG_INVALID, calc_vo2max_batch, calc_vo2max_result, decode_flags
+
+N = 300
+
+
+def _tests(seed=2, n=N):
+    rng = np.random.default_rng(seed)
+    p3 = rng.uniform(250, 500, n)
+    p5 = p3 * rng.uniform(0.85, 1.05, n)
+    p12 = p5 * rng.uniform(0.8, 1.02, n)
+    weight = rng.uniform(48, 100, n)
+    for x, share in ((p3, 0.2), (p5, 0.2), (p12, 0.2)):
+        x[rng.random(n) < share] = 0.0
+    weight[rng.random(n) < 0.03] = 0.0
+    return p3, p5, p12, weight
+
+
+@pytest.mark.parametrize("method", ["A", "B", "MEAN"])
+def test_vo2max_batch_matches_scalar(method):
+    p3, p5, p12, weight = _tests()
+    res = calc_vo2max_batch(p5, weight, method, p3min_w=p3, p12min_w=p12, blend_w5=0.7)
+    assert len(res) == N
+    for i in range(N):
+        try:
+            r = calc_vo2max_result(p5[i] or None, weight[i], "Mann", method,
+                                   p3min_w=p3[i] or None, p12min_w=p12[i] or None, blend_w5=0.7)
+        except ValueError:
+            assert res.flags[i] == FLAG_INVALID
+            assert np.isnan(res.vo2_rel_ml_kg_min[i]) and np.isnan(res.vo2_abs_l_min[i])
+            continue
+        assert res.vo2_rel_ml_kg_min[i] == r.vo2_rel_ml_kg_min, i
+        assert res.vo2_abs_l_min[i] == r.vo2_abs_l_min, i
+        assert decode_flags(res.flags[i]) == r.flags, i
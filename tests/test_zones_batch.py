@@ -0,0 +1,36 @@
+# calc_zones_batch gegen calc_zone_table/calc_ga1_zone: gleiche Eingaben → gleiche Zonen.
+import numpy as np
+import pytest
+
+from calculations.zones import ZoneTable, calc_ga1_zone, calc_zone_table, calc_zones, calc_zones_batch
+
+N = 300
+
+
+def _inputs(seed=1, n=N):
+    """CP/FatMax/VLamax zufällig; auch CP <= 0 und FatMax = 0 (keine Korrektur)."""
+    rng = np.random.default_rng(seed)
+    cp = rng.uniform(150, 420, n)
+    cp[rng.random(n) < 0.1] = 0.0
+    vlamax = rng.uniform(0.15, 1.1, n)
+    fatmax_w = cp * rng.uniform(0.35, 0.9, n)
+    fatmax_w[rng.random(n) < 0.1] = 0.0
+    return cp, fatmax_w, vlamax
+
+
+def test_zones_batch_matches_scalar():
+    cp, fatmax_w, vlamax = _inputs()
+    zones = calc_zones_batch(cp, fatmax_w, vlamax)
+    for i in range(N):
+        assert ZoneTable.from_batch(zones, i) == calc_zone_table(cp[i], 190, fatmax_w[i], vlamax[i]), i
+        ga1 = calc_ga1_zone(fatmax_w[i], cp[i], vlamax[i])
+        got = tuple(zones[i][k] for k in ("ga1_min", "ga1_max", "ga1_pct_min", "ga1_pct_max"))
+        assert got == pytest.approx(ga1, rel=1e-12, abs=1e-12), i
+
+
+def test_zone_table_frame():
+    df = calc_zones(280.0, 190, 180.0, 0.5)
+    assert list(df.columns) == ["Zone", "von [W]", "bis [W]", "% von CP", "Beschreibung"]
+    assert len(df) == 5 and df["von [W]"].iloc[0] == 0
+    assert (df["von [W]"].iloc[1:].to_numpy() == df["bis [W]"].iloc[:-1].to_numpy()).all()
+    assert calc_zones(0.0, 190, 0.0, 0.5).empty
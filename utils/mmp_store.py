@@ -0,0 +1,204 @@
+"""utils/mmp_store.py — Saison-Leistungskurve (MMP) pro Athlet, inkrementell
+
+Jede neue Fahrt wird einmal über utils.power_profile ausgewertet und dann nur
+noch als kompakte Kurve (Bestwert je Dauer) gespeichert:
+
+- all-time-Kurve: laufendes Maximum, Merge in O(Dauern)
+- Tageskurven: eine Zeile pro Trainingstag (Maximum aller Fahrten des Tages),
+  damit Zeitfenster (z.B. rollierende 90 Tage) ohne erneutes Lesen alter
+  Ride-Dateien abgefragt werden können — Kosten O(Tage im Fenster × Dauern).
+
+    store = MMPStore("data/mmp")
+    store.add_ride_file("Anna", "2025-05-01.fit", date(2025, 5, 1))
+    cp, wp = calc_critical_power(**store.get("Anna").cp_inputs(days=90))
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from datetime import date
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from utils.power_profile import mean_max_power
+
+# Dauern (s) der gespeicherten Kurve: 1–60 s fein, danach gröber bis 5 h.
+# Enthält 20 s und 1/3/5/12 min exakt (Eingaben für compute_analysis).
+CURVE_DURATIONS_S = np.unique(np.concatenate([
+    np.arange(1, 61),
+    np.arange(70, 301, 10),
+    np.arange(330, 1201, 30),
+    np.arange(1260, 3601, 60),
+    np.arange(3900, 18001, 300),
+])).astype(float)
+
+CP_TEST_DURATIONS = {"p1min": 60, "p3min": 180, "p5min": 300, "p12min": 720}
+
+
+def _day(d) -> int:
+    if isinstance(d, (int, np.integer)):
+        return int(d)
+    if isinstance(d, str):
+        d = date.fromisoformat(d[:10])
+    return d.toordinal()
+
+
+class AthleteCurve:
+    """Array-basierte MMP-Kurve eines Athleten (all-time + Tageszeilen); Zugriffe über self.lock."""
+
+    def __init__(self, durations_s: Sequence[float] = CURVE_DURATIONS_S):
+        self.durations_s = np.asarray(durations_s, dtype=float)
+        d = len(self.durations_s)
+        self.all_time = np.full(d, np.nan)
+        # Puffer mit Reserve (Verdopplung), genutzt werden die ersten _n Zeilen
+        self._days = np.empty(16, dtype=np.int64)    # Ordinaltage, aufsteigend
+        self._daily = np.empty((16, d))              # Bestwert je Tag × Dauer
+        self._n = 0
+        self.n_rides = 0
+        # schützt Puffer/Zeilen-Verschiebung gegen parallele Uploads und save()
+        self.lock = threading.RLock()
+
+    @property
+    def days(self) -> np.ndarray:
+        return self._days[:self._n]
+
+    @property
+    def daily(self) -> np.ndarray:
+        return self._daily[:self._n]
+
+    def _grow(self) -> None:
+        cap = max(16, 2 * len(self._days))
+        days = np.empty(cap, dtype=np.int64)
+        daily = np.empty((cap, len(self.durations_s)))
+        days[:self._n] = self.days
+        daily[:self._n] = self.daily
+        self._days, self._daily = days, daily
+
+    # --- Einpflegen ---
+    def add_curve(self, ride_day, curve) -> None:
+        """Kurve einer Fahrt (gleiches Dauer-Raster) per Max-Merge übernehmen."""
+        curve = np.asarray(curve, dtype=float)
+        if curve.shape != self.all_time.shape:
+            raise ValueError("Kurve passt nicht zum Dauer-Raster.")
+        day = _day(ride_day)
+
+        with self.lock:
+            np.fmax(self.all_time, curve, out=self.all_time)
+
+            n = self._n
+            i = int(np.searchsorted(self.days, day))
+            if i < n and self._days[i] == day:
+                np.fmax(self._daily[i], curve, out=self._daily[i])
+            else:
+                if n == len(self._days):
+                    self._grow()
+                if i < n:
+                    # Nachgereichte ältere Fahrt: Zeilen dahinter verschieben
+                    self._days[i + 1:n + 1] = self._days[i:n]
+                    self._daily[i + 1:n + 1] = self._daily[i:n]
+                self._days[i] = day
+                self._daily[i] = curve
+                self._n = n + 1
+            self.n_rides += 1
+
+    def add_ride_file(self, source, ride_day, hz: Optional[float] = None, name: Optional[str] = None):
+        # Auswertung der Fahrt ohne Lock, nur der Merge ist exklusiv
+        acc = mean_max_power(source, self.durations_s, hz=hz, name=name)
+        self.add_curve(ride_day, acc.best)
+        return acc.best
+
+    # --- Abfragen ---
+    def curve(self, start=None, end=None) -> np.ndarray:
+        """Max-Kurve im Zeitraum [start, end] (inklusive); ohne Grenzen → all-time."""
+        with self.lock:
+            if start is None and end is None:
+                return self.all_time.copy()
+            lo = 0 if start is None else int(np.searchsorted(self.days, _day(start), side="left"))
+            hi = len(self.days) if end is None else int(np.searchsorted(self.days, _day(end), side="right"))
+            if hi <= lo:
+                return np.full(len(self.durations_s), np.nan)
+            return np.fmax.reduce(self.daily[lo:hi], axis=0)
+
+    def rolling(self, days: int = 90, today=None) -> np.ndarray:
+        end = _day(today or date.today())
+        return self.curve(end - days + 1, end)
+
+    def value_at(self, curve, duration_s: float) -> Optional[float]:
+        i = int(np.searchsorted(self.durations_s, duration_s))
+        if i >= len(self.durations_s) or self.durations_s[i] != duration_s:
+            raise KeyError(f"Dauer {duration_s}s nicht im Raster.")
+        v = curve[i]
+        return None if np.isnan(v) else float(v)
+
+    def cp_inputs(self, days: Optional[int] = None, today=None) -> Dict[str, Optional[float]]:
+        """p1min/p3min/p5min/p12min-Keywords für calc_critical_power (all-time oder rollierend)."""
+        c = self.curve() if days is None else self.rolling(days, today)
+        return {k: self.value_at(c, t) for k, t in CP_TEST_DURATIONS.items()}
+
+    # --- Persistenz ---
+    def save(self, path) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with self.lock:
+            with open(tmp, "wb") as f:
+                np.savez(f, durations_s=self.durations_s, all_time=self.all_time,
+                         days=self.days, daily=self.daily, n_rides=self.n_rides)
+            os.replace(tmp, path)  # atomar: Leser sehen nie eine halbe Datei
+
+    @classmethod
+    def load(cls, path) -> "AthleteCurve":
+        with np.load(path) as z:
+            obj = cls(z["durations_s"])
+            obj.all_time = z["all_time"]
+            obj._days = z["days"].copy()
+            obj._daily = z["daily"].copy()
+            obj._n = len(obj._days)
+            obj.n_rides = int(z["n_rides"])
+        return obj
+
+
+class MMPStore:
+    """Verzeichnis mit einer .npz-Kurve pro Athlet; geladene Kurven bleiben im Speicher."""
+
+    def __init__(self, root="data/mmp"):
+        self.root = str(root)
+        self._curves: Dict[str, AthleteCurve] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, athlete: str) -> str:
+        # Kurzhash des Namens: "Anna Müller" und "Anna_Müller" landen nicht in derselben Datei
+        slug = re.sub(r"[^\w\-]+", "_", athlete.strip()) or "_"
+        digest = hashlib.sha1(athlete.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.root, f"{slug}-{digest}.npz")
+
+    def _legacy_path(self, athlete: str) -> str:
+        slug = re.sub(r"[^\w\-]+", "_", athlete.strip()) or "_"
+        return os.path.join(self.root, f"{slug}.npz")
+
+    def get(self, athlete: str) -> AthleteCurve:
+        with self._lock:
+            c = self._curves.get(athlete)
+            if c is None:
+                p = self._path(athlete)
+                if not os.path.exists(p) and os.path.exists(self._legacy_path(athlete)):
+                    p = self._legacy_path(athlete)  # alte Dateinamen ohne Hash; nächstes save() schreibt neu
+                c = AthleteCurve.load(p) if os.path.exists(p) else AthleteCurve()
+                self._curves[athlete] = c
+            return c
+
+    def save(self, athlete: str) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            curve = self._curves[athlete]
+        curve.save(self._path(athlete))
+
+    def add_ride_file(self, athlete: str, source, ride_day, hz: Optional[float] = None,
+                      name: Optional[str] = None, save: bool = True):
+        curve = self.get(athlete)
+        best = curve.add_ride_file(source, ride_day, hz=hz, name=name)
+        if save:
+            self.save(athlete)  # unter curve.lock: nie eine halb gemergte Kurve auf Platte
+        return best
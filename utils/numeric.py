@@ -0,0 +1,23 @@
+import numpy as np
+
+
+def round_half_even(values, ndigits=0):
+    """
+    Vektorisiertes Gegenstück zu Pythons round(x, ndigits).
+
+    np.round skaliert mit 10**ndigits und rundet das (binär ungenaue) Produkt;
+    bei Werten wie 2.675 weicht das vom eingebauten round() ab. Für die
+    wenigen Elemente nahe an einer .5-Grenze wird deshalb das eingebaute
+    round() benutzt, damit Batch- und Einzelpfad bitgleich bleiben.
+    """
+    x = np.asarray(values, dtype=float)
+    scale = 10.0 ** ndigits
+    y = x * scale
+    out = np.round(y) / scale
+
+    with np.errstate(invalid="ignore"):
+        near_tie = np.abs(y - np.floor(y) - 0.5) < 1e-6
+    if np.any(near_tie):
+        idx = np.nonzero(near_tie)
+        out[idx] = [round(float(v), ndigits) for v in x[idx]]
+    return out
@@ -1 +1,314 @@
+"""utils/power_profile.py — Bestleistungen (Mean-Maximal-Power) aus Rohdaten
 
+Liest Leistungsdateien (CSV oder FIT, 1 Hz oder höher) blockweise und
+ermittelt die besten Durchschnittsleistungen für beliebige Dauern über
+kumulative Summen (gleitendes Fenster). Pro Block werden nur der Block selbst
+plus die letzten (längstes Fenster − 1) Samples gehalten — Speicherbedarf ist
+unabhängig von der Fahrtdauer.
+
+    efforts = mean_max_power("ride.fit").result()       # {20.0: ..., 60.0: ..., ...}
+    inputs  = analysis_inputs_from_ride("ride.fit")     # p1min/p3min/.../avg20/peak20
+    r = compute_analysis({**athlete, **inputs})
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import struct
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+# Dauern (s), die compute_analysis braucht: 20 s Sprint + 1/3/5/12 min
+DEFAULT_DURATIONS_S = (20, 60, 180, 300, 720)
+CHUNK_SAMPLES = 65536
+
+CSV_POWER_COLUMNS = ("power", "watts", "power_w", "leistung", "leistung (w)", "power (w)")
+CSV_TIME_COLUMNS = ("time", "secs", "seconds", "timestamp", "zeit")
+
+
+# -----------------------------
+# Gleitendes Fenster (streaming)
+# -----------------------------
+class MeanMaxAccumulator:
+    """
+    Streaming-Bestwerte für feste Dauern.
+
+    update() nimmt beliebig große Blöcke entgegen; zwischen zwei Blöcken wird
+    nur der Überhang (längstes Fenster − 1 Samples) behalten, damit Fenster
+    über Blockgrenzen hinweg korrekt erfasst werden.
+    """
+
+    def __init__(self, durations_s: Sequence[float] = DEFAULT_DURATIONS_S, hz: float = 1.0):
+        if hz <= 0:
+            raise ValueError("Abtastrate muss > 0 sein.")
+        self.hz = float(hz)
+        self.durations_s = tuple(durations_s)
+        self.windows = np.array([max(1, int(round(d * self.hz))) for d in self.durations_s])
+        self.best = np.full(len(self.windows), np.nan)
+        self.peak = np.full(len(self.windows), np.nan)  # max. Sample im besten Fenster
+        self.n_samples = 0
+        self._tail = np.empty(0)
+
+    def update(self, chunk) -> None:
+        x = np.asarray(chunk, dtype=float)
+        if x.size == 0:
+            return
+        x = np.where(np.isfinite(x) & (x > 0), x, 0.0)  # Aussetzer/Rollen = 0 W
+        buf = np.concatenate([self._tail, x]) if self._tail.size else x
+
+        cs = np.empty(buf.size + 1)
+        cs[0] = 0.0
+        np.cumsum(buf, out=cs[1:])
+
+        for i, w in enumerate(self.windows):
+            if w > buf.size:
+                continue
+            sums = cs[w:] - cs[:-w]
+            j = int(np.argmax(sums))
+            avg = sums[j] / w
+            if not avg <= self.best[i]:  # auch für NaN (noch kein Wert)
+                self.best[i] = avg
+                self.peak[i] = buf[j:j + w].max()
+
+        self.n_samples += x.size
+        keep = int(self.windows.max()) - 1
+        self._tail = buf[-keep:].copy() if keep > 0 else np.empty(0)
+
+    def result(self) -> Dict[float, Optional[float]]:
+        return {
+            d: (None if np.isnan(b) else float(b))
+            for d, b in zip(self.durations_s, self.best)
+        }
+
+    def peak_in_best(self, duration_s: float) -> Optional[float]:
+        v = self.peak[self.durations_s.index(duration_s)]
+        return None if np.isnan(v) else float(v)
+
+
+def best_efforts(chunks: Iterable, durations_s: Sequence[float] = DEFAULT_DURATIONS_S, hz: float = 1.0):
+    """Bestwerte (W) je Dauer aus einem Iterator von Leistungsblöcken."""
+    acc = MeanMaxAccumulator(durations_s, hz)
+    for chunk in chunks:
+        acc.update(chunk)
+    return acc.result()
+
+
+# -----------------------------
+# CSV
+# -----------------------------
+def _find_column(columns, candidates):
+    lower = {str(c).strip().lower(): c for c in columns}
+    for cand in candidates:
+        if cand in lower:
+            return lower[cand]
+    return None
+
+
+def iter_csv_power(source, column: Optional[str] = None, chunksize: int = CHUNK_SAMPLES) -> Iterator[np.ndarray]:
+    """Leistungsspalte einer CSV blockweise (nur diese Spalte wird geparst)."""
+    import pandas as pd
+
+    if hasattr(source, "seek"):
+        head = pd.read_csv(source, nrows=0)
+        source.seek(0)
+    else:
+        head = pd.read_csv(source, nrows=0)
+    col = column or _find_column(head.columns, CSV_POWER_COLUMNS)
+    if col is None:
+        raise ValueError(f"Keine Leistungsspalte gefunden (erwartet z.B. {', '.join(CSV_POWER_COLUMNS[:3])}).")
+
+    for block in pd.read_csv(source, usecols=[col], chunksize=chunksize):
+        yield pd.to_numeric(block[col], errors="coerce").to_numpy(dtype=float)
+
+
+def csv_sample_rate(source, n: int = 200) -> float:
+    """Abtastrate aus der Zeitspalte der ersten Zeilen schätzen (Default 1 Hz)."""
+    import pandas as pd
+
+    head = pd.read_csv(source, nrows=n)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    col = _find_column(head.columns, CSV_TIME_COLUMNS)
+    if col is None:
+        return 1.0
+    t = head[col]
+    if not np.issubdtype(t.dtype, np.number):
+        t = pd.to_datetime(t, errors="coerce")
+        t = (t - t.iloc[0]).dt.total_seconds()
+    dt = np.diff(t.to_numpy(dtype=float))
+    dt = dt[np.isfinite(dt) & (dt > 0)]
+    if dt.size == 0:
+        return 1.0
+    return float(1.0 / np.median(dt))
+
+
+# -----------------------------
+# FIT (nur "record"-Nachrichten: timestamp + power)
+# -----------------------------
+_FIT_RECORD = 20
+_FIT_TIMESTAMP = 253
+_FIT_POWER = 7
+_FIT_BASE_FMT = {
+    0x00: "B", 0x01: "b", 0x02: "B", 0x83: "h", 0x84: "H", 0x85: "i", 0x86: "I",
+    0x07: "s", 0x88: "f", 0x89: "d", 0x0A: "B", 0x8B: "h", 0x8C: "I", 0x0D: "B",
+    0x8E: "q", 0x8F: "Q", 0x90: "Q",
+}
+
+
+def _fit_layout(fields, little_endian):
+    """struct-Format für eine Definition; nur timestamp/power werden dekodiert."""
+    fmt = "<" if little_endian else ">"
+    idx_ts = idx_pw = None
+    n = 0
+    for num, size, base in fields:
+        code = _FIT_BASE_FMT.get(base)
+        if code and code != "s" and struct.calcsize(code) == size and num in (_FIT_TIMESTAMP, _FIT_POWER):
+            if num == _FIT_TIMESTAMP:
+                idx_ts = n
+            else:
+                idx_pw = n
+            fmt += code
+            n += 1
+        else:
+            fmt += f"{size}x"
+    return struct.Struct(fmt), idx_ts, idx_pw
+
+
+def iter_fit_power(source, chunk_samples: int = CHUNK_SAMPLES, max_gap_s: int = 3600) -> Iterator[np.ndarray]:
+    """
+    1-Hz-Leistung aus einer FIT-Datei, blockweise.
+
+    Lücken im Zeitstempel (Auto-Pause, Aussetzer) werden mit 0 W aufgefüllt —
+    höchstens max_gap_s Samples, mehr braucht kein Bestwert-Fenster.
+    """
+    f = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    try:
+        f = f if isinstance(f, io.BufferedIOBase) else io.BufferedReader(f)
+        header = f.read(12)
+        if len(header) < 12 or header[8:12] != b".FIT":
+            raise ValueError("Keine gültige FIT-Datei.")
+        header_size = header[0]
+        data_size = struct.unpack("<I", header[4:8])[0]
+        f.read(header_size - 12)
+
+        defs = {}
+        out = np.empty(chunk_samples)
+        n = 0
+        last_ts = rec_ts = None
+        pos = 0
+        read = f.read
+
+        while pos < data_size:
+            hdr = read(1)[0]
+            pos += 1
+            if hdr & 0x80:  # komprimierter Zeitstempel
+                local = (hdr >> 5) & 0x03
+                offset = hdr & 0x1F
+                layout = defs[local]
+                body = read(layout[0].size)
+                pos += layout[0].size
+                ts = None
+                if last_ts is not None:
+                    ts = (last_ts & ~0x1F) + offset + (0x20 if offset < (last_ts & 0x1F) else 0)
+            elif hdr & 0x40:  # Definition
+                local = hdr & 0x0F
+                _, arch, = read(2)
+                glob = struct.unpack("<H" if arch == 0 else ">H", read(2))[0]
+                nfields = read(1)[0]
+                raw = read(3 * nfields)
+                fields = [tuple(raw[i:i + 3]) for i in range(0, len(raw), 3)]
+                pos += 5 + 3 * nfields
+                dev_size = 0
+                if hdr & 0x20:
+                    ndev = read(1)[0]
+                    dev = read(3 * ndev)
+                    dev_size = sum(dev[i + 1] for i in range(0, len(dev), 3))
+                    pos += 1 + 3 * ndev
+                st, i_ts, i_pw = _fit_layout(fields, arch == 0)
+                if glob != _FIT_RECORD:
+                    i_pw = None  # Zeitstempel trotzdem mitführen (Basis für komprimierte Header)
+                defs[local] = (st, i_ts, i_pw, dev_size)
+                continue
+            else:
+                local = hdr & 0x0F
+                layout = defs[local]
+                body = read(layout[0].size)
+                pos += layout[0].size
+                ts = None
+
+            st, i_ts, i_pw, dev_size = layout
+            if dev_size:
+                read(dev_size)
+                pos += dev_size
+            if i_pw is None and i_ts is None:
+                continue
+            vals = st.unpack(body)
+            if i_ts is not None and vals[i_ts] != 0xFFFFFFFF:
+                ts = vals[i_ts]
+            if i_pw is None:
+                if ts is not None:
+                    last_ts = ts
+                continue
+            pw = vals[i_pw]
+            pw = 0.0 if pw == 0xFFFF else float(pw)
+
+            gap = 0 if (ts is None or rec_ts is None) else min(max(0, ts - rec_ts - 1), max_gap_s)
+            if ts is not None:
+                last_ts = rec_ts = ts
+            for _ in range(gap + 1):
+                out[n] = 0.0 if _ < gap else pw
+                n += 1
+                if n == chunk_samples:
+                    yield out.copy()
+                    n = 0
+        if n:
+            yield out[:n].copy()
+    finally:
+        if isinstance(source, (str, os.PathLike)):
+            f.close()
+
+
+# -----------------------------
+# Einstieg für die App
+# -----------------------------
+def _is_fit(source, name=None) -> bool:
+    name = name or (source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", ""))
+    return str(name).lower().endswith(".fit")
+
+
+def mean_max_power(source, durations_s: Sequence[float] = DEFAULT_DURATIONS_S, hz: Optional[float] = None,
+                   name: Optional[str] = None) -> MeanMaxAccumulator:
+    """Bestwerte einer Ride-Datei (CSV/FIT, Pfad oder Dateiobjekt)."""
+    if _is_fit(source, name):
+        chunks = iter_fit_power(source)
+        hz = 1.0
+    else:
+        hz = hz or csv_sample_rate(source)
+        chunks = iter_csv_power(source)
+    acc = MeanMaxAccumulator(durations_s, hz)
+    for chunk in chunks:
+        acc.update(chunk)
+    return acc
+
+
+def analysis_inputs_from_ride(source, sprint_dur: int = 20, hz: Optional[float] = None,
+                              name: Optional[str] = None) -> dict:
+    """
+    Testwerte für compute_analysis aus einer Ride-Datei:
+    p1min/p3min/p5min/p12min, sprint_dur, avg20 (bestes Sprintfenster) und
+    peak20 (höchstes Sample in diesem Fenster). Fehlende Dauern → 0.0.
+    """
+    durations = (sprint_dur, 60, 180, 300, 720)
+    acc = mean_max_power(source, durations, hz=hz, name=name)
+    best = acc.result()
+    return {
+        "p1min": best[60] or 0.0,
+        "p3min": best[180] or 0.0,
+        "p5min": best[300] or 0.0,
+        "p12min": best[720] or 0.0,
+        "sprint_dur": sprint_dur,
+        "avg20": best[sprint_dur] or 0.0,
+        "peak20": acc.peak_in_best(sprint_dur) or 0.0,
+    }
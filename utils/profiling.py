@@ -0,0 +1,135 @@
+"""utils/profiling.py — Laufzeit/Speicher je Stufe der Analyse-Pipeline
+
+Aus (Standard): stage() kostet nur einen leeren Kontextmanager.
+An per Umgebungsvariable oder explizit (Sidebar-Debug-Schalter):
+
+    ANALYSIS_PROFILE=1          Wall-Time je Stufe
+    ANALYSIS_PROFILE=alloc      zusätzlich Allokationen je Stufe (tracemalloc)
+    ANALYSIS_PROFILE_DUMP=dir   einen Lauf mit cProfile + tracemalloc-Snapshot nach dir schreiben
+
+    prof = StageProfiler.from_env()
+    with prof.stage("vlamax"):
+        ...
+    prof.report()  # [{"stage": "vlamax", "ms": 0.07, "alloc_kib": 1.2, "peak_kib": 3.4}, ...]
+"""
+
+from __future__ import annotations
+
+import cProfile
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+PROFILE_ENV = "ANALYSIS_PROFILE"
+PROFILE_DUMP_ENV = "ANALYSIS_PROFILE_DUMP"
+
+
+def profile_mode() -> str:
+    """Modus aus ANALYSIS_PROFILE: "" (aus), "time" oder "alloc"."""
+    v = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if v in ("", "0", "false", "off", "no"):
+        return ""
+    return "alloc" if v in ("alloc", "mem", "memory", "2") else "time"
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class StageProfiler:
+    """Sammelt Wall-Time (und optional Allokationen) je benannter Stufe."""
+
+    def __init__(self, enabled: bool = False, track_alloc: bool = False):
+        self.enabled = bool(enabled)
+        self.track_alloc = bool(enabled and track_alloc)
+        self.stages: List[Dict[str, float]] = []
+        self._started_tracing = False
+        self._t_start = time.perf_counter()
+
+    @classmethod
+    def from_env(cls) -> "StageProfiler":
+        mode = profile_mode()
+        return cls(enabled=bool(mode), track_alloc=mode == "alloc")
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str):
+        if self.track_alloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.track_alloc:
+            tracemalloc.reset_peak()
+            mem0 = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            row = {"stage": name, "ms": (time.perf_counter() - t0) * 1000.0}
+            if self.track_alloc:
+                cur, peak = tracemalloc.get_traced_memory()
+                row["alloc_kib"] = (cur - mem0) / 1024.0
+                row["peak_kib"] = (peak - mem0) / 1024.0
+            self.stages.append(row)
+
+    def close(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def report(self) -> Optional[dict]:
+        """Stufen + Summe; None, wenn nicht aktiv."""
+        if not self.enabled:
+            return None
+        self.close()
+        return {
+            "stages": list(self.stages),
+            "total_ms": (time.perf_counter() - self._t_start) * 1000.0,
+            "alloc": self.track_alloc,
+        }
+
+
+def dump_profile(fn: Callable, *args, dump_dir: Optional[str] = None, label: str = "analysis", **kwargs):
+    """
+    fn(*args, **kwargs) einmal unter cProfile + tracemalloc ausführen und
+    <label>_<zeit>.prof (pstats/snakeviz) und .tracemalloc (Snapshot) schreiben.
+    Rückgabe: (Ergebnis von fn, {"prof": pfad, "tracemalloc": pfad}).
+    """
+    dump_dir = dump_dir or os.environ.get(PROFILE_DUMP_ENV) or os.path.join(".cache", "profile")
+    os.makedirs(dump_dir, exist_ok=True)
+    stem = os.path.join(dump_dir, f"{label}_{datetime.now():%Y%m%d_%H%M%S_%f}")
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(25)
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            prof.disable()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    paths = {"prof": f"{stem}.prof", "tracemalloc": f"{stem}.tracemalloc"}
+    prof.dump_stats(paths["prof"])
+    snapshot.dump(paths["tracemalloc"])
+    return result, paths
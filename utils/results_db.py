@@ -0,0 +1,257 @@
+"""utils/results_db.py — Ergebnis-Historie in SQLite (WAL) statt athleten_daten.csv
+
+- WAL-Modus: mehrere Coaches können gleichzeitig lesen und schreiben
+- ein Test pro Athlet und Tag: UNIQUE(name, datum) + Upsert
+- Seiten fragen nur die angezeigten Spalten/Zeilen ab (Index auf name, datum)
+
+Spaltennamen nach außen entsprechen dem bisherigen CSV-Schema
+("VO2max rel (ml/min/kg)", "FTP (W)", ...), damit die Seiten unverändert
+mit denselben DataFrame-Spalten arbeiten.
+
+Einmaliger Import der alten CSV:
+    python -m utils.results_db data/athleten_daten.csv
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import threading
+from datetime import date
+from typing import Iterable, Optional, Sequence
+
+DB_PATH = "data/athleten_daten.db"
+CSV_PATH = "data/athleten_daten.csv"
+
+# DB-Spalte → Anzeigename (CSV-Schema)
+COLUMNS = {
+    "datum": "Datum",
+    "name": "Name",
+    "geschlecht": "Geschlecht",
+    "gewicht": "Gewicht (kg)",
+    "koerperfett": "Körperfett (%)",
+    "vo2_rel": "VO2max rel (ml/min/kg)",
+    "vo2_abs": "VO2max abs (l/min)",
+    "ftp": "FTP (W)",
+    "vlamax": "VLamax (mmol/l/s)",
+    "fatmax_w": "FatMax (W)",
+    "athletentyp": "Athletentyp",
+    "cp": "CP (W)",
+    "w_prime": "W′ (J)",
+    "p1min": "1-min (W)",
+    "p3min": "3-min (W)",
+    "p5min": "5-min (W)",
+    "p12min": "12-min (W)",
+}
+LABEL_TO_COLUMN = {v: k for k, v in COLUMNS.items()}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id          INTEGER PRIMARY KEY,
+    name        TEXT NOT NULL,
+    datum       TEXT NOT NULL,
+    geschlecht  TEXT,
+    gewicht     REAL,
+    koerperfett REAL,
+    vo2_rel     REAL,
+    vo2_abs     REAL,
+    ftp         REAL,
+    vlamax      REAL,
+    fatmax_w    REAL,
+    athletentyp TEXT,
+    cp          REAL,
+    w_prime     REAL,
+    p1min       REAL,
+    p3min       REAL,
+    p5min       REAL,
+    p12min      REAL,
+    UNIQUE (name, datum)
+);
+CREATE INDEX IF NOT EXISTS idx_results_datum ON results (datum);
+
+-- Materialisierter "letzter Test pro Athlet", gepflegt per Trigger beim Einfügen:
+-- Lesen kostet O(Athleten) statt Sortieren/Gruppieren der ganzen Historie.
+CREATE TABLE IF NOT EXISTS latest (
+    name      TEXT PRIMARY KEY,
+    datum     TEXT NOT NULL,
+    result_id INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS trg_results_latest_insert AFTER INSERT ON results
+BEGIN
+    INSERT INTO latest (name, datum, result_id) VALUES (NEW.name, NEW.datum, NEW.id)
+    ON CONFLICT(name) DO UPDATE SET datum = excluded.datum, result_id = excluded.result_id
+    WHERE excluded.datum >= latest.datum;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_results_latest_delete AFTER DELETE ON results
+WHEN (SELECT result_id FROM latest WHERE name = OLD.name) = OLD.id
+BEGIN
+    DELETE FROM latest WHERE name = OLD.name;
+    INSERT INTO latest (name, datum, result_id)
+    SELECT name, datum, id FROM results WHERE name = OLD.name ORDER BY datum DESC LIMIT 1;
+END;
+"""
+
+_BACKFILL_LATEST = """
+INSERT OR REPLACE INTO latest (name, datum, result_id)
+SELECT r.name, r.datum, r.id FROM results r
+WHERE r.datum = (SELECT MAX(datum) FROM results WHERE name = r.name)
+"""
+
+_local = threading.local()
+
+
+def connect(path: str = DB_PATH) -> sqlite3.Connection:
+    """Eine Verbindung pro Thread und Datei (Streamlit-Sessions laufen in Threads)."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        has_latest = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='latest'").fetchone()
+        conn.executescript(_SCHEMA)
+        _migrate(conn)
+        if not has_latest:
+            # DB aus der Zeit vor der latest-Tabelle: einmalig nachziehen
+            with conn:
+                conn.execute(_BACKFILL_LATEST)
+        conns[path] = conn
+    return conn
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Spalten nachrüsten, die ältere DB-Dateien noch nicht haben."""
+    have = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+    for col in ("p1min", "p3min", "p5min", "p12min"):
+        if col not in have:
+            conn.execute(f"ALTER TABLE results ADD COLUMN {col} REAL")
+
+
+def _row_from_result(r: dict, name: str, datum) -> dict:
+    return {
+        "name": name,
+        "datum": (datum or date.today()).isoformat() if not isinstance(datum, str) else datum[:10],
+        "geschlecht": r.get("gender"),
+        "gewicht": r.get("weight"),
+        "koerperfett": r.get("bodyfat"),
+        "vo2_rel": r.get("vo2_rel"),
+        "vo2_abs": r.get("vo2_abs"),
+        "ftp": r.get("ftp"),
+        "vlamax": r.get("vlamax"),
+        "fatmax_w": r.get("fatmax_w"),
+        "athletentyp": r.get("athlete_type"),
+        "cp": r.get("cp"),
+        "w_prime": r.get("w_prime"),
+        "p1min": r.get("p1min"),
+        "p3min": r.get("p3min"),
+        "p5min": r.get("p5min"),
+        "p12min": r.get("p12min"),
+    }
+
+
+def _upsert_sql(cols: Sequence[str]) -> str:
+    updates = ", ".join(f"{c}=excluded.{c}" for c in cols if c not in ("name", "datum"))
+    return (
+        f"INSERT INTO results ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+        f"ON CONFLICT(name, datum) DO UPDATE SET {updates}"
+    )
+
+
+def upsert_rows(rows: Iterable[dict], path: str = DB_PATH) -> int:
+    """Zeilen (DB-Spaltennamen) in einer Transaktion einfügen/aktualisieren."""
+    rows = list(rows)
+    if not rows:
+        return 0
+    cols = list(rows[0].keys())
+    conn = connect(path)
+    with conn:
+        conn.executemany(_upsert_sql(cols), [tuple(r[c] for c in cols) for r in rows])
+    return len(rows)
+
+
+def save_result(result: dict, name: str, datum=None, path: str = DB_PATH) -> None:
+    """Ergebnis-Dict von compute_analysis speichern (ein Test pro Athlet und Tag)."""
+    if not name or not name.strip():
+        raise ValueError("Für das Speichern wird ein Athletenname benötigt.")
+    upsert_rows([_row_from_result(result, name.strip(), datum)], path)
+
+
+def _select(columns: Sequence[str], prefix: str = "") -> str:
+    cols = [LABEL_TO_COLUMN.get(c, c) for c in columns]
+    unknown = [c for c in cols if c not in COLUMNS]
+    if unknown:
+        raise KeyError(f"Unbekannte Spalten: {unknown}")
+    return ", ".join(f'{prefix}{c} AS "{COLUMNS[c]}"' for c in cols)
+
+
+def query(columns: Sequence[str], names: Optional[Sequence[str]] = None,
+          order_by: str = "datum DESC", path: str = DB_PATH):
+    """Nur die angegebenen Spalten (Anzeige- oder DB-Namen), optional gefiltert nach Athleten."""
+    import pandas as pd
+
+    sql = f"SELECT {_select(columns)} FROM results"
+    params: list = []
+    if names is not None:
+        if not names:
+            return pd.DataFrame(columns=[COLUMNS[LABEL_TO_COLUMN.get(c, c)] for c in columns])
+        sql += f" WHERE name IN ({', '.join('?' * len(names))})"
+        params.extend(names)
+    sql += f" ORDER BY {order_by}"
+    return pd.read_sql_query(sql, connect(path), params=params)
+
+
+def latest_per_athlete(columns: Sequence[str], names: Optional[Sequence[str]] = None, path: str = DB_PATH):
+    """Jeweils letzter Test pro Athlet — direkt aus der gepflegten latest-Tabelle."""
+    import pandas as pd
+
+    sql = f"SELECT {_select(columns, prefix='r.')} FROM latest l JOIN results r ON r.id = l.result_id"
+    params: list = []
+    if names is not None:
+        if not names:
+            return pd.DataFrame(columns=[COLUMNS[LABEL_TO_COLUMN.get(c, c)] for c in columns])
+        sql += f" WHERE l.name IN ({', '.join('?' * len(names))})"
+        params.extend(names)
+    sql += " ORDER BY l.datum"
+    return pd.read_sql_query(sql, connect(path), params=params)
+
+
+def athlete_names(path: str = DB_PATH) -> list:
+    return [n for (n,) in connect(path).execute("SELECT name FROM latest ORDER BY name")]
+
+
+def count(path: str = DB_PATH) -> int:
+    return connect(path).execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def import_csv(csv_path: str = CSV_PATH, path: str = DB_PATH) -> int:
+    """Einmaliger Import aus dem alten CSV-Schema (bekannte Spalten, Rest wird ignoriert)."""
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    df = df[[c for c in df.columns if c in LABEL_TO_COLUMN]].rename(columns=LABEL_TO_COLUMN)
+    if df.empty or "name" not in df or "datum" not in df:
+        return 0
+    df = df.dropna(subset=["name", "datum"])
+    df["datum"] = pd.to_datetime(df["datum"]).dt.date.astype(str)
+    df = df.astype(object).where(df.notna(), None)
+    return upsert_rows(df.to_dict("records"), path)
+
+
+def ensure_imported(csv_path: str = CSV_PATH, path: str = DB_PATH) -> None:
+    """Beim ersten Start: vorhandene CSV einmalig übernehmen (Marker: PRAGMA user_version)."""
+    conn = connect(path)
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= 1:
+        return
+    if os.path.exists(csv_path):
+        import_csv(csv_path, path)
+    conn.execute("PRAGMA user_version = 1")
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else CSV_PATH
+    dst = sys.argv[2] if len(sys.argv) > 2 else DB_PATH
+    print(f"{import_csv(src, dst)} Zeilen aus {src} nach {dst} importiert.")
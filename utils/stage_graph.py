@@ -0,0 +1,179 @@
+"""utils/stage_graph.py — Rechenstufen als kleiner DAG mit Memo je Knoten
+
+Jede Stufe deklariert, welche Werte sie liest (Eingaben oder Ausgaben anderer
+Stufen) und welche sie liefert. Das Memo einer Stufe ist nur auf ihre eigenen
+Eingaben (+ Version) geschlüsselt: ändert sich ein einzelner Eingabewert,
+rechnen nur die Stufen neu, deren Eingaben sich dadurch tatsächlich ändern —
+alles andere sind Treffer.
+
+    graph = StageGraph([
+        Stage("ffm", lambda w, bf: w * (1 - bf / 100), ("weight", "bodyfat"), ("ffm",)),
+        Stage("vlamax", calc, ("ffm", "avg20"), ("vlamax",), version=model_signature),
+    ])
+    values = graph.run({"weight": 70, "bodyfat": 15, "avg20": 900})
+    graph.stats()   # {"ffm": {"hits": 0, "misses": 1}, "vlamax": {...}}
+
+version: Wert oder Callable (z. B. Signatur einer Koeffizienten-Datei) – eine
+neue Version macht nur diese Stufe ungültig; nachgelagerte Stufen rechnen nur
+neu, wenn sich ihr Ergebnis dadurch ändert.
+
+Gemerkte Ergebnisse werden geteilt (nicht kopiert) – Aufrufer dürfen sie nicht verändern.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+MEMO_MAX_ENTRIES = 1024
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    fn: Callable
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...]
+    version: Any = None
+
+
+def _freeze(v):
+    """Hashbarer Schlüssel auch für dict/list/set-Werte."""
+    if isinstance(v, dict):
+        return ("__dict__",) + tuple(sorted((k, _freeze(x)) for k, x in v.items()))
+    if isinstance(v, (list, tuple)):
+        return tuple(_freeze(x) for x in v)
+    if isinstance(v, (set, frozenset)):
+        return frozenset(_freeze(x) for x in v)
+    return v
+
+
+class StageGraph:
+    """Stufen in topologischer Reihenfolge; Memo (LRU) und Treffer/Fehlgriffe je Knoten."""
+
+    def __init__(self, stages: Iterable[Stage], max_entries: int = MEMO_MAX_ENTRIES):
+        stages = list(stages)
+        producer = {}
+        for s in stages:
+            for out in s.outputs:
+                if out in producer:
+                    raise ValueError(f"Ausgabe {out!r} wird von {producer[out]!r} und {s.name!r} geliefert.")
+                producer[out] = s.name
+        if len({s.name for s in stages}) != len(stages):
+            raise ValueError("Stufennamen müssen eindeutig sein.")
+
+        self.max_entries = int(max_entries)
+        self.inputs = tuple(sorted({i for s in stages for i in s.inputs if i not in producer}))
+        self.stages = self._toposort(stages, producer)
+        self._by_name = {s.name: s for s in self.stages}
+        self._producer = producer
+        self._memo = {s.name: OrderedDict() for s in self.stages}
+        self._hits = dict.fromkeys(self._by_name, 0)
+        self._misses = dict.fromkeys(self._by_name, 0)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _toposort(stages, producer):
+        deps = {s.name: {producer[i] for i in s.inputs if i in producer} for s in stages}
+        order, done = [], set()
+        pending = list(stages)
+        while pending:
+            ready = [s for s in pending if deps[s.name] <= done]
+            if not ready:
+                raise ValueError(f"Zyklus zwischen {', '.join(s.name for s in pending)}.")
+            for s in ready:
+                order.append(s)
+                done.add(s.name)
+            pending = [s for s in pending if s.name not in done]
+        return tuple(order)
+
+    # -----------------------------
+    # Ausführen
+    # -----------------------------
+    def run(self, values: Dict[str, Any], profiler=None, memo: bool = True) -> Dict[str, Any]:
+        """
+        Alle Stufen ausführen (Treffer aus dem Memo); Rückgabe: Eingaben + alle Ausgaben.
+        memo=False: alles frisch rechnen, Memo und Zähler bleiben unberührt.
+        """
+        missing = [i for i in self.inputs if i not in values]
+        if missing:
+            raise KeyError(f"Fehlende Eingaben: {', '.join(missing)}")
+        env = dict(values)
+        for s in self.stages:
+            stage = profiler.stage(s.name) if profiler is not None else nullcontext()
+            if not memo:
+                with stage:
+                    env.update(zip(s.outputs, self._call(s, env)))
+                continue
+
+            version = s.version() if callable(s.version) else s.version
+            key = (version, tuple([env[i] for i in s.inputs]))
+            try:
+                hash(key)
+            except TypeError:
+                key = _freeze(key)
+            cache = self._memo[s.name]
+            with self._lock:
+                out = cache.get(key)
+                if out is not None:
+                    cache.move_to_end(key)
+                    self._hits[s.name] += 1
+            if out is None:
+                with stage:
+                    out = self._call(s, env)
+                with self._lock:
+                    self._misses[s.name] += 1
+                    cache[key] = out
+                    while len(cache) > self.max_entries:
+                        cache.popitem(last=False)
+            env.update(zip(s.outputs, out))
+        return env
+
+    @staticmethod
+    def _call(s, env):
+        out = s.fn(*(env[i] for i in s.inputs))
+        return (out,) if len(s.outputs) == 1 else tuple(out)
+
+    # -----------------------------
+    # Zähler / Invalidierung
+    # -----------------------------
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {n: {"hits": self._hits[n], "misses": self._misses[n], "entries": len(self._memo[n])}
+                    for n in self._by_name}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for n in self._by_name:
+                self._hits[n] = self._misses[n] = 0
+
+    def downstream(self, name: str) -> List[str]:
+        """Stufe selbst + alle, die (transitiv) von ihren Ausgaben abhängen – in Ausführungsreihenfolge."""
+        if name not in self._by_name:
+            raise KeyError(name)
+        affected = {name}
+        produced = set(self._by_name[name].outputs)
+        for s in self.stages:
+            if s.name not in affected and produced & set(s.inputs):
+                affected.add(s.name)
+                produced |= set(s.outputs)
+        return [s.name for s in self.stages if s.name in affected]
+
+    def dependents_of_input(self, input_name: str) -> List[str]:
+        """Stufen, die bei Änderung einer Eingabe neu rechnen können."""
+        affected, produced = [], {input_name}
+        for s in self.stages:
+            if produced & set(s.inputs):
+                affected.append(s.name)
+                produced |= set(s.outputs)
+        return affected
+
+    def clear(self, name: Optional[str] = None, downstream: bool = True) -> None:
+        """Memo leeren – alles, oder eine Stufe (standardmäßig mit allen nachgelagerten)."""
+        names = self._by_name if name is None else (self.downstream(name) if downstream else [name])
+        with self._lock:
+            for n in names:
+                self._memo[n].clear()
@@ -0,0 +1,323 @@
+"""utils/wbal.py — W′-Balance (Skiba) über Leistungs-Streams
+
+Wendet CP/W′ aus calc_critical_power auf eine Fahrt an (1–4 Hz oder beliebig):
+
+    integral      (Skiba 2012)  W′bal(t) = W′ − Σ W′exp(u) · e^(−(t−u)/τ),
+                                τ = 546 · e^(−0.01 · D_CP) + 316,  D_CP = CP − Ø Leistung unter CP
+    differential  (Skiba 2015)  über CP: W′bal −= (P − CP)·dt
+                                unter CP: W′ − W′bal klingt mit e^(−(CP − P)·dt / W′) ab
+
+Beide Formen sind dieselbe lineare Rekursion X_k = e^(−g_k)·X_(k−1) + c_k mit
+X = W′ − W′bal (verbrauchtes W′). Statt der O(n²)-Faltung wird sie blockweise in
+geschlossener Form gelöst (kumulierte Abklingrate + cumsum) — O(n), ohne Python-
+Schleife pro Sample, und Blöcke lassen sich aneinanderhängen:
+
+    wbal = wbal_series(power, cp=280, w_prime=18000, hz=1)             # ganze Fahrt im Speicher
+    s = WBalStream(280, 18000, hz=4); for chunk in chunks: s.update(chunk)   # mehrstündige Dateien
+    r = wbal_from_ride("ride.fit", 280, 18000)                         # CSV/FIT, Zusammenfassung + Verlauf
+    wbal = wbal_segments(power, dt_s, 280, 18000)                      # Abschnitte unterschiedlicher Dauer
+    season = wbal_season(rides, cp, w_prime)                           # viele Fahrten auf einmal
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+METHODS = ("differential", "integral")
+PLOT_POINTS = 1500        # Verlauf für Diagramme auf so viele Punkte verdichten
+_BLOCK_DECAY = 200.0      # max. kumulierte Abklingrate je Block → e^x bleibt weit unter dem float-Limit
+
+
+def skiba_tau(d_cp: float) -> float:
+    """Zeitkonstante der W′-Erholung (s) aus D_CP = CP − Ø Leistung unter CP (Skiba 2012)."""
+    return 546.0 * np.exp(-0.01 * d_cp) + 316.0
+
+
+def _clean(power) -> np.ndarray:
+    p = np.asarray(power, dtype=float)
+    return np.where(np.isfinite(p) & (p > 0), p, 0.0)  # Aussetzer/Rollen = 0 W
+
+
+def _decay_sum(g, c, x0=0.0, reset=None):
+    """
+    X_k = e^(−g_k)·X_(k−1) + c_k für alle k in O(n).
+    Blockweise geschlossen: X_k = e^(−G_k)·(X_start + Σ c_j·e^(G_j)) mit G relativ zum
+    Blockanfang; neue Blöcke, sobald G um _BLOCK_DECAY gewachsen ist.
+    reset: bool-Array – an diesen Indizes beginnt X bei 0 (neue Fahrt).
+    Rückgabe: (X, letzter Wert).
+    """
+    n = len(c)
+    out = np.empty(n)
+    if n == 0:
+        return out, x0
+    g = np.minimum(g, _BLOCK_DECAY)
+    G = np.cumsum(g)
+    cuts = np.searchsorted(G, np.arange(_BLOCK_DECAY, G[-1], _BLOCK_DECAY))
+    starts = np.flatnonzero(reset) if reset is not None else np.empty(0, dtype=int)
+    bounds = np.unique(np.concatenate([[0, n], cuts, starts]).astype(int))
+
+    x = x0
+    for s, e in zip(bounds[:-1], bounds[1:]):
+        if reset is not None and reset[s]:
+            x = 0.0
+        Gb = G[s:e] - (G[s - 1] if s else 0.0)
+        out[s:e] = np.exp(-Gb) * (x + np.cumsum(c[s:e] * np.exp(Gb)))
+        x = out[e - 1]
+    return out, x
+
+
+def _terms(p, cp, w_prime, dt, method, tau):
+    """Abklingrate g und Verbrauch c je Sample für die gewählte Form."""
+    c = np.maximum(p - cp, 0.0) * dt
+    if method == "differential":
+        g = np.maximum(cp - p, 0.0) * dt / w_prime
+    elif method == "integral":
+        g = np.broadcast_to(dt / np.asarray(tau, dtype=float), p.shape)
+    else:
+        raise ValueError(f"method muss eines von {METHODS} sein")
+    return g, c
+
+
+def wbal_series(power, cp: float, w_prime: float, hz: float = 1.0, method: str = "differential",
+                tau: Optional[float] = None) -> np.ndarray:
+    """
+    W′bal (J) je Sample für eine Fahrt im Speicher.
+    integral ohne tau: τ aus der ganzen Fahrt (D_CP über alle Samples unter CP).
+    """
+    if hz <= 0:
+        raise ValueError("Abtastrate muss > 0 sein.")
+    p = _clean(power)
+    if method == "integral" and tau is None:
+        below = p[p < cp]
+        tau = skiba_tau(cp - below.mean() if below.size else 0.0)
+    g, c = _terms(p, float(cp), float(w_prime), 1.0 / hz, method, tau)
+    x, _ = _decay_sum(g, c)
+    return w_prime - x
+
+
+def wbal_segments(power, dt_s, cp: float, w_prime: float) -> np.ndarray:
+    """
+    W′bal (J) am Ende von Abschnitten konstanter Leistung mit je eigener Dauer dt_s
+    (z. B. Streckenabschnitte eines Pacing-Plans) – Differentialform, exakt je Abschnitt.
+    """
+    p = _clean(power)
+    dt = np.asarray(dt_s, dtype=float)
+    g, c = _terms(p, float(cp), float(w_prime), dt, "differential", None)
+    x, _ = _decay_sum(g, c)
+    return w_prime - x
+
+
+# -----------------------------
+# Streaming (mehrstündige Dateien)
+# -----------------------------
+class WBalStream:
+    """
+    W′bal blockweise: update() liefert W′bal für den Block, gehalten wird nur der
+    Zustand (verbrauchtes W′) plus Kennzahlen – Speicher unabhängig von der Fahrtdauer.
+
+    integral braucht τ; ohne tau wird es aus dem bisherigen Ø unter CP geschätzt
+    (bei zwei Durchläufen über die Datei – siehe wbal_from_ride – ist τ exakt).
+    """
+
+    def __init__(self, cp: float, w_prime: float, hz: float = 1.0, method: str = "differential",
+                 tau: Optional[float] = None):
+        if hz <= 0:
+            raise ValueError("Abtastrate muss > 0 sein.")
+        if method not in METHODS:
+            raise ValueError(f"method muss eines von {METHODS} sein")
+        self.cp, self.w_prime, self.hz = float(cp), float(w_prime), float(hz)
+        self.method, self.tau = method, tau
+        self.n_samples = 0
+        self.expended = 0.0
+        self.min_wbal = float(w_prime)
+        self.min_index = 0
+        self.below_zero = 0
+        self._x = 0.0
+        self._below_sum = 0.0
+        self._below_n = 0
+
+    def _tau(self):
+        if self.tau is not None:
+            return self.tau
+        return skiba_tau(self.cp - self._below_sum / self._below_n if self._below_n else 0.0)
+
+    def update(self, chunk) -> np.ndarray:
+        p = _clean(chunk)
+        if p.size == 0:
+            return np.empty(0)
+        below = p < self.cp
+        self._below_sum += float(p[below].sum())
+        self._below_n += int(below.sum())
+
+        g, c = _terms(p, self.cp, self.w_prime, 1.0 / self.hz, self.method, self._tau())
+        x, self._x = _decay_sum(g, c, self._x)
+        wbal = self.w_prime - x
+
+        j = int(np.argmin(wbal))
+        if wbal[j] < self.min_wbal:
+            self.min_wbal, self.min_index = float(wbal[j]), self.n_samples + j
+        self.expended += float(c.sum())
+        self.below_zero += int((wbal < 0).sum())
+        self.n_samples += p.size
+        return wbal
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "method": self.method,
+            "duration_s": self.n_samples / self.hz,
+            "min_wbal_j": self.min_wbal,
+            "min_wbal_pct": self.min_wbal / self.w_prime * 100.0 if self.w_prime > 0 else float("nan"),
+            "t_min_s": self.min_index / self.hz,
+            "expended_j": self.expended,
+            "below_zero_s": self.below_zero / self.hz,
+            "tau_s": float(self._tau()) if self.method == "integral" else None,
+        }
+
+
+def downsample_min(t_s, values, points: int = PLOT_POINTS):
+    """Verlauf auf ≤ points Werte verdichten (Minimum je Fenster → Tiefpunkte bleiben sichtbar)."""
+    t, v = np.asarray(t_s, dtype=float), np.asarray(values, dtype=float)
+    if v.size <= points:
+        return t, v
+    starts = np.arange(0, v.size, -(-v.size // points))
+    return t[starts], np.minimum.reduceat(v, starts)
+
+
+class _Downsampler:
+    """Streaming-Gegenstück zu downsample_min mit fester Fensterbreite (in Samples)."""
+
+    def __init__(self, step: int):
+        self.step = max(1, int(step))
+        self.t, self.v = [], []
+        self._n = 0
+        self._carry = np.empty(0)
+
+    def update(self, x):
+        buf = np.concatenate([self._carry, x]) if self._carry.size else x
+        full = buf.size // self.step * self.step
+        if full:
+            self.v.append(buf[:full].reshape(-1, self.step).min(axis=1))
+            self.t.append(self._n + np.arange(0, full, self.step))
+            self._n += full
+        self._carry = buf[full:]
+
+    def result(self, hz):
+        self.update(np.empty(0))
+        v, t = list(self.v), list(self.t)
+        if self._carry.size:
+            v.append(self._carry.min(keepdims=True))
+            t.append(np.array([self._n]))
+        return (np.concatenate(t) / hz, np.concatenate(v)) if v else (np.empty(0), np.empty(0))
+
+
+def wbal_from_ride(source, cp: float, w_prime: float, method: str = "differential", hz: Optional[float] = None,
+                   name: Optional[str] = None, tau: Optional[float] = None, step_s: float = 5.0) -> dict:
+    """
+    W′bal einer Ride-Datei (CSV/FIT, Pfad oder Dateiobjekt), blockweise gelesen.
+    Rückgabe: summary (siehe WBalStream.summary) + "t_s"/"wbal" (Minimum je step_s, für Diagramme).
+    integral ohne tau: erster Durchlauf nur für D_CP, zweiter für W′bal.
+    """
+    from utils.power_profile import _is_fit, csv_sample_rate, iter_csv_power, iter_fit_power
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    fit = _is_fit(source, name)
+    if fit:
+        hz = 1.0
+    else:
+        hz = hz or csv_sample_rate(source)
+
+    def chunks():
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return iter_fit_power(source) if fit else iter_csv_power(source)
+
+    if method == "integral" and tau is None:
+        below_sum, below_n = 0.0, 0
+        for chunk in chunks():
+            p = _clean(chunk)
+            below = p < cp
+            below_sum += float(p[below].sum())
+            below_n += int(below.sum())
+        tau = skiba_tau(cp - below_sum / below_n if below_n else 0.0)
+
+    stream = WBalStream(cp, w_prime, hz, method, tau)
+    ds = _Downsampler(round(step_s * hz))
+    for chunk in chunks():
+        ds.update(stream.update(chunk))
+    t_s, wbal = ds.result(hz)
+    return {**stream.summary(), "hz": hz, "t_s": t_s, "wbal": wbal}
+
+
+# -----------------------------
+# Batch (Saison: viele Fahrten)
+# -----------------------------
+def wbal_season(rides: Sequence, cp, w_prime, hz=1.0, method: str = "differential",
+                keep_series: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Viele Fahrten in einem Durchlauf: alle Streams werden aneinandergehängt und
+    die Rekursion an jedem Fahrtbeginn zurückgesetzt. cp/w_prime/hz: Skalar oder
+    ein Wert je Fahrt (z. B. CP zum jeweiligen Testdatum).
+
+    Rückgabe: Arrays je Fahrt – duration_s, min_wbal_j, min_wbal_pct, t_min_s,
+    expended_j, below_zero_s, tau_s (integral) – und mit keep_series=True "series"
+    (Liste der W′bal-Verläufe).
+    """
+    if method not in METHODS:
+        raise ValueError(f"method muss eines von {METHODS} sein")
+    n_rides = len(rides)
+    lengths = np.array([len(r) for r in rides], dtype=int)
+    cp_r = np.broadcast_to(np.asarray(cp, dtype=float), (n_rides,))
+    wp_r = np.broadcast_to(np.asarray(w_prime, dtype=float), (n_rides,))
+    hz_r = np.broadcast_to(np.asarray(hz, dtype=float), (n_rides,))
+    if np.any(hz_r <= 0):
+        raise ValueError("Abtastrate muss > 0 sein.")
+
+    p = _clean(np.concatenate([np.asarray(r, dtype=float) for r in rides])) if n_rides else np.empty(0)
+    ride = np.repeat(np.arange(n_rides), lengths)
+    cp_s, wp_s, dt_s = cp_r[ride], wp_r[ride], 1.0 / hz_r[ride]
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]) if n_rides else np.empty(0, dtype=int)
+    nonempty = lengths > 0
+
+    tau_r = np.full(n_rides, np.nan)
+    if method == "integral":
+        below = p < cp_s
+        below_sum = np.bincount(ride, weights=np.where(below, p, 0.0), minlength=n_rides)
+        below_n = np.bincount(ride, weights=below, minlength=n_rides)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            d_cp = np.where(below_n > 0, cp_r - below_sum / below_n, 0.0)
+        tau_r = skiba_tau(d_cp)
+    g, c = _terms(p, cp_s, wp_s, dt_s, method, tau_r[ride] if method == "integral" else None)
+
+    reset = np.zeros(p.size, dtype=bool)
+    reset[offsets[nonempty]] = True
+    x, _ = _decay_sum(g, c, reset=reset)
+    wbal = wp_s - x
+
+    idx = offsets[nonempty]
+    min_wbal = np.full(n_rides, np.nan)
+    t_min = np.full(n_rides, np.nan)
+    if idx.size:
+        min_wbal[nonempty] = np.minimum.reduceat(wbal, idx)
+        # erstes Sample je Fahrt, das das Minimum erreicht
+        hit = wbal == min_wbal[ride]
+        pos = np.flatnonzero(hit)
+        first = np.full(n_rides, p.size)
+        np.minimum.at(first, ride[pos], pos)   # deterministisch, unabhängig von der Schreibreihenfolge
+        t_min = np.where(first < p.size, (first - offsets) / hz_r, np.nan)
+
+    out = {
+        "duration_s": lengths / hz_r,
+        "min_wbal_j": min_wbal,
+        "min_wbal_pct": min_wbal / wp_r * 100.0,
+        "t_min_s": t_min,
+        "expended_j": np.bincount(ride, weights=c, minlength=n_rides),
+        "below_zero_s": np.bincount(ride, weights=(wbal < 0) * dt_s, minlength=n_rides),
+        "tau_s": tau_r,
+    }
+    if keep_series:
+        out["series"] = np.split(wbal, np.cumsum(lengths)[:-1]) if n_rides else []
+    return out